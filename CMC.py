@@ -1,7 +1,7 @@
 import os
-import requests
 import json
-from datetime import datetime, timedelta
+import universe
+from http_transport import get_transport
 
 # ================================
 # KONFIGURASI
@@ -10,8 +10,8 @@ from datetime import datetime, timedelta
 CMC_API_KEY = os.getenv('CMC_API_KEY')  
 
 # File cache untuk menyimpan daftar pair top berdasarkan ranking CMC
-CACHE_FILE = 'pairs_cache.json'
-CACHE_EXPIRED_DAYS = 30  # Cache dianggap kadaluarsa jika lebih dari 30 hari
+# (ditulis oleh universe.py, diff harian terhadap daftar simbol exchange)
+CACHE_FILE = universe.PAIRS_CACHE_FILE
 
 # Konfigurasi jumlah pair untuk cache
 TOP_PAIRS_CACHED = 100   # Jumlah pair teratas (berdasarkan ranking CMC) yang akan disimpan ke cache
@@ -35,7 +35,7 @@ def get_cmc_rankings(symbols):
         "convert": "USD"
     }
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = get_transport().get(url, headers=headers, params=params)
         response.raise_for_status()  # Raise exception untuk HTTP error
         data = response.json()
         
@@ -54,88 +54,31 @@ def get_cmc_rankings(symbols):
 
 def update_pairs_cache():
     """
-    Mengambil semua halaman dari CoinGecko untuk pair Binance,
-    memfilter pair dengan target USDT, lalu mengurutkan berdasarkan ranking dari CoinMarketCap,
-    dan menyimpannya ke file cache.
+    Ranking ulang penuh universe: diff daftar simbol exchange, lalu semua
+    pair di-ranking ulang dengan satu request listings CMC. Dipakai oleh
+    `bot.py refresh-universe --force`; pemeliharaan harian cukup sync diff.
     """
-    print("🔄 Memperbarui file cache pair...")
-    all_tickers = []
-    page = 1
-    
-    while True:
-        url = "https://api.coingecko.com/api/v3/exchanges/binance/tickers"
-        params = {'include_exchange_logo': 'false', 'order': 'volume_desc', 'page': page}
-        try:
-            print(f"🔍 Mengambil halaman {page} dari CoinGecko...")
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            tickers = data.get('tickers', [])
-            if not tickers:
-                print(f"ℹ️ Halaman {page} tidak memiliki tickers, menghentikan proses pengambilan.")
-                break
-                
-            print(f"✅ Halaman {page} berhasil diambil, jumlah tickers: {len(tickers)}")
-            all_tickers.extend(tickers)
-            page += 1
-        except Exception as e:
-            print(f"❌ Gagal mengambil halaman {page}: {e}")
-            break
-
-    # Filter pair dengan target USDT
-    usdt_tickers = [t for t in all_tickers if t.get('target') == 'USDT']
-    print(f"🔍 Total tickers yang diambil: {len(all_tickers)}, setelah difilter USDT: {len(usdt_tickers)}")
-
-    # Ambil daftar simbol unik dari tickers
-    symbols = list({t.get('base').upper() for t in usdt_tickers if t.get('base')})
-    print(f"🔍 Mengambil data ranking CMC untuk {len(symbols)} simbol unik...")
-
-    # Ambil data ranking dari CMC
-    ranking_mapping = get_cmc_rankings(symbols)
-
-    # Urutkan tickers berdasarkan ranking CMC secara ascending (ranking 1 = terbaik)
-    # Jika simbol tidak ditemukan di CMC, berikan nilai infinity agar masuk ke urutan paling belakang
-    sorted_tickers = sorted(usdt_tickers, key=lambda x: ranking_mapping.get(x.get('base').upper(), float('inf')))
-
-    # Ambil TOP_PAIRS_CACHED pair teratas berdasarkan ranking CMC
-    top_pairs = sorted_tickers[:TOP_PAIRS_CACHED]
-
-    # Bentuk daftar pair dengan format "BASEUSDT"
-    pairs_list = [f"{ticker.get('base').upper()}USDT" for ticker in top_pairs]
-
-    try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(pairs_list, f, indent=4)
+    print("🔄 Memperbarui universe pair (ranking ulang penuh)...")
+    universe.load_universe()
+    if universe.sync(full_rerank=True, limit=TOP_PAIRS_CACHED) is None:
+        print("❌ Universe tidak diperbarui, cache pair lama dipakai.")
+    else:
         print("✅ File cache pair berhasil diperbarui dan disimpan.")
-    except Exception as e:
-        print(f"❌ Gagal menyimpan file cache pair: {e}")
 
 def get_pairs_from_cache():
     """
     Memuat daftar pair dari file cache.
-    Jika file cache tidak ada atau sudah kadaluarsa berdasarkan konfigurasi CACHE_EXPIRED_DAYS,
-    maka file cache akan diperbarui terlebih dahulu.
+    Jika universe belum disinkronkan dalam universe.SYNC_HOURS terakhir,
+    diff harian dengan daftar simbol exchange dijalankan lebih dulu
+    (hanya listing baru / delisting yang diproses).
     """
-    now = datetime.now()
-    update_cache = False
-
-    if not os.path.exists(CACHE_FILE):
-        update_cache = True
-        print("ℹ️ File cache pair tidak ditemukan. Memperbarui cache...")
-    else:
-        try:
-            mtime = os.path.getmtime(CACHE_FILE)
-            mod_time = datetime.fromtimestamp(mtime)
-            if now - mod_time > timedelta(days=CACHE_EXPIRED_DAYS):
-                update_cache = True
-                print("ℹ️ File cache pair kadaluarsa. Memperbarui cache...")
-        except Exception as e:
-            print(f"⚠️ Gagal mendapatkan waktu modifikasi cache: {e}")
-            update_cache = True
-
-    if update_cache:
-        update_pairs_cache()
+    universe.load_universe()
+    if universe.is_due():
+        print("ℹ️ Universe pair belum disinkronkan hari ini. Menjalankan diff harian...")
+        diff = universe.sync(limit=TOP_PAIRS_CACHED)
+        if diff is not None:
+            print(f"✅ Universe versi {diff['version']}: +{len(diff['added'])} listing, "
+                  f"-{len(diff['removed'])} delisting, {diff['reranked']} pair di-ranking.")
 
     try:
         with open(CACHE_FILE, 'r') as f:
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from state_io import write_json_if_changed
+
+# ==========================================
+# LEDGER ALERT (IDEMPOTEN)
+# ==========================================
+# Setiap alert dicatat per chat dengan key (pair, tipe sinyal, waktu close
+# candle 1H yang dievaluasi, chat). Rerun workflow setelah gagal di tengah
+# jalan, atau run cron + workflow_dispatch yang tumpang tindih, tidak
+# mengirim ulang alert yang sama untuk candle yang sama: duplikat ditolak
+# secara lokal sebelum ada I/O jaringan.
+#
+# Cron berjalan di menit :58, jadi candle yang dievaluasi adalah candle 1H
+# yang close di boundary jam TERDEKAT, bukan close jam berjalan: run :58 dan
+# rerun/workflow_dispatch beberapa menit setelah jam berganti mendapat key
+# yang sama.
+#
+# claim() hanya menandai key sebagai pending (di memori). Key baru masuk
+# ledger lewat confirm() setelah Telegram menerima pesannya; jika gagal
+# (HTTP error, exception, atau belum terkirim saat flush timeout) key
+# di-release, jadi rerun mengirim ulang alert yang memang belum sampai.
+#
+# Key disimpan sebagai hash 64-bit (16 karakter hex) -> epoch detik kapan
+# entry kedaluwarsa, jadi file tetap kecil. Entry lebih tua dari TTL
+# dibuang (compaction) setiap kali ledger disimpan.
+LEDGER_FILE = 'alert_ledger.json'
+LEDGER_TTL_HOURS = 48
+CANDLE_SECONDS = 3600
+
+# ENTRIES[hash] = epoch detik kedaluwarsa
+ENTRIES = {}
+_PENDING = set()    # Key yang sedang diantrikan / dikirim
+_LOADED = False
+_DIRTY = False
+_LOCK = threading.Lock()
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_ledger():
+    global ENTRIES, _LOADED, _DIRTY
+    ENTRIES, _DIRTY = {}, False
+    if os.path.exists(LEDGER_FILE):
+        try:
+            with open(LEDGER_FILE, 'r') as f:
+                ENTRIES = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat ledger alert: {e}")
+            ENTRIES = {}
+    _LOADED = True
+
+def compact(now=None):
+    global _DIRTY
+    now = now or time.time()
+    expired = [k for k, until in ENTRIES.items() if until <= now]
+    for key in expired:
+        del ENTRIES[key]
+    _DIRTY = _DIRTY or bool(expired)
+
+def save_ledger():
+    global _DIRTY
+    with _LOCK:
+        if not _LOADED or not _DIRTY:
+            return
+        compact()
+        try:
+            write_json_if_changed(LEDGER_FILE, ENTRIES)
+            _DIRTY = False
+        except Exception as e:
+            print(f"❌ Gagal menyimpan ledger alert: {e}")
+
+# ==========================================
+# KLAIM ALERT
+# ==========================================
+def candle_close(now=None):
+    """Epoch detik close candle 1H yang dievaluasi scan: boundary jam terdekat dari `now`."""
+    now = now or time.time()
+    return int((now + CANDLE_SECONDS / 2) // CANDLE_SECONDS) * CANDLE_SECONDS
+
+def alert_key(pair, signal_type, candle, chat_id=None):
+    raw = f"{pair}|{signal_type}|{candle}|{chat_id}".encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+def claim(pair, signal_type, chat_id=None, now=None):
+    """
+    Key alert jika (pair, sinyal, chat) belum terkirim atau sedang dikirim
+    untuk candle 1H ini, None jika duplikat (pemanggil tidak perlu mengirim).
+    Key berstatus pending sampai confirm() atau release().
+    """
+    now = now or time.time()
+    key = alert_key(pair, signal_type, candle_close(now), chat_id)
+    with _LOCK:
+        if not _LOADED:
+            load_ledger()
+        until = ENTRIES.get(key)
+        if key in _PENDING or (until is not None and until > now):
+            return None
+        _PENDING.add(key)
+        return key
+
+def confirm(key, now=None):
+    """Alert terkirim: catat key di ledger."""
+    global _DIRTY
+    now = now or time.time()
+    with _LOCK:
+        _PENDING.discard(key)
+        ENTRIES[key] = int(now + LEDGER_TTL_HOURS * 3600)
+        _DIRTY = True
+
+def release(key):
+    """Alert gagal terkirim: lepas key agar bisa dikirim ulang."""
+    with _LOCK:
+        _PENDING.discard(key)
+
+def merge(entries):
+    """Gabungkan entry ledger dari run lain (mis. delta shard)."""
+    global _DIRTY
+    with _LOCK:
+        if not _LOADED:
+            load_ledger()
+        for key, until in entries.items():
+            if until > ENTRIES.get(key, 0):
+                ENTRIES[key] = until
+                _DIRTY = True
+
+
+atexit.register(save_ledger)  # Alert yang sudah terkirim tetap tercatat walau run berhenti di tengah
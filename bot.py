@@ -0,0 +1,475 @@
+import argparse
+import sys
+
+# ==========================================
+# CLI TERPADU UNTUK SEMUA ENTRY POINT BOT
+# ==========================================
+# Setiap subcommand meng-import modul yang dibutuhkannya sendiri, sehingga
+# `recap` atau `exits-only` tidak ikut memuat modul analitik yang tidak dipakai.
+# Modul yang boleh di-import saat startup hanyalah stdlib + modul ringan repo.
+
+HEAVY_MODULES = ('requests', 'tradingview_ta', 'numpy')
+STARTUP_BUDGET_MS = 250
+
+
+def cmd_scan(args):
+    if args.shards > 1:
+        import sharding
+        return sharding.run_local(args.shards)
+    import signal_bot
+    signal_bot.main()
+
+
+def cmd_shard_run(args):
+    import sharding
+    import signal_bot
+    sharding.enter_workdir(args.index)
+    signal_bot.main(exits_only=args.exits_only, shard=(args.index, args.count))
+
+
+def cmd_shard_merge(args):
+    import recap
+    import sharding
+    ok = sharding.merge_shards(args.count)
+    recap.check_and_send_weekly_recap()
+    return 0 if ok else 1
+
+
+def cmd_run(args):
+    import prefetch
+    prefetch.run_forever(args.prefetch_minutes, args.settle_seconds, args.cycles)
+
+
+def cmd_exits_only(args):
+    import signal_bot
+    signal_bot.main(exits_only=True)
+
+
+def cmd_recap(args):
+    import recap
+    recap.check_and_send_weekly_recap(force=args.force)
+
+
+def cmd_refresh_universe(args):
+    import CMC
+    if args.force:
+        CMC.update_pairs_cache()
+    CMC.main()
+
+
+def cmd_backtest(args):
+    """Ringkasan performa dari akumulator performance.json (tanpa memindai ulang riwayat)."""
+    from datetime import datetime
+    import performance
+    import signal_bot
+    performance.load_performance()
+    performance.ensure_synced(performance.load_trade_history())
+    overall = performance.all_time()
+    if not overall['trades']:
+        print("ℹ️ Riwayat trade kosong.")
+        return
+
+    def line(label, m):
+        return (f"{label:<16} n={m['trades']:<4} win={m['win_rate']:5.1f}%  pnl={m['total_pnl']:+.2f}%  "
+                f"exp={m['expectancy']:+.2f}%  pf={m['profit_factor']:.2f}  sharpe={m['sharpe']:.2f}  maxdd={m['max_drawdown']:.2f}%")
+
+    today = datetime.now(signal_bot.UTC7).date()
+    print(f"📊 {line('All-time', overall)}")
+    for label, days in performance.WINDOWS.items():
+        print(f"   {line(label, performance.window(days, today))}")
+    print("   --- Per exit reason ---")
+    for reason, m in sorted(performance.breakdown('by_reason').items()):
+        print(f"   {line(reason, m)}")
+    print(f"   --- Per pair (top {args.top} PnL) ---")
+    pairs = sorted(performance.breakdown('by_pair').items(), key=lambda kv: -kv[1]['total_pnl'])
+    for pair, m in pairs[:args.top]:
+        print(f"   {line(pair, m)}")
+
+
+def cmd_excursions(args):
+    """MAE/MFE semua trade historis dalam satuan ATR, dari bar 1H tersimpan."""
+    import time
+    import excursions
+    import performance
+    import signal_bot
+
+    trades = [t for t in performance.load_trade_history() if not args.pair or t['pair'] == args.pair]
+    if not trades:
+        print("ℹ️ Riwayat trade kosong.")
+        return
+    excursions.load_trade_candles()
+    if not args.offline:
+        added = excursions.sync_trade_candles(trades)
+        if added:
+            print(f"📥 {added} bar 1H baru disimpan ke {excursions.TRADE_CANDLES_FILE}.")
+            excursions.save_trade_candles()
+
+    start = time.perf_counter()
+    result = excursions.analyze(trades)
+    elapsed = time.perf_counter() - start
+    for line in excursions.summarize(trades, result, signal_bot.ATR_SL_MULTIPLIER,
+                                     signal_bot.BREAK_EVEN_ATR_MULTIPLIER, signal_bot.ATR_TRAIL_DISTANCE):
+        print(line)
+    print(f"⏱️ {len(trades)} trade dianalisis dalam {elapsed * 1000:.1f} ms.")
+
+    giveback = result['giveback_atr']
+    worst = sorted((i for i in range(len(trades)) if giveback[i] == giveback[i]), key=lambda i: -giveback[i])
+    if worst[:args.top]:
+        print(f"   --- Giveback terbesar (top {args.top}) ---")
+    for i in worst[:args.top]:
+        t = trades[i]
+        print(f"   {t['entry_date'][:16]} {t['pair']:<14} {t.get('exit_reason', '-'):<14} "
+              f"MFE {result['mfe_atr'][i]:.2f} | MAE {result['mae_atr'][i]:.2f} | "
+              f"giveback {giveback[i]:.2f} | peak {result['hours_to_peak'][i]:.0f} jam")
+
+
+def cmd_rescore(args):
+    """What-if: nilai ulang snapshot keputusan dengan parameter strategi baru."""
+    import time
+    import scoring_rules
+    import signal_bot
+    import snapshot_log
+
+    rules = scoring_rules.load(args.rules) if args.rules else scoring_rules.get_rules()
+    overrides = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        current = rules.params.get(name, getattr(signal_bot, name, None))
+        if not name.isupper() or not isinstance(current, (int, float)) or isinstance(current, bool):
+            print(f"❌ Parameter tidak dikenal: {name}")
+            return 1
+        overrides[name] = type(current)(value)
+
+    start = time.perf_counter()
+    cycles = snapshot_log.load_cycles(days=args.days)
+    rows, changed = snapshot_log.rescore(cycles, overrides, rules)
+    elapsed = time.perf_counter() - start
+    if not rows:
+        print(f"ℹ️ Tidak ada snapshot entry dalam {args.days} hari terakhir.")
+        return
+
+    def count(index):
+        tally = {}
+        for c in changed:
+            tally[c[index]] = tally.get(c[index], 0) + 1
+        return tally
+
+    print(f"🔁 Rescore {rows} baris dari {len(cycles)} siklus dalam {elapsed:.2f} dtk | Override: {overrides or '-'}")
+    print(f"   Berubah: {len(changed)} baris | Sinyal lama: {count(2)} -> baru: {count(3)}")
+    for ts, pair, old, new, old_score, new_score in changed[:args.limit]:
+        print(f"   {ts} {pair:<14} {old or '-':<10} -> {new or '-':<10} ({old_score} -> {new_score})")
+
+
+def cmd_scoring_parity(args):
+    """
+    Gate paritas: scoring_rules.json harus menghasilkan (score, reasons, vetoes)
+    yang identik dengan implementasi referensi V4, pada snapshot nyata dan
+    kasus acak yang menyentuh semua cabang. Mode NumPy ikut dicek jika tersedia.
+    """
+    import random
+    import scoring_rules
+    import signal_bot
+    import snapshot_log
+    from records import Indicators
+
+    rng = random.Random(args.seed)
+
+    def near(base, spread):
+        return base * (1 + rng.uniform(-spread, spread))
+
+    def random_case():
+        price = rng.uniform(0.01, 1000)
+        atr = 0.0 if rng.random() < 0.1 else price * rng.uniform(0.001, 0.03)
+        tfs = []
+        for _ in snapshot_log.TIMEFRAMES:
+            macd = price * rng.uniform(-0.01, 0.01)
+            tfs.append(Indicators(
+                close=near(price, 0.1), ema10=near(price, 0.1), ema20=near(price, 0.1),
+                ema50=near(price, 0.15), ema200=near(price, 0.3),
+                macd=macd, macd_signal=macd - price * rng.uniform(-0.004, 0.004),
+                rsi=rng.choice([45.0, 50.0, 60.0, 65.0, 75.0, rng.uniform(20, 90)]),
+                adx=rng.choice([25.0, rng.uniform(5, 50)]), atr=atr,
+                volume=rng.uniform(0, 300), average_volume=0.0 if rng.random() < 0.1 else rng.uniform(0, 200),
+            ))
+        sl_price = price - atr * rng.choice([2.5, rng.uniform(0, 3)]) if atr else price * 0.95
+        return (*tfs, price, sl_price, rng.random() < 0.9)
+
+    cases = [random_case() for _ in range(args.samples)]
+    for _, columns, i in snapshot_log.entry_rows(snapshot_log.load_cycles(days=args.days)):
+        cases.append((*(snapshot_log.indicators_at(columns, tf, i) for tf in snapshot_log.TIMEFRAMES),
+                      columns['price'][i], columns['sl_price'][i], columns['btc_bullish'][i]))
+
+    rules = scoring_rules.load()
+    mismatches = 0
+    for case in cases:
+        expected = signal_bot.calculate_entry_score_v4(*case)
+        actual = rules.score(*case)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ Beda: {case}\n   V4   : {expected}\n   rules: {actual}")
+    print(f"🧪 Skalar: {len(cases) - mismatches}/{len(cases)} kasus identik dengan V4.")
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("ℹ️ NumPy tidak terpasang, mode vektor dilewati.")
+    else:
+        variables = {name: [] for name in scoring_rules.VARIABLES}
+        for *tfs, price, sl_price, btc_bullish in cases:
+            for tf, data in zip(snapshot_log.TIMEFRAMES, tfs):
+                for name in snapshot_log.INDICATOR_FIELDS:
+                    variables[f"{name}_{tf}"].append(getattr(data, name))
+            variables['price'].append(price)
+            variables['sl_price'].append(sl_price)
+            variables['btc_bullish'].append(btc_bullish)
+        scores, vetoed = rules.score_many(variables)
+        vector_mismatch = 0
+        for case, score, veto in zip(cases, scores.tolist(), vetoed.tolist()):
+            expected_score, _, expected_vetoes = signal_bot.calculate_entry_score_v4(*case)
+            vector_mismatch += (score, veto) != (expected_score, bool(expected_vetoes))
+        mismatches += vector_mismatch
+        print(f"🧪 Vektor: {len(cases) - vector_mismatch}/{len(cases)} kasus identik dengan V4.")
+
+    if mismatches:
+        return 1
+    print("✅ Rule set paritas dengan V4.")
+    return 0
+
+
+def cmd_candle_check(args):
+    """
+    Regresi candle store: jam demi jam (menit :58, seperti cron) indikator
+    4H/1D dari candle_store.get_indicators harus sama dengan indikator yang
+    dihitung langsung dari klines 4H/1D (agregasi seri 1H sintetis yang sama),
+    termasuk jam pertama bucket baru. Hanya field berbasis close yang
+    dibandingkan; high/low bar 1H live memang tidak diketahui candle store.
+    """
+    import candle_store
+    import indicators
+    import synthetic_market
+
+    hour = candle_store.HOUR_MS
+    fields = ('close', 'ema10', 'ema20', 'ema50', 'ema200', 'macd', 'macd_signal', 'rsi')
+    world_end = 1735689600                    # 2025-01-01 00:00 UTC, batas 1D
+    clock = {'now': 0}
+
+    def aggregate(rows, tf_ms):
+        bars = []
+        for open_ms, o, h, l, c, v, _ in rows:
+            start = open_ms - open_ms % tf_ms
+            if bars and bars[-1][0] == start:
+                bar = bars[-1]
+                bar[2], bar[3], bar[4], bar[5] = max(bar[2], h), min(bar[3], l), c, bar[5] + v
+            else:
+                bars.append([start, o, h, l, c, v, start + tf_ms - 1])
+        return bars
+
+    def visible(pair):
+        # Bar 1H yang sudah dibuka pada `now` (bar terakhir = bar live)
+        return [r for r in worlds[pair] if r[0] <= clock['now']]
+
+    def fake_klines(pair, interval, start_ms=None, limit=candle_store.BOOTSTRAP_LIMIT):
+        rows = visible(pair)
+        if interval != '1h':
+            rows = aggregate(rows, candle_store.TF_MS[interval])
+        if start_ms is not None:
+            return [tuple(r) for r in rows if r[0] >= start_ms][:limit]
+        return [tuple(r) for r in rows[-limit:]]
+
+    pairs = synthetic_market.pair_names(args.pairs)
+    worlds = {p: synthetic_market.generate(p, '1h', args.days * 24, end_time=world_end - 1, seed=args.seed) for p in pairs}
+    fetch_klines = candle_store.fetch_klines
+    candle_store.fetch_klines = fake_klines
+    candle_store.CANDLES = {}
+    checked = mismatches = 0
+    try:
+        for h in range(args.hours, 0, -1):
+            clock['now'] = (world_end * 1000 - h * hour) + 58 * 60 * 1000
+            for pair in pairs:
+                if not candle_store.sync_pair(pair, clock['now']):
+                    continue
+                rows = visible(pair)
+                for tf, tf_ms in candle_store.TF_MS.items():
+                    state = indicators.new_state()
+                    for bar in aggregate(rows, tf_ms):
+                        state = indicators.step(state, bar[1:6])
+                    expected = indicators.to_indicators(state)
+                    actual = candle_store.get_indicators(pair, tf, rows[-1][4], clock['now'])
+                    checked += 1
+                    diff = [f for f in fields
+                            if abs(getattr(actual, f) - getattr(expected, f)) > 1e-9 * max(1.0, abs(getattr(expected, f)))]
+                    if diff:
+                        mismatches += 1
+                        if mismatches <= 5:
+                            utc_hour = clock['now'] // hour % 24
+                            print(f"❌ {pair} {tf} jam {utc_hour:02d} UTC: " + ", ".join(
+                                f"{f} {getattr(actual, f):.4f} vs {getattr(expected, f):.4f}" for f in diff[:3]))
+    finally:
+        candle_store.fetch_klines = fetch_klines
+        candle_store.CANDLES = {}
+
+    print(f"🧪 Candle store: {checked - mismatches}/{checked} titik identik dengan klines 4H/1D.")
+    if mismatches or not checked:
+        return 1
+    print("✅ Resampling candle store paritas dengan klines.")
+    return 0
+
+
+def _stub_kwargs(args):
+    # Default diambil dari loadtest.py; parser tidak meng-import modul itu
+    names = ('pairs', 'port', 'latency_ms', 'error_rate', 'throttle_rate', 'seed')
+    return {name: getattr(args, name) for name in names if getattr(args, name) is not None}
+
+
+def cmd_load_test(args):
+    import loadtest
+    reports = loadtest.run(
+        cycles=args.cycles, stub_processes=args.stub_processes, deadline_seconds=args.deadline_seconds,
+        keep=args.keep, **_stub_kwargs(args),
+    )
+    loadtest.print_report(reports)
+    if args.json:
+        import json
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+def cmd_load_stub(args):
+    import loadtest
+    loadtest.serve(**_stub_kwargs(args))
+
+
+def _add_stub_args(p):
+    p.add_argument('--pairs', type=int, help='Jumlah pair sintetis (default 5000)')
+    p.add_argument('--port', type=int, help='Port stub (default 8765)')
+    p.add_argument('--latency-ms', type=float, help='Median latensi per request (default 80)')
+    p.add_argument('--error-rate', type=float, help='Peluang 503 per request (default 0.01)')
+    p.add_argument('--throttle-rate', type=float, help='Peluang 429 per request (default 0.005)')
+    p.add_argument('--seed', type=int)
+
+
+def cmd_startup_bench(args):
+    """
+    Gate regresi waktu startup: import CLI + modul bot di proses baru,
+    gagal (exit 1) jika modul berat ikut ter-import atau melewati budget.
+    """
+    import subprocess
+    import time
+
+    probe = (
+        "import sys, bot, signal_bot, CMC; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    timings = []
+    loaded = ''
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        loaded = out.stdout.strip()
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"⏱️ Startup median: {median:.1f} ms (budget {args.max_ms} ms, {args.runs} run)")
+    if loaded:
+        print(f"❌ Modul berat ter-import saat startup: {loaded}")
+        return 1
+    if median > args.max_ms:
+        print("❌ Waktu startup melewati budget.")
+        return 1
+    print("✅ Startup dalam budget.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='bot', description='Crypto Signal Bot V4')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('scan', help='Siklus penuh: exit posisi + cari entry baru')
+    p.add_argument('--shards', type=int, default=1, help='Bagi universe ke N proses paralel lalu merge')
+    p.set_defaults(func=cmd_scan)
+    sub.add_parser('exits-only', help='Hanya cek exit untuk posisi aktif').set_defaults(func=cmd_exits_only)
+
+    p = sub.add_parser('run', help='Mode long-running: satu siklus per close 1H dengan prefetch')
+    p.add_argument('--prefetch-minutes', type=float, default=5, help='Menit sebelum close untuk memanaskan data 4H/1D')
+    p.add_argument('--settle-seconds', type=float, default=5, help='Jeda setelah close sebelum siklus dimulai')
+    p.add_argument('--cycles', type=int, default=0, help='Berhenti setelah N siklus (0 = terus)')
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('recap', help='Kirim rekap mingguan')
+    p.add_argument('--force', action='store_true', help='Kirim walau bukan Minggu 23:00 UTC+7')
+    p.set_defaults(func=cmd_recap)
+
+    p = sub.add_parser('refresh-universe', help='Perbarui pairs_cache.json (diff harian simbol exchange + ranking CMC)')
+    p.add_argument('--force', action='store_true', help='Ranking ulang penuh walau universe belum kadaluarsa')
+    p.set_defaults(func=cmd_refresh_universe)
+
+    p = sub.add_parser('shard-run', help='Scan satu shard universe dan tulis delta state')
+    p.add_argument('--index', type=int, required=True, help='Index shard (mulai 0)')
+    p.add_argument('--count', type=int, required=True, help='Jumlah shard')
+    p.add_argument('--exits-only', action='store_true')
+    p.set_defaults(func=cmd_shard_run)
+
+    p = sub.add_parser('shard-merge', help='Gabungkan delta semua shard ke state kanonik')
+    p.add_argument('--count', type=int, required=True, help='Jumlah shard')
+    p.set_defaults(func=cmd_shard_merge)
+
+    p = sub.add_parser('backtest', help='Evaluasi performa dari riwayat trade')
+    p.add_argument('--top', type=int, default=10, help='Jumlah pair yang ditampilkan')
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('excursions', help='Analisis MAE/MFE trade historis (satuan ATR)')
+    p.add_argument('--pair', help='Hanya trade pair ini')
+    p.add_argument('--offline', action='store_true', help='Pakai bar 1H tersimpan saja, tanpa fetch')
+    p.add_argument('--top', type=int, default=10, help='Jumlah trade giveback terbesar yang ditampilkan')
+    p.set_defaults(func=cmd_excursions)
+
+    p = sub.add_parser('rescore', help='Uji ulang parameter strategi pada snapshot keputusan')
+    p.add_argument('--days', type=int, default=30)
+    p.add_argument('--set', action='append', default=[], metavar='NAMA=NILAI',
+                   help='Override parameter di signal_bot, mis. --set SCORE_BUY=75')
+    p.add_argument('--limit', type=int, default=20, help='Jumlah baris berubah yang ditampilkan')
+    p.add_argument('--rules', help='File rule set alternatif (default scoring_rules.json)')
+    p.set_defaults(func=cmd_rescore)
+
+    p = sub.add_parser('scoring-parity', help='Laporan paritas scoring_rules.json vs logika V4 (manual / CI, bukan scan per jam)')
+    p.add_argument('--samples', type=int, default=20000, help='Jumlah kasus acak')
+    p.add_argument('--seed', type=int, default=4)
+    p.add_argument('--days', type=int, default=30, help='Ikut cek snapshot N hari terakhir')
+    p.set_defaults(func=cmd_scoring_parity)
+
+    p = sub.add_parser('candle-check', help='Regresi indikator 4H/1D candle store vs klines (data sintetis)')
+    p.add_argument('--pairs', type=int, default=3)
+    p.add_argument('--days', type=int, default=60, help='Panjang seri 1H sintetis')
+    p.add_argument('--hours', type=int, default=72, help='Jumlah jam terakhir yang disimulasikan')
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_candle_check)
+
+    p = sub.add_parser('load-test', help='Load test signal_bot.main() terhadap stub lokal dengan pair sintetis')
+    _add_stub_args(p)
+    p.add_argument('--cycles', type=int, default=1)
+    p.add_argument('--stub-processes', type=int, help='Proses stub yang berbagi port (default jumlah CPU)')
+    p.add_argument('--deadline-seconds', type=float, default=None, help='Override deadline scan per siklus')
+    p.add_argument('--keep', action='store_true', help='Simpan direktori kerja (state & log) setelah selesai')
+    p.add_argument('--json', help='Tulis laporan per siklus ke file JSON')
+    p.set_defaults(func=cmd_load_test)
+
+    p = sub.add_parser('load-stub', help='Jalankan satu proses server stub load test (dipakai load-test)')
+    _add_stub_args(p)
+    p.set_defaults(func=cmd_load_stub)
+
+    p = sub.add_parser('startup-bench', help='Gate regresi waktu startup')
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--max-ms', type=float, default=STARTUP_BUDGET_MS)
+    p.set_defaults(func=cmd_startup_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
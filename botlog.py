@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+
+# ==========================================
+# LOG TERSTRUKTUR (KONSOL + JSON LINES)
+# ==========================================
+# Setiap baris log adalah event bernama + field, dengan dua sink:
+#   - konsol: teks emoji seperti sebelumnya. Template baru di-format jika
+#     level-nya lolos LOG_LEVEL, jadi baris DEBUG (mis. indikator mentah per
+#     pair) tidak memakan biaya format sama sekali. Baris per pair yang
+#     berulang (sample=True) disampling: SAMPLE_FIRST pertama per event,
+#     lalu 1 dari SAMPLE_EVERY. Konsol ditulis di thread pemanggil supaya
+#     urutannya tetap sama dengan print() modul lain.
+#   - JSON lines (LOG_JSON_FILE): semua event >= LOG_JSON_LEVEL (default
+#     INFO; DEBUG ikut menulis indikator mentah per pair) tanpa sampling,
+#     diserialisasi dan ditulis oleh thread background dengan buffer besar.
+#     Bisa dicari dengan jq / grep tanpa parsing teks emoji. Jika file log
+#     tidak bisa dibuka, sink JSON dinonaktifkan dan bot tetap jalan.
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+_LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+CONSOLE_LEVEL = _LEVELS.get(os.getenv('LOG_LEVEL', 'INFO').upper(), INFO)
+JSON_LEVEL = _LEVELS.get(os.getenv('LOG_JSON_LEVEL', 'INFO').upper(), INFO)
+JSON_FILE = os.getenv('LOG_JSON_FILE', os.path.join('logs', 'bot.jsonl'))   # '' = nonaktif
+SAMPLE_FIRST = int(os.getenv('LOG_SAMPLE_FIRST', '20'))
+SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '10'))
+JSON_BUFFER_BYTES = 1 << 20
+FLUSH_TIMEOUT = 10          # Detik maksimal menunggu writer JSON saat flush
+
+_COUNTS = {}        # event -> jumlah baris sample=True di siklus ini
+_SUPPRESSED = 0
+_SAMPLE_LOCK = threading.Lock()
+_WRITER = None
+_WRITER_FAILED = False
+_WRITER_LOCK = threading.Lock()
+
+# ==========================================
+# WRITER JSON LINES (BACKGROUND)
+# ==========================================
+def _jsonable(value):
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, (datetime, set, frozenset)):
+        return value.isoformat() if isinstance(value, datetime) else sorted(value)
+    return str(value)
+
+class JsonWriter:
+    def __init__(self, path):
+        # File dibuka di thread pemanggil: gagal buka = exception di sini,
+        # bukan thread writer yang mati diam-diam
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8', buffering=JSON_BUFFER_BYTES)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if isinstance(item, threading.Event):
+                    self.file.flush()
+                    item.set()
+                    continue
+                ts, level, event, fields = item
+                row = {'ts': datetime.fromtimestamp(ts).astimezone().isoformat(timespec='milliseconds'),
+                       'level': LEVEL_NAMES[level], 'event': event, **fields}
+                self.file.write(json.dumps(row, default=_jsonable, ensure_ascii=False) + '\n')
+            except Exception as e:
+                sys.stderr.write(f"⚠️ Gagal menulis log JSON: {e}\n")
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Tunggu semua baris antre ditulis. False jika melewati `timeout` detik."""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+def _writer():
+    """Writer JSON bersama, atau None jika file log tidak bisa dibuka (sink nonaktif)."""
+    global _WRITER, _WRITER_FAILED
+    with _WRITER_LOCK:
+        if _WRITER is None and not _WRITER_FAILED:
+            try:
+                _WRITER = JsonWriter(JSON_FILE)
+            except Exception as e:
+                _WRITER_FAILED = True
+                sys.stderr.write(f"⚠️ Log JSON {JSON_FILE} tidak bisa dibuka, sink JSON dinonaktifkan: {e}\n")
+                return None
+            atexit.register(flush)
+        return _WRITER
+
+# ==========================================
+# API
+# ==========================================
+def _sampled(event):
+    global _SUPPRESSED
+    with _SAMPLE_LOCK:
+        n = _COUNTS.get(event, 0) + 1
+        _COUNTS[event] = n
+        if n <= SAMPLE_FIRST or (n - SAMPLE_FIRST) % SAMPLE_EVERY == 0:
+            return True
+        _SUPPRESSED += 1
+        return False
+
+def log(level, event, template='', sample=False, **fields):
+    """
+    Catat satu event. `template` di-format dengan `fields` hanya untuk konsol;
+    template kosong = event khusus JSON.
+    """
+    if template and level >= CONSOLE_LEVEL and (not sample or _sampled(event)):
+        sys.stdout.write((template.format(**fields) if fields else template) + '\n')
+    if JSON_FILE and level >= JSON_LEVEL:
+        writer = _writer()
+        if writer is not None:
+            writer.put((time.time(), level, event, fields))
+
+def debug(event, template='', sample=False, **fields):
+    log(DEBUG, event, template, sample, **fields)
+
+def info(event, template='', sample=False, **fields):
+    log(INFO, event, template, sample, **fields)
+
+def warning(event, template='', sample=False, **fields):
+    log(WARNING, event, template, sample, **fields)
+
+def error(event, template='', sample=False, **fields):
+    log(ERROR, event, template, sample, **fields)
+
+def start_cycle():
+    """Reset hitungan sampling per siklus."""
+    global _SUPPRESSED
+    _COUNTS.clear()
+    _SUPPRESSED = 0
+
+def suppressed():
+    return _SUPPRESSED
+
+def flush(timeout=FLUSH_TIMEOUT):
+    sys.stdout.flush()
+    if _WRITER is not None and not _WRITER.flush(timeout):
+        sys.stderr.write(f"⚠️ Log JSON belum selesai ditulis setelah {timeout} dtk.\n")
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import threading
+import indicators
+import portfolio_risk
+from http_transport import get_transport
+from state_io import write_json_if_changed
+
+# ==========================================
+# CANDLE STORE 1H -> RESAMPLING 4H & 1D
+# ==========================================
+# Bar 4H dan 1D adalah agregasi persis dari bar 1H (batas sesi UTC Binance:
+# 4H mulai 00/04/08/12/16/20 UTC, 1D mulai 00:00 UTC). Setiap siklus cukup
+# mengambil bar 1H yang sudah close dari klines exchange; bar 4H/1D yang
+# sedang berjalan (partial) diperbarui dari bar 1H tersebut, dan saat bucket
+# berganti, partial di-"close" ke state indikator inkremental.
+#
+# Hanya state indikator + bar partial yang disimpan (bukan riwayat mentah),
+# jadi ukuran file tetap kecil walau EMA200 1D butuh ratusan hari data.
+# Close setiap bar 1H yang di-ingest juga diteruskan ke portfolio_risk
+# sebagai return per jam untuk korelasi antar pair.
+CANDLE_FILE = 'candle_store.json'
+BINANCE_KLINES_URL = 'https://data-api.binance.vision/api/v3/klines'  # Endpoint publik, tidak diblokir di runner US
+BOOTSTRAP_LIMIT = 1000
+HOUR_MS = 3600 * 1000
+TF_MS = {'4h': 4 * HOUR_MS, '1d': 24 * HOUR_MS}
+
+# CANDLES[pair] = {
+#   'last_1h': open time (ms) bar 1H terakhir yang sudah di-ingest,
+#   '4h' / '1d': {'state': state indikator bar yang sudah close,
+#                 'closed_start': open time bar terakhir di state,
+#                 'partial': [start, open, high, low, close, volume] atau None}
+# }
+CANDLES = {}
+_LOCK = threading.Lock()
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_candles():
+    global CANDLES
+    if os.path.exists(CANDLE_FILE):
+        try:
+            with open(CANDLE_FILE, 'r') as f:
+                CANDLES = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat candle store: {e}")
+            CANDLES = {}
+    else:
+        CANDLES = {}
+
+def save_candles():
+    try:
+        with _LOCK:
+            write_json_if_changed(CANDLE_FILE, CANDLES, indent=None)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan candle store: {e}")
+
+# ==========================================
+# KLINES EXCHANGE
+# ==========================================
+def fetch_klines(pair, interval, start_ms=None, limit=BOOTSTRAP_LIMIT):
+    """Klines Binance -> list (open_ms, open, high, low, close, volume, close_ms)."""
+    params = {'symbol': pair, 'interval': interval, 'limit': limit}
+    if start_ms is not None:
+        params['startTime'] = start_ms
+    response = get_transport().get(BINANCE_KLINES_URL, params=params)
+    response.raise_for_status()
+    return [
+        (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6]))
+        for k in response.json()
+    ]
+
+# ==========================================
+# RESAMPLING
+# ==========================================
+def _new_tf(state=None, closed_start=None):
+    return {'state': state or indicators.new_state(), 'closed_start': closed_start, 'partial': None}
+
+def _ingest_1h(tf_entry, tf, bar):
+    """Gabungkan satu bar 1H yang sudah close ke bar partial timeframe `tf`."""
+    open_ms, o, h, l, c, v = bar[:6]
+    bucket = open_ms - open_ms % TF_MS[tf]
+    if tf_entry['closed_start'] is not None and bucket <= tf_entry['closed_start']:
+        return  # Sudah termasuk dalam bar yang close dari bootstrap
+    partial = tf_entry['partial']
+    if partial and partial[0] != bucket:
+        # Bucket berganti: bar partial sebelumnya resmi close
+        tf_entry['state'] = indicators.step(tf_entry['state'], partial[1:])
+        tf_entry['closed_start'] = partial[0]
+        partial = None
+    if partial is None:
+        tf_entry['partial'] = [bucket, o, h, l, c, v]
+    else:
+        partial[2] = max(partial[2], h)
+        partial[3] = min(partial[3], l)
+        partial[4] = c
+        partial[5] += v
+
+def bootstrap_pair(pair, now_ms):
+    """
+    Seed state 4H/1D dari klines historis (sekali per pair), lalu bangun bar
+    partial dari bar 1H yang sudah close sejak awal hari UTC. Bar 1H mulai
+    RETURNS_WINDOW jam terakhir ikut diambil untuk return korelasi; bar yang
+    sudah masuk bar 4H/1D yang close dilewati _ingest_1h.
+    """
+    entry = {}
+    for tf in TF_MS:
+        closed = [k for k in fetch_klines(pair, tf) if k[6] < now_ms]
+        tf_entry = _new_tf()
+        for k in closed:
+            tf_entry['state'] = indicators.step(tf_entry['state'], k[1:6])
+            tf_entry['closed_start'] = k[0]
+        entry[tf] = tf_entry
+
+    day_start = now_ms - now_ms % TF_MS['1d']
+    returns_start = now_ms - now_ms % HOUR_MS - (portfolio_risk.RETURNS_WINDOW + 1) * HOUR_MS
+    entry['last_1h'] = min(day_start, returns_start) - HOUR_MS
+    _sync_1h(pair, entry, now_ms)
+    return entry
+
+def _sync_1h(pair, entry, now_ms):
+    rows = fetch_klines(pair, '1h', start_ms=entry['last_1h'] + HOUR_MS)
+    for k in rows:
+        if k[6] >= now_ms:
+            break  # Bar 1H yang sedang berjalan belum close
+        for tf in TF_MS:
+            _ingest_1h(entry[tf], tf, k)
+        portfolio_risk.record_close(pair, k[4], k[0] // HOUR_MS)
+        entry['last_1h'] = k[0]
+
+def sync_pair(pair, now_ms=None):
+    """
+    Perbarui candle store satu pair. Bootstrap jika belum ada atau jeda terlalu
+    panjang. Mengembalikan True jika state 4H/1D siap dipakai.
+    """
+    now_ms = now_ms or int(time.time() * 1000)
+    try:
+        entry = CANDLES.get(pair)
+        if entry is None or now_ms - entry['last_1h'] > BOOTSTRAP_LIMIT * HOUR_MS:
+            entry = bootstrap_pair(pair, now_ms)
+            if not all(entry[tf]['state']['n'] for tf in TF_MS):
+                return False  # Tidak ada riwayat klines, bootstrap diulang di run berikutnya
+        else:
+            _sync_1h(pair, entry, now_ms)
+        with _LOCK:
+            CANDLES[pair] = entry
+        return True
+    except Exception as e:
+        print(f"⚠️ Gagal sinkron candle {pair}: {e}")
+        return False
+
+def sync_pairs(pairs):
+    """Sinkron paralel. Mengembalikan set pair yang state 4H/1D-nya siap."""
+    now_ms = int(time.time() * 1000)
+    results = get_transport().map(lambda p: sync_pair(p, now_ms), pairs)
+    return {p for p, ok in zip(pairs, results) if ok}
+
+# ==========================================
+# INDIKATOR TIMEFRAME TINGGI
+# ==========================================
+def get_indicators(pair, tf, live_close=None, now_ms=None):
+    """
+    Indikator `tf` untuk bar yang sedang berjalan: bar partial (gabungan 1H
+    yang sudah close) ditambah harga live dari bar 1H saat ini.
+    Jika bar 1H live sudah masuk bucket baru (mis. 04:xx untuk 4H), partial
+    lama sudah lengkap: partial itu di-close ke state dan bar berjalan
+    dimulai dari harga live saja. Jika bar 1H terakhir bucket lama belum
+    di-ingest (prefetch tepat sebelum boundary), close-nya diwakili harga live.
+    """
+    entry = CANDLES.get(pair)
+    if not entry or tf not in entry:
+        return None
+    tf_entry = entry[tf]
+    state, partial = tf_entry['state'], tf_entry['partial']
+    now_ms = now_ms or int(time.time() * 1000)
+    live_start = now_ms - now_ms % HOUR_MS
+    if partial and live_start - live_start % TF_MS[tf] > partial[0]:
+        _, o, h, l, c, v = partial
+        if live_close and entry['last_1h'] + HOUR_MS < live_start:
+            h, l, c = max(h, live_close), min(l, live_close), live_close
+        state = indicators.step(state, (o, h, l, c, v))
+        partial = None
+    if partial:
+        _, o, h, l, c, v = partial
+    else:
+        o = h = l = c = live_close
+        v = 0.0
+    if live_close:
+        h, l, c = max(h, live_close), min(l, live_close), live_close
+    if c is None:
+        return None
+    return indicators.to_indicators(indicators.step(state, (o, h, l, c, v)))
+
+def closed_indicators(pair, tf, now_ms=None, complete=True):
+    """
+    Indikator `tf` sampai bar terakhir yang sudah close (tanpa bar berjalan),
+    mis. regime makro dari candle 1D kemarin. None jika bar itu belum lengkap
+    di-ingest (bar 1H terakhirnya belum close / belum disinkron).
+    complete=False: bar lampau yang belum lengkap tetap dipakai apa adanya
+    (nilai terakhir yang diketahui, mis. pair yang belum jadwal scan).
+    """
+    entry = CANDLES.get(pair)
+    if not entry or tf not in entry:
+        return None
+    tf_entry = entry[tf]
+    state, partial = tf_entry['state'], tf_entry['partial']
+    now_ms = now_ms or int(time.time() * 1000)
+    current = now_ms - now_ms % TF_MS[tf]
+    if partial and partial[0] < current:
+        if complete and entry['last_1h'] < current - HOUR_MS:
+            return None
+        state = indicators.step(state, partial[1:])
+    return indicators.to_indicators(state) if state['n'] else None
@@ -0,0 +1,230 @@
+import os
+import json
+from datetime import datetime
+import candle_store
+from state_io import write_json_if_changed
+
+# ==========================================
+# ANALISIS EKSKURSI TRADE (MAE / MFE)
+# ==========================================
+# trade_history.json hanya menyimpan harga & waktu entry/exit. Untuk menilai
+# ATR_SL_MULTIPLIER, BREAK_EVEN_ATR_MULTIPLIER dan ATR_TRAIL_DISTANCE perlu
+# jalur harga di dalam trade, jadi setiap trade digabung dengan bar 1H
+# (high/low/close) yang disimpan di trade_candles.json:
+#   - MAE / MFE: ekskursi terburuk / terbaik dari harga entry, dalam satuan ATR
+#   - time to peak: jam dari bar entry sampai high tertinggi
+#   - giveback: jarak high tertinggi ke harga exit, dalam ATR
+# ATR memakai entry_atr dari trade (trade baru) atau ATR14 1H (RMA, sama
+# dengan TradingView) yang dihitung dari bar sebelum entry.
+#
+# Semua trade dihitung sekaligus dengan NumPy: bar semua pair disusun jadi
+# satu array datar, tiap trade menjadi satu baris matriks index
+# [bar entry .. bar exit] (dipad dan di-mask), lalu max/min/argmax per baris.
+# Bar entry ikut dihitung penuh, jadi high/low sebelum jam entry di bar itu
+# juga masuk (pendekatan resolusi 1H).
+TRADE_CANDLES_FILE = 'trade_candles.json'
+HOUR_MS = candle_store.HOUR_MS
+ATR_LENGTH = 14
+ATR_WARMUP_BARS = 50            # Bar sebelum entry untuk ATR14 (RMA butuh warm-up)
+FETCH_LIMIT = 1000
+
+# CANDLES[pair] = [[open_ms, high, low, close], ...] urut waktu, tanpa duplikat
+CANDLES = {}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_trade_candles():
+    global CANDLES
+    CANDLES = {}
+    if os.path.exists(TRADE_CANDLES_FILE):
+        try:
+            with open(TRADE_CANDLES_FILE, 'r') as f:
+                CANDLES = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat candle trade: {e}")
+            CANDLES = {}
+
+def save_trade_candles():
+    try:
+        write_json_if_changed(TRADE_CANDLES_FILE, CANDLES, indent=None)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan candle trade: {e}")
+
+# ==========================================
+# SINKRONISASI BAR 1H PER TRADE
+# ==========================================
+def _hour_ms(iso):
+    return int(datetime.fromisoformat(iso).timestamp() * 1000) // HOUR_MS * HOUR_MS
+
+def trade_window(trade):
+    """(bar pertama warm-up ATR, bar entry, bar exit) dalam open time ms."""
+    entry = _hour_ms(trade['entry_date'])
+    return entry - ATR_WARMUP_BARS * HOUR_MS, entry, _hour_ms(trade['exit_date'])
+
+def _missing_spans(pair, windows):
+    """Rentang jam yang belum ada di CANDLES[pair], digabung per span berurutan."""
+    have = {bar[0] for bar in CANDLES.get(pair, [])}
+    spans = []
+    for start, _, end in sorted(windows):
+        hour = start
+        while hour <= end:
+            if hour not in have:
+                if spans and spans[-1][1] >= hour - HOUR_MS:
+                    spans[-1][1] = max(spans[-1][1], hour)
+                else:
+                    spans.append([hour, hour])
+            hour += HOUR_MS
+    return spans
+
+def sync_trade_candles(trades):
+    """
+    Ambil bar 1H yang belum tersimpan untuk semua trade (hanya rentang yang
+    hilang). Mengembalikan jumlah bar baru.
+    """
+    windows = {}
+    for trade in trades:
+        windows.setdefault(trade['pair'], []).append(trade_window(trade))
+    added = 0
+    for pair, pair_windows in windows.items():
+        spans = _missing_spans(pair, pair_windows)
+        if not spans:
+            continue
+        bars = {bar[0]: bar for bar in CANDLES.get(pair, [])}
+        for start, end in spans:
+            cursor = start
+            while cursor <= end:
+                try:
+                    rows = candle_store.fetch_klines(pair, '1h', start_ms=cursor, limit=FETCH_LIMIT)
+                except Exception as e:
+                    print(f"⚠️ Gagal mengambil bar 1H {pair}: {e}")
+                    break
+                rows = [k for k in rows if k[0] <= end]
+                if not rows:
+                    break
+                for k in rows:
+                    if k[0] not in bars:
+                        added += 1
+                    bars[k[0]] = [k[0], k[2], k[3], k[4]]
+                cursor = rows[-1][0] + HOUR_MS
+        CANDLES[pair] = [bars[t] for t in sorted(bars)]
+    return added
+
+# ==========================================
+# ANALISIS (VEKTOR)
+# ==========================================
+def analyze(trades):
+    """
+    MAE/MFE semua trade sekaligus. Mengembalikan dict array NumPy
+    (satu elemen per trade, NaN jika bar tidak tersedia):
+    'mae_atr', 'mfe_atr', 'hours_to_peak', 'giveback_atr', 'pnl_atr', 'atr', 'bars'.
+    """
+    import numpy as np
+
+    names = ('mae_atr', 'mfe_atr', 'hours_to_peak', 'giveback_atr', 'pnl_atr', 'atr', 'bars')
+    n = len(trades)
+    pairs = sorted({t['pair'] for t in trades})
+    pair_id = {p: i for i, p in enumerate(pairs)}
+
+    # Bar semua pair dalam satu array datar, urut (pair, waktu)
+    chunks = [np.asarray(CANDLES.get(p) or np.empty((0, 4)), dtype=float).reshape(-1, 4) for p in pairs]
+    if not sum(len(c) for c in chunks):
+        return {name: np.full(n, np.nan) for name in names}
+    owner = np.concatenate([np.full(len(c), i, dtype=np.int64) for i, c in enumerate(chunks)])
+    flat = np.concatenate(chunks)
+    last = len(flat) - 1
+    times, high, low, close = flat[:, 0].astype(np.int64), flat[:, 1], flat[:, 2], flat[:, 3]
+    key = (owner << 42) | times           # open time ms < 2^42
+
+    # True range per bar; bar pertama tiap pair (tanpa close sebelumnya) = high - low
+    prev_close = np.roll(close, 1)
+    first = np.ones(len(flat), dtype=bool)
+    first[1:] = owner[1:] != owner[:-1]
+    prev_close[first] = close[first]
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    tid = np.array([pair_id[t['pair']] for t in trades], dtype=np.int64)
+    win = np.array([trade_window(t) for t in trades], dtype=np.int64).reshape(n, 3)
+    entry = np.array([t['entry_price'] for t in trades], dtype=float)
+    exit_price = np.array([t['exit_price'] for t in trades], dtype=float)
+    start = np.searchsorted(key, (tid << 42) | win[:, 1])
+    stop = np.searchsorted(key, (tid << 42) | win[:, 2], side='right')
+    has_entry_bar = key[np.minimum(start, last)] == ((tid << 42) | win[:, 1])
+    length = np.where(has_entry_bar, stop - start, 0)
+
+    # Matriks index [trade, bar ke-j sejak entry], di-mask setelah bar exit
+    width = max(int(length.max()), 1)
+    idx = np.clip(start[:, None] + np.arange(width)[None, :], 0, last)
+    mask = np.arange(width)[None, :] < length[:, None]
+    peak_matrix = np.where(mask, high[idx], -np.inf)
+    trough_matrix = np.where(mask, low[idx], np.inf)
+    peak = peak_matrix.max(axis=1)
+    trough = trough_matrix.min(axis=1)
+    hours_to_peak = peak_matrix.argmax(axis=1).astype(float)
+
+    # ATR14 (RMA) pada bar sebelum entry, kecuali trade sudah menyimpan entry_atr
+    stored_atr = np.array([t.get('entry_atr') or np.nan for t in trades], dtype=float)
+    warm_idx = start[:, None] - ATR_WARMUP_BARS + np.arange(ATR_WARMUP_BARS)[None, :]
+    warm_ok = (warm_idx >= 0) & (owner[np.clip(warm_idx, 0, last)] == tid[:, None])
+    warm_tr = np.where(warm_ok, tr[np.clip(warm_idx, 0, last)], np.nan)
+    atr = np.full(n, np.nan)
+    for j in range(ATR_WARMUP_BARS):
+        col = warm_tr[:, j]
+        atr = np.where(np.isnan(atr), col, np.where(np.isnan(col), atr, atr + (col - atr) / ATR_LENGTH))
+    enough = warm_ok.sum(axis=1) >= ATR_LENGTH
+    atr = np.where(np.isnan(stored_atr), np.where(enough, atr, np.nan), stored_atr)
+
+    valid = (length > 0) & (atr > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = (
+            np.maximum(entry - trough, 0) / atr,
+            np.maximum(peak - entry, 0) / atr,
+            hours_to_peak,
+            np.maximum(peak - exit_price, 0) / atr,
+            (exit_price - entry) / atr,
+            atr,
+            length.astype(float),
+        )
+    return {name: np.where(valid, value, np.nan) for name, value in zip(names, values)}
+
+# ==========================================
+# RINGKASAN
+# ==========================================
+def summarize(trades, result, sl_mult, be_mult, trail_mult):
+    """Baris ringkasan + cek parameter exit dari hasil analyze()."""
+    import numpy as np
+
+    valid = ~np.isnan(result['mfe_atr'])
+    if not valid.any():
+        return ["ℹ️ Tidak ada trade dengan bar 1H yang cukup untuk dianalisis."]
+    reasons = np.array([t.get('exit_reason', '-') for t in trades])
+    mae, mfe = result['mae_atr'][valid], result['mfe_atr'][valid]
+    giveback, pnl = result['giveback_atr'][valid], result['pnl_atr'][valid]
+    hours, reasons = result['hours_to_peak'][valid], reasons[valid]
+
+    def q(values, p):
+        return float(np.percentile(values, p)) if len(values) else float('nan')
+
+    lines = [
+        f"📐 {int(valid.sum())}/{len(trades)} trade dianalisis (satuan ATR 1H saat entry)",
+        f"   MAE  p50 {q(mae, 50):.2f} | p75 {q(mae, 75):.2f} | p90 {q(mae, 90):.2f}",
+        f"   MFE  p50 {q(mfe, 50):.2f} | p75 {q(mfe, 75):.2f} | p90 {q(mfe, 90):.2f}",
+        f"   Time to peak p50 {q(hours, 50):.0f} jam | Giveback p50 {q(giveback, 50):.2f} | PnL p50 {q(pnl, 50):+.2f}",
+    ]
+
+    winners = pnl > 0
+    if winners.any():
+        lines.append(f"   SL {sl_mult}x ATR: MAE p90 trade profit {q(mae[winners], 90):.2f} ATR "
+                     f"({np.mean(mae[winners] >= sl_mult) * 100:.0f}% profit menyentuh jarak SL)")
+    stopped = reasons == 'STOP_LOSS'
+    if stopped.any():
+        lines.append(f"   Stop loss: {np.mean(mfe[stopped] >= be_mult) * 100:.0f}% sempat profit >= {be_mult} ATR sebelum kena SL")
+    reached_be = mfe >= be_mult
+    if reached_be.any():
+        lines.append(f"   Break even {be_mult}x ATR: dicapai {np.mean(reached_be) * 100:.0f}% trade, "
+                     f"{np.mean(pnl[reached_be] <= 0) * 100:.0f}% di antaranya ditutup <= entry")
+    trailed = reasons == 'TRAILING_STOP'
+    if trailed.any():
+        lines.append(f"   Trailing {trail_mult}x ATR: giveback p50 {q(giveback[trailed], 50):.2f} ATR, "
+                     f"capture p50 {q(pnl[trailed] / np.maximum(mfe[trailed], 1e-9), 50) * 100:.0f}% dari MFE")
+    return lines
@@ -0,0 +1,321 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# ==========================================
+# KONFIGURASI TRANSPORT HTTP BERSAMA
+# ==========================================
+# Satu transport dipakai semua entry point (scan TradingView, CMC/CoinGecko,
+# Telegram). Per host ada: pool koneksi keep-alive, limiter konkurensi AIMD,
+# dan circuit breaker. `requests` baru di-import saat session pertama dibuat.
+DEFAULT_TIMEOUT = 10
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5              # Detik, backoff eksponensial dengan full jitter
+BACKOFF_CAP = 8.0
+
+AIMD_START = 4                  # Konkurensi awal per host
+AIMD_MIN = 1
+AIMD_MAX = 16
+AIMD_DECREASE = 0.5             # Limit dikali faktor ini saat 429/timeout
+
+BREAKER_FAILURES = 5            # Gagal berturut-turut sebelum breaker terbuka
+BREAKER_COOLDOWN = 30.0         # Detik breaker terbuka sebelum half-open
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Method lain (POST, mis. sendMessage Telegram) tidak di-retry setelah read
+# timeout: server mungkin sudah memproses request, kirim ulang = pesan dobel
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Host scanner TradingView (payload sama dengan tradingview_ta, dikirim lewat transport)
+TV_SCANNER_HOST = 'scanner.tradingview.com'
+
+LATENCY_SAMPLES = 20000         # Sampel latensi terakhir per host untuk report()
+
+# Arahkan host ke base URL lain, mis. server stub load test:
+#   HTTP_HOST_OVERRIDES="data-api.binance.vision=http://127.0.0.1:8765,api.telegram.org=http://127.0.0.1:8765"
+# Limiter/breaker tetap memakai nama host asli.
+HOST_OVERRIDES = dict(
+    item.split('=', 1) for item in os.getenv('HTTP_HOST_OVERRIDES', '').split(',') if '=' in item
+)
+
+def set_host_override(host, base_url):
+    HOST_OVERRIDES[host] = base_url.rstrip('/')
+
+def resolve_url(url):
+    parsed = urlparse(url)
+    base = HOST_OVERRIDES.get(parsed.netloc)
+    if not base:
+        return url
+    return base.rstrip('/') + url[len(f"{parsed.scheme}://{parsed.netloc}"):]
+
+
+class TransportError(Exception):
+    """Request gagal setelah semua retry, atau ditolak oleh circuit breaker."""
+
+
+class PermanentError(Exception):
+    """Error yang tidak perlu di-retry (mis. simbol tidak ditemukan)."""
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP status code: {response.status_code}")
+        self.status_code = response.status_code
+        retry_after = response.headers.get('Retry-After') if response.headers else None
+        try:
+            self.retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            self.retry_after = None
+
+
+# ==========================================
+# LIMITER KONKURENSI AIMD
+# ==========================================
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease: setiap sukses menambah limit
+    ~1 per "window" (1/limit per request), setiap 429/timeout memotong limit.
+    """
+
+    def __init__(self, start=AIMD_START, minimum=AIMD_MIN, maximum=AIMD_MAX):
+        self.limit = float(start)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.inflight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self, overloaded=False):
+        with self._cond:
+            self.inflight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit * AIMD_DECREASE)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+# ==========================================
+# CIRCUIT BREAKER PER HOST
+# ==========================================
+class CircuitBreaker:
+    """
+    Terbuka setelah `failures` gagal berturut-turut. Setelah cooldown
+    (half-open) hanya SATU request percobaan yang diizinkan; request lain
+    tetap ditolak sampai percobaan itu sukses (breaker tertutup) atau gagal
+    (breaker terbuka lagi untuk satu cooldown).
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def record(self, success):
+        with self._lock:
+            self.trial = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+# ==========================================
+# TRANSPORT
+# ==========================================
+class _Host:
+    def __init__(self):
+        self.limiter = AIMDLimiter()
+        self.breaker = CircuitBreaker()
+        self.session = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+
+class Transport:
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _Host()
+            return self._hosts[host]
+
+    def _session(self, state):
+        if state.session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AIMD_MAX)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            state.session = session
+        return state.session
+
+    @staticmethod
+    def _sleep_backoff(attempt, retry_after=None):
+        if retry_after is not None:
+            delay = min(retry_after, BACKOFF_CAP)
+        else:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+        time.sleep(delay)
+
+    def call(self, host, fn, *args, retries=MAX_RETRIES, retry_if=None, **kwargs):
+        """
+        Jalankan `fn` (request HTTP apa pun ke `host`) di bawah limiter, breaker
+        dan retry host tersebut. Dipakai juga untuk library yang melakukan
+        request sendiri (tanpa keep-alive transport). `retry_if(error)`
+        (opsional) = False jika error itu tidak boleh di-retry.
+        """
+        state = self._host(host)
+        last_error = None
+        for attempt in range(retries + 1):
+            if not state.breaker.allow():
+                raise TransportError(f"Circuit breaker {host} terbuka")
+            state.limiter.acquire()
+            overloaded = False
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+                state.breaker.record(True)
+                state.latencies.append(time.monotonic() - start)
+                state.calls += 1
+                return result
+            except PermanentError:
+                state.breaker.record(True)
+                raise
+            except Exception as e:
+                last_error = e
+                overloaded = is_overload_error(e)
+                if is_permanent_error(e):
+                    state.breaker.record(True)
+                    raise PermanentError(str(e)) from e
+                state.breaker.record(False)
+            finally:
+                state.limiter.release(overloaded)
+            if retry_if is not None and not retry_if(last_error):
+                break
+            if attempt < retries:
+                state.retries += 1
+                self._sleep_backoff(attempt, getattr(last_error, 'retry_after', None))
+        state.failures += 1
+        raise TransportError(f"{host}: {last_error}") from last_error
+
+    def request(self, method, url, retries=MAX_RETRIES, idempotent=None, **kwargs):
+        """
+        Request HTTP lewat session keep-alive milik host. 429/5xx di-retry;
+        method non-idempoten tidak di-retry setelah read timeout.
+        `idempotent=True` untuk POST yang hanya membaca (mis. query scanner
+        TradingView), sehingga aman dikirim ulang.
+        """
+        host = urlparse(url).netloc
+        state = self._host(host)
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+        target = resolve_url(url)
+
+        def send():
+            response = self._session(state).request(method, target, **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise HTTPStatusError(response)
+            return response
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_if = None if idempotent else _safe_to_resend
+        return self.call(host, send, retries=retries, retry_if=retry_if)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def map(self, fn, items, workers=AIMD_MAX):
+        """
+        Jalankan `fn(item)` untuk semua item secara paralel. Konkurensi efektif
+        tetap dibatasi limiter AIMD di dalam `call()`, jadi thread pool hanya
+        menyediakan slot maksimum.
+        """
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+
+    def report(self):
+        """
+        Statistik per host sejak proses dimulai: {host: {'calls', 'retries',
+        'failures', 'p50', 'p95', 'p99'}} (latensi dalam detik, request sukses).
+        """
+        with self._lock:
+            hosts = dict(self._hosts)
+        stats = {}
+        for host, state in sorted(hosts.items()):
+            samples = sorted(state.latencies)
+            stats[host] = {'calls': state.calls, 'retries': state.retries, 'failures': state.failures,
+                           **{f"p{int(q * 100)}": _percentile(samples, q) for q in (0.5, 0.95, 0.99)}}
+        return stats
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+def is_overload_error(e):
+    """429 atau timeout menandakan upstream kewalahan -> limiter harus mundur."""
+    if getattr(e, 'status_code', None) == 429:
+        return True
+    text = f"{type(e).__name__} {e}".lower()
+    return '429' in text or 'timeout' in text or 'timed out' in text
+
+def is_read_timeout(e):
+    """Timeout saat menunggu respons: request mungkin sudah diproses server."""
+    text = f"{type(e).__name__} {e}".lower()
+    return 'readtimeout' in text or 'read timed out' in text
+
+def _safe_to_resend(e):
+    return not is_read_timeout(e)
+
+def is_permanent_error(e):
+    """Simbol/exchange tidak dikenal TradingView: retry tidak akan membantu."""
+    return 'not found' in str(e).lower()
+
+
+_TRANSPORT = None
+_TRANSPORT_LOCK = threading.Lock()
+
+def get_transport():
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        if _TRANSPORT is None:
+            _TRANSPORT = Transport()
+        return _TRANSPORT
@@ -0,0 +1,96 @@
+from records import Indicators
+
+# ==========================================
+# INDIKATOR INKREMENTAL (GAYA TRADINGVIEW)
+# ==========================================
+# State indikator per timeframe hanya berisi beberapa skalar (nilai EMA/RMA
+# terakhir, close/high/low sebelumnya, 20 volume terakhir), jadi satu bar baru
+# cukup di-"step" tanpa menghitung ulang seluruh riwayat.
+#
+# step() bersifat murni (mengembalikan dict baru), sehingga nilai untuk bar
+# yang masih berjalan bisa dihitung dengan step(state, partial_bar) tanpa
+# mengubah state bar yang sudah close.
+#
+# Catatan: EMA/RMA di-seed dengan nilai pertama (bukan SMA seperti Pine),
+# selisihnya hilang setelah beberapa ratus bar warm-up.
+
+EMA_LENGTHS = (10, 20, 50, 200)
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_LENGTH = 14
+ATR_LENGTH = 14
+ADX_LENGTH = 14
+VOLUME_SMA_LENGTH = 20
+
+
+def _ema(prev, x, length):
+    return x if prev is None else prev + (x - prev) * 2 / (length + 1)
+
+def _rma(prev, x, length):
+    return x if prev is None else prev + (x - prev) / length
+
+def new_state():
+    return {'n': 0}
+
+def step(state, bar):
+    """Masukkan satu bar (open, high, low, close, volume), kembalikan state baru."""
+    _, high, low, close, volume = bar
+    s = dict(state)
+    prev_close = s.get('close')
+
+    for length in EMA_LENGTHS:
+        s[f'ema{length}'] = _ema(s.get(f'ema{length}'), close, length)
+    s['ema_fast'] = _ema(s.get('ema_fast'), close, MACD_FAST)
+    s['ema_slow'] = _ema(s.get('ema_slow'), close, MACD_SLOW)
+    s['macd_signal'] = _ema(s.get('macd_signal'), s['ema_fast'] - s['ema_slow'], MACD_SIGNAL)
+
+    if prev_close is None:
+        s['atr'] = high - low
+    else:
+        change = close - prev_close
+        s['avg_gain'] = _rma(s.get('avg_gain'), max(change, 0.0), RSI_LENGTH)
+        s['avg_loss'] = _rma(s.get('avg_loss'), max(-change, 0.0), RSI_LENGTH)
+
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        up = high - s['high']
+        down = s['low'] - low
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        s['atr'] = _rma(s.get('atr'), true_range, ATR_LENGTH)
+        s['plus_dm'] = _rma(s.get('plus_dm'), plus_dm, ADX_LENGTH)
+        s['minus_dm'] = _rma(s.get('minus_dm'), minus_dm, ADX_LENGTH)
+        if s['atr'] > 0:
+            plus_di = 100 * s['plus_dm'] / s['atr']
+            minus_di = 100 * s['minus_dm'] / s['atr']
+            di_sum = plus_di + minus_di
+            dx = 100 * abs(plus_di - minus_di) / di_sum if di_sum > 0 else 0.0
+            s['adx'] = _rma(s.get('adx'), dx, ADX_LENGTH)
+
+    s['close'], s['high'], s['low'] = close, high, low
+    s['volumes'] = (s.get('volumes') or [])[-(VOLUME_SMA_LENGTH - 1):] + [volume]
+    s['n'] += 1
+    return s
+
+def to_indicators(s):
+    """Konversi state ke record Indicators yang dipakai scoring."""
+    avg_gain, avg_loss = s.get('avg_gain'), s.get('avg_loss')
+    if avg_gain is None or avg_loss is None:
+        rsi = 50.0
+    elif avg_loss == 0:
+        rsi = 100.0
+    else:
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    volumes = s.get('volumes') or [0.0]
+    return Indicators(
+        close=s.get('close', 0.0),
+        ema10=s.get('ema10', 0.0),
+        ema20=s.get('ema20', 0.0),
+        ema50=s.get('ema50', 0.0),
+        ema200=s.get('ema200', 0.0),
+        macd=s.get('ema_fast', 0.0) - s.get('ema_slow', 0.0),
+        macd_signal=s.get('macd_signal', 0.0),
+        rsi=rsi,
+        adx=s.get('adx', 0.0),
+        atr=s.get('atr', 0.0),
+        volume=volumes[-1],
+        average_volume=sum(volumes) / len(volumes),
+    )
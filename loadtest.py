@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import synthetic_market
+
+# ==========================================
+# LOAD TEST LOKAL (5.000 - 10.000 PAIR)
+# ==========================================
+# Server stub lokal meniru endpoint yang dipakai bot, dengan data dari
+# synthetic_market.py:
+#   - POST /<screener>/scan          scanner TradingView (market_data.scan_tradingview)
+#   - GET  /api/v3/klines            klines Binance (candle store & failover)
+#   - GET  /api/v3/ticker/price      snapshot harga bulk
+#   - GET  /api/v3/exchangeInfo      daftar simbol (universe)
+#   - GET  /api/v3/global            dominance BTC CoinGecko
+#   - POST /bot<token>/sendMessage   Telegram
+# Setiap request diberi latensi lognormal (median LATENCY_MS, ekor panjang)
+# dan error yang bisa diatur: 503 (ERROR_RATE) dan 429 + Retry-After
+# (THROTTLE_RATE).
+#
+# Driver menjalankan signal_bot.main() di direktori kerja sementara dengan
+# universe sintetis, semua host diarahkan ke stub lewat
+# http_transport.HOST_OVERRIDES, lalu melaporkan throughput, latensi ekor per
+# host dan memori puncak. Stub berjalan di proses terpisah (beberapa proses
+# berbagi port dengan SO_REUSEPORT) agar CPU dan memori stub tidak ikut
+# terukur sebagai milik bot.
+STUB_HOST = '127.0.0.1'
+STUB_PORT = 8765
+LATENCY_MS = 80
+LATENCY_SIGMA = 0.6             # Sebaran lognormal: p99 ~ 4x median
+ERROR_RATE = 0.01
+THROTTLE_RATE = 0.005
+SEED = 7
+SCANNER_BARS = 300              # Bar per timeframe untuk indikator scanner (warm-up EMA200)
+
+# Host asli -> diarahkan ke stub
+STUB_HOSTS = ('data-api.binance.vision', 'api.telegram.org', 'api.coingecko.com', 'scanner.tradingview.com')
+
+# Kolom scanner TradingView -> field Indicators
+SCANNER_FIELDS = {
+    'close': 'close', 'EMA10': 'ema10', 'EMA20': 'ema20', 'EMA50': 'ema50', 'EMA200': 'ema200',
+    'MACD.macd': 'macd', 'MACD.signal': 'macd_signal', 'RSI': 'rsi', 'RSI[1]': 'rsi',
+    'ADX': 'adx', 'ATR': 'atr', 'Volume': 'volume', 'volume': 'volume', 'average_volume': 'average_volume',
+}
+SCANNER_INTERVALS = {'60': '1h', '240': '4h', '': '1d'}
+
+
+# ==========================================
+# SERVER STUB
+# ==========================================
+class StubConfig:
+    def __init__(self, pairs, latency_ms=LATENCY_MS, error_rate=ERROR_RATE, throttle_rate=THROTTLE_RATE, seed=SEED):
+        self.pairs = synthetic_market.pair_names(pairs)
+        self.known = set(self.pairs)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.indicators = {}        # (pair, interval) -> Indicators, dihitung sekali per proses
+        self.lock = threading.Lock()
+
+    def scanner_values(self, pair, interval):
+        key = (pair, interval)
+        with self.lock:
+            cached = self.indicators.get(key)
+        if cached is None:
+            rows = synthetic_market.generate(pair, interval, SCANNER_BARS, seed=self.seed)
+            cached = synthetic_market.to_indicators(rows)
+            with self.lock:
+                self.indicators[key] = cached
+        return cached
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self):
+        """Latensi + error sintetis. True jika request sudah dijawab dengan error."""
+        config = self.config
+        if config.latency_ms > 0:
+            time.sleep(random.lognormvariate(math.log(config.latency_ms / 1000), LATENCY_SIGMA))
+        roll = random.random()
+        if roll < config.throttle_rate:
+            self._reply(429, {'msg': 'Too many requests'}, {'Retry-After': '1'})
+            return True
+        if roll < config.throttle_rate + config.error_rate:
+            self._reply(503, {'msg': 'Service unavailable'})
+            return True
+        return False
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self._inject():
+            return
+        config = self.config
+        if url.path == '/api/v3/klines':
+            pair = query.get('symbol')
+            if pair not in config.known:
+                return self._reply(400, {'code': -1121, 'msg': 'Invalid symbol.'})
+            interval = query.get('interval', '1h')
+            limit = int(query.get('limit', 500))
+            bars = limit
+            if 'startTime' in query:
+                # Seperti Binance: bar mulai dari startTime, maksimal `limit`
+                step_ms = synthetic_market.INTERVAL_SECONDS[interval] * 1000
+                bars = max(0, int(time.time() * 1000) // step_ms - int(query['startTime']) // step_ms + 1)
+            rows = synthetic_market.generate(pair, interval, bars, seed=config.seed)
+            if 'startTime' in query:
+                rows = [r for r in rows if r[0] >= int(query['startTime'])][:limit]
+            return self._reply(200, [[r[0], *map(str, r[1:6]), r[6]] for r in rows])
+        if url.path == '/api/v3/ticker/price':
+            return self._reply(200, [{'symbol': p, 'price': str(synthetic_market.anchor_price(p, config.seed))}
+                                     for p in config.pairs])
+        if url.path == '/api/v3/exchangeInfo':
+            return self._reply(200, {'symbols': [
+                {'symbol': p, 'baseAsset': p[:-len(synthetic_market.QUOTE_ASSET)],
+                 'quoteAsset': synthetic_market.QUOTE_ASSET, 'status': 'TRADING', 'isSpotTradingAllowed': True}
+                for p in config.pairs]})
+        if url.path == '/api/v3/global':
+            return self._reply(200, {'data': {'market_cap_percentage': {'btc': 55.0}}})
+        self._reply(404, {'msg': f'unknown path {url.path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+        if self._inject():
+            return
+        if url.path.endswith('/sendMessage'):
+            return self._reply(200, {'ok': True, 'result': {'message_id': random.randrange(1 << 30)}})
+        if url.path.endswith('/scan'):
+            columns = body.get('columns', [])
+            suffix = columns[0].split('|', 1)[1] if columns and '|' in columns[0] else ''
+            interval = SCANNER_INTERVALS.get(suffix, '1h')
+            names = [c.split('|', 1)[0] for c in columns]
+            data = []
+            for ticker in body.get('symbols', {}).get('tickers', []):
+                pair = ticker.split(':', 1)[-1]
+                if pair not in self.config.known:
+                    continue
+                values = self.config.scanner_values(pair, interval)
+                data.append({'s': ticker, 'd': [getattr(values, SCANNER_FIELDS[n]) if n in SCANNER_FIELDS else 0.0
+                                                for n in names]})
+            return self._reply(200, {'totalCount': len(data), 'data': data})
+        self._reply(404, {'msg': f'unknown path {url.path}'})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Beberapa proses stub berbagi satu port; kernel membagi koneksi
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def serve(pairs=5000, port=STUB_PORT, latency_ms=LATENCY_MS, error_rate=ERROR_RATE, throttle_rate=THROTTLE_RATE, seed=SEED):
+    """Jalankan satu proses server stub (blocking)."""
+    StubHandler.config = StubConfig(pairs, latency_ms, error_rate, throttle_rate, seed)
+    server = StubServer((STUB_HOST, port), StubHandler)
+    print(f"🧪 Stub {len(StubHandler.config.pairs)} pair di http://{STUB_HOST}:{port} "
+          f"(latensi {latency_ms} ms, error {error_rate:.1%}, 429 {throttle_rate:.1%})", flush=True)
+    server.serve_forever()
+
+def _wait_for_port(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((STUB_HOST, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def start_stubs(pairs, port, processes, latency_ms, error_rate, throttle_rate, seed):
+    """Jalankan `processes` proses stub di port yang sama. Mengembalikan list Popen."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+    cmd = [sys.executable, script, 'load-stub', '--pairs', str(pairs), '--port', str(port),
+           '--latency-ms', str(latency_ms), '--error-rate', str(error_rate),
+           '--throttle-rate', str(throttle_rate), '--seed', str(seed)]
+    procs = [subprocess.Popen(cmd, stdout=subprocess.DEVNULL) for _ in range(processes)]
+    if not _wait_for_port(port):
+        stop_stubs(procs)
+        raise RuntimeError(f"Stub tidak bisa dijalankan di port {port}")
+    return procs
+
+def stop_stubs(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.wait()
+
+# ==========================================
+# DRIVER
+# ==========================================
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _prepare_workdir(pairs, keep):
+    repo = os.path.dirname(os.path.abspath(__file__))
+    path = tempfile.mkdtemp(prefix='loadtest-')
+    shutil.copyfile(os.path.join(repo, 'scoring_rules.json'), os.path.join(path, 'scoring_rules.json'))
+    with open(os.path.join(path, 'pairs_cache.json'), 'w') as f:
+        json.dump(synthetic_market.pair_names(pairs), f)
+    if keep:
+        print(f"📁 Direktori kerja load test: {path}")
+    return path
+
+def run(pairs=5000, cycles=1, latency_ms=LATENCY_MS, error_rate=ERROR_RATE, throttle_rate=THROTTLE_RATE,
+        stub_processes=None, port=STUB_PORT, deadline_seconds=None, seed=SEED, keep=False):
+    """
+    Jalankan `cycles` siklus signal_bot.main() terhadap stub dengan `pairs`
+    pair sintetis. Mengembalikan list laporan per siklus.
+    Default satu proses stub per CPU agar stub tidak jadi bottleneck.
+    """
+    base_url = f"http://{STUB_HOST}:{port}"
+    os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'loadtest')
+    os.environ.setdefault('TELEGRAM_CHAT_ID', '0')
+    workdir = _prepare_workdir(pairs, keep)
+    cwd = os.getcwd()
+    procs = start_stubs(pairs, port, stub_processes or os.cpu_count() or 4, latency_ms, error_rate, throttle_rate, seed)
+    reports = []
+    try:
+        os.chdir(workdir)
+        import http_transport
+        import scan_scheduler
+        import signal_bot
+
+        for host in STUB_HOSTS:
+            http_transport.set_host_override(host, base_url)
+        if deadline_seconds is not None:
+            # Deadline eksplisit menggantikan budget timeout job workflow
+            scan_scheduler.SCAN_DEADLINE_SECONDS = deadline_seconds
+            scan_scheduler.JOB_TIMEOUT_SECONDS = float('inf')
+
+        transport = http_transport.get_transport()
+        for cycle in range(1, cycles + 1):
+            start = time.monotonic()
+            summary = signal_bot.main() or {}
+            elapsed = time.monotonic() - start
+            scanned = summary.get('scanned', 0)
+            reports.append({
+                'cycle': cycle, 'pairs': pairs, 'elapsed': elapsed, 'scanned': scanned,
+                'queued': summary.get('queued', 0), 'throughput': scanned / elapsed if elapsed else 0.0,
+                'stats': summary.get('stats', {}), 'peak_rss_mb': _peak_rss_mb(), 'hosts': transport.report(),
+            })
+    finally:
+        os.chdir(cwd)
+        stop_stubs(procs)
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return reports
+
+def print_report(reports):
+    print("\n" + "=" * 60)
+    print("🧪 HASIL LOAD TEST:")
+    for r in reports:
+        peak = f"{r['peak_rss_mb']:.0f} MB" if r['peak_rss_mb'] is not None else "n/a"
+        print(f"   Siklus {r['cycle']}: {r['scanned']}/{r['queued']} pair discan dari {r['pairs']} "
+              f"dalam {r['elapsed']:.1f} dtk ({r['throughput']:.1f} pair/dtk), RSS puncak {peak}")
+    if reports:
+        print("   Latensi per host (kumulatif):")
+        for host, h in reports[-1]['hosts'].items():
+            tail = (f"p50 {h['p50'] * 1000:.0f} ms | p95 {h['p95'] * 1000:.0f} ms | p99 {h['p99'] * 1000:.0f} ms"
+                    if h['p50'] is not None else "tanpa sampel")
+            print(f"   - {host}: {h['calls']} sukses, {h['retries']} retry, {h['failures']} gagal | {tail}")
+    print("=" * 60)
@@ -0,0 +1,130 @@
+import os
+import json
+from datetime import datetime, timezone, timedelta
+from http_transport import get_transport
+from state_io import write_json_if_changed
+
+# ==========================================
+# KONFIGURASI REGIME MAKRO
+# ==========================================
+# Cache regime disimpan di btc_dominance.json (field lama `last_value` dan
+# `updated` tetap dipertahankan). Nilai hanya dihitung ulang sekali per candle
+# 1D Binance (pergantian hari UTC) dari bar 1D yang sudah close (kemarin),
+# siklus lain cukup membaca cache.
+#   BEARISH : BTC close < EMA50 1D -> semua entry diveto
+#   NEUTRAL : breadth lemah atau dominance naik -> BUY butuh skor lebih tinggi
+#   BULLISH : normal
+# Breadth = porsi universe yang close 1D-nya di atas EMA50 1D, dihitung saat
+# regime dihitung ulang dari state 1D terakhir yang diketahui tiap pair
+# (candle store), bukan hanya pair yang kebetulan discan di siklus itu.
+MACRO_FILE = 'btc_dominance.json'
+UTC7 = timezone(timedelta(hours=7))
+
+BREADTH_WEAK = 0.4              # < 40% universe di atas EMA50 1D = market lemah
+DOMINANCE_RISING_PCT = 1.0      # Dominance naik > 1 poin per hari = alt melemah
+
+REGIME_BULLISH = "BULLISH"
+REGIME_NEUTRAL = "NEUTRAL"
+REGIME_BEARISH = "BEARISH"
+
+MACRO = {}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_macro():
+    global MACRO
+    if os.path.exists(MACRO_FILE):
+        try:
+            with open(MACRO_FILE, 'r') as f:
+                MACRO = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat cache makro: {e}")
+            MACRO = {}
+    else:
+        MACRO = {}
+
+def save_macro():
+    try:
+        write_json_if_changed(MACRO_FILE, MACRO)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan cache makro: {e}")
+
+# ==========================================
+# SUMBER DATA
+# ==========================================
+def fetch_btc_dominance():
+    """Dominance BTC (%) dari endpoint global CoinGecko. None jika gagal."""
+    try:
+        response = get_transport().get("https://api.coingecko.com/api/v3/global")
+        response.raise_for_status()
+        return float(response.json()['data']['market_cap_percentage']['btc'])
+    except Exception as e:
+        print(f"⚠️ Gagal mengambil BTC dominance: {e}")
+        return None
+
+def candle_day(now=None):
+    """Tanggal candle 1D Binance yang sedang berjalan (batas 00:00 UTC)."""
+    return (now or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime('%Y-%m-%d')
+
+# ==========================================
+# REGIME
+# ==========================================
+def classify(btc_bullish, breadth, dominance, prev_dominance):
+    if not btc_bullish:
+        return REGIME_BEARISH
+    if breadth is not None and breadth < BREADTH_WEAK:
+        return REGIME_NEUTRAL
+    if dominance is not None and prev_dominance is not None and dominance - prev_dominance > DOMINANCE_RISING_PCT:
+        return REGIME_NEUTRAL
+    return REGIME_BULLISH
+
+def refresh_regime(fetch_btc_1d, fetch_breadth=None, now=None):
+    """
+    Hitung ulang regime jika candle 1D sudah berganti sejak update terakhir.
+    `fetch_btc_1d` mengembalikan Indicators bar 1D BTC terakhir yang sudah
+    close (atau None); dipanggil sekali per hari, diulang di run berikutnya
+    jika gagal. `fetch_breadth` mengembalikan (above, total) universe.
+    """
+    day = candle_day(now)
+    if MACRO.get('day') == day:
+        return MACRO
+
+    print("\n🔍 Memperbarui Regime Makro (candle 1D baru)...")
+    btc = fetch_btc_1d()
+    if not btc:
+        print(f"⚠️ Gagal mendapat data BTC 1D. Regime terakhir ({get_regime()}) tetap dipakai, dicoba lagi di run berikutnya.")
+        return MACRO
+
+    dominance = fetch_btc_dominance()
+    prev_dominance = MACRO.get('last_value')
+    above, total = fetch_breadth() if fetch_breadth else (0, 0)
+    breadth = round(above / total, 4) if total > 0 else None
+    btc_bullish = btc.close >= btc.ema50
+
+    MACRO.update({
+        'day': day,
+        'btc_close': btc.close,
+        'btc_ema50': btc.ema50,
+        'btc_bullish': btc_bullish,
+        'prev_value': prev_dominance,
+        'breadth': breadth,
+        'regime': classify(btc_bullish, breadth, dominance, prev_dominance),
+        'updated': datetime.now(UTC7).isoformat(),
+    })
+    if dominance is not None:
+        MACRO['last_value'] = dominance
+    MACRO.pop('breadth_last', None)
+    save_macro()
+    return MACRO
+
+def get_regime():
+    """Regime dari cache, tanpa I/O. Default NEUTRAL (buy tetap boleh) jika belum ada."""
+    return MACRO.get('regime', REGIME_NEUTRAL)
+
+def is_btc_bullish():
+    return get_regime() != REGIME_BEARISH
+
+def is_neutral():
+    """True hanya jika regime memang dihitung NEUTRAL (bukan default cache kosong)."""
+    return MACRO.get('regime') == REGIME_NEUTRAL
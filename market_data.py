@@ -0,0 +1,225 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import botlog
+import indicators
+import symbol_cache
+from candle_store import BINANCE_KLINES_URL, BOOTSTRAP_LIMIT
+from http_transport import TV_SCANNER_HOST, get_transport
+from records import Indicators
+
+# ==========================================
+# DATA PASAR DUA SUMBER DENGAN FAILOVER
+# ==========================================
+# Indikator satu (pair, timeframe) bisa diambil dari dua sumber:
+#   - 'tradingview': scanner TradingView (sumber utama). Payload & kolom sama
+#                    dengan TA_Handler, tetapi POST-nya lewat session
+#                    keep-alive transport, bukan requests.post milik library
+#   - 'klines'     : klines Binance + indikator lokal (indicators.py), bar
+#                    yang sedang berjalan ikut dihitung seperti TradingView
+# Tiap sumber punya skor kesehatan per run (EWMA rasio sukses + sampel
+# latensi). Jika sumber utama gagal, sumber lain langsung dicoba (failover);
+# jika sumber utama terus gagal atau jauh lebih lambat, urutan dibalik.
+#
+# Untuk posisi aktif dipakai hedged request: jika sumber utama belum menjawab
+# setelah persentil latensinya (p90), sumber kedua ikut ditembak dan jawaban
+# pertama yang valid dipakai. Total waktu tunggu dibatasi HEDGE_TIMEOUT,
+# sehingga cek exit tetap cepat walau satu sumber sedang lambat.
+SOURCE_TRADINGVIEW = 'tradingview'
+SOURCE_KLINES = 'klines'
+SOURCES = (SOURCE_TRADINGVIEW, SOURCE_KLINES)   # Urutan preferensi
+TV_SCAN_URL = f"https://{TV_SCANNER_HOST}/crypto/scan"
+
+HEALTH_ALPHA = 0.2              # Bobot EWMA rasio sukses
+LATENCY_WINDOW = 50             # Sampel latensi terakhir per sumber
+MIN_SUCCESS = 0.5               # Di bawah ini sumber utama diturunkan
+SLOW_FACTOR = 3.0               # Atau jika median latensinya > 3x sumber lain
+MIN_SAMPLES = 5
+
+HEDGE_PERCENTILE = 0.9
+HEDGE_DEFAULT_DELAY = 2.0       # Detik, sebelum ada sampel latensi
+HEDGE_MIN_DELAY = 0.3
+HEDGE_MAX_DELAY = 5.0
+HEDGE_TIMEOUT = 20.0
+HEDGE_WORKERS = 8
+
+
+class SourceHealth:
+    def __init__(self, name):
+        self.name = name
+        self.success = 1.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, ok, latency):
+        with self._lock:
+            self.calls += 1
+            self.failures += not ok
+            self.success += HEALTH_ALPHA * ((1.0 if ok else 0.0) - self.success)
+            if ok:
+                self.latencies.append(latency)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+HEALTH = {name: SourceHealth(name) for name in SOURCES}
+COUNTERS = {'failover': 0, 'hedged': 0, 'hedge_won': 0}
+_COUNTER_LOCK = threading.Lock()
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _count(key):
+    with _COUNTER_LOCK:
+        COUNTERS[key] += 1
+
+# ==========================================
+# SUMBER
+# ==========================================
+def scan_tradingview(pairs, interval):
+    """
+    Indikator TradingView banyak pair BINANCE dalam satu POST scanner, lewat
+    pool koneksi host scanner di transport. Mengembalikan {pair: dict
+    indikator (kunci sama dengan analysis.indicators) atau None jika simbol
+    tidak dikenal}.
+    """
+    from tradingview_ta import TradingView, __version__
+    columns = TradingView.indicators
+    payload = TradingView.data([f"BINANCE:{p}" for p in pairs], interval, columns)
+    response = get_transport().post(TV_SCAN_URL, json=payload, idempotent=True,
+                                    headers={"User-Agent": f"tradingview_ta/{__version__}"})
+    if response.status_code != 200:
+        raise ValueError(f"scanner TradingView HTTP {response.status_code}")
+    rows = {row['s']: row['d'] for row in response.json().get('data') or []}
+    return {p: dict(zip(columns, rows[f"BINANCE:{p}"])) if f"BINANCE:{p}" in rows else None for p in pairs}
+
+def _from_tradingview(pair, interval):
+    if symbol_cache.is_blocked(pair, interval):
+        return None
+    values = scan_tradingview([pair], interval)[pair]
+    if values is None:
+        symbol_cache.record_failure(pair, interval)
+        print(f"⚠️ {pair} tidak dikenal di {interval}. Masuk negative cache.")
+        return None
+    symbol_cache.record_success(pair, interval)
+    return Indicators.from_tv(values)
+
+def _from_klines(pair, interval):
+    # Interval TradingView ('1h', '4h', '1d') sama dengan interval klines Binance
+    params = {'symbol': pair, 'interval': interval, 'limit': BOOTSTRAP_LIMIT}
+    response = get_transport().get(BINANCE_KLINES_URL, params=params)
+    if response.status_code == 400:
+        return None  # Simbol tidak ada di Binance; bukan masalah kesehatan sumber
+    response.raise_for_status()
+    rows = response.json()
+    if not rows:
+        raise ValueError("klines kosong")
+    state = indicators.new_state()
+    for k in rows:
+        state = indicators.step(state, tuple(float(x) for x in k[1:6]))
+    return indicators.to_indicators(state)
+
+FETCHERS = {SOURCE_TRADINGVIEW: _from_tradingview, SOURCE_KLINES: _from_klines}
+
+def _attempt(source, pair, interval):
+    """Satu percobaan ke satu sumber. None jika gagal atau simbol tidak ada."""
+    start = time.monotonic()
+    try:
+        result = FETCHERS[source](pair, interval)
+        if result is not None:
+            HEALTH[source].record(True, time.monotonic() - start)
+        return result
+    except Exception as e:
+        HEALTH[source].record(False, time.monotonic() - start)
+        botlog.warning('source_failed', "⚠️ Gagal mengambil {pair} {interval} dari {source}: {error}",
+                       sample=True, pair=pair, interval=interval, source=source, error=str(e))
+        return None
+
+# ==========================================
+# URUTAN SUMBER & HEDGING
+# ==========================================
+def ordered_sources():
+    """Urutan sumber saat ini: preferensi, kecuali sumber utama sedang sakit/lambat."""
+    primary, secondary = (HEALTH[name] for name in SOURCES)
+    demote = primary.success < MIN_SUCCESS and secondary.success > primary.success
+    if not demote and len(primary.latencies) >= MIN_SAMPLES and len(secondary.latencies) >= MIN_SAMPLES:
+        demote = primary.percentile(0.5) > SLOW_FACTOR * secondary.percentile(0.5)
+    return SOURCES[::-1] if demote else SOURCES
+
+def _executor():
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_WORKERS)
+        return _EXECUTOR
+
+def _hedge_delay(source):
+    delay = HEALTH[source].percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+    return min(max(delay, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+def _hedged(pair, interval, order):
+    primary, secondary = order
+    deadline = time.monotonic() + HEDGE_TIMEOUT
+    pool = _executor()
+    first = pool.submit(_attempt, primary, pair, interval)
+    done, _ = wait([first], timeout=_hedge_delay(primary))
+    if done and first.result() is not None:
+        return first.result()
+
+    # Sumber utama lambat atau gagal: tembak sumber kedua
+    if done:
+        _count('failover')
+    else:
+        _count('hedged')
+    second = pool.submit(_attempt, secondary, pair, interval)
+    pending = {second} if done else {first, second}
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"⏰ {pair} {interval}: kedua sumber tidak menjawab dalam {HEDGE_TIMEOUT:.0f} dtk.")
+            return None
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.result() is not None:
+                if future is second and first in pending:
+                    _count('hedge_won')
+                return future.result()
+    return None
+
+def get_indicators(pair, interval, hedge=False):
+    """
+    Indicators untuk (pair, interval) dari sumber tersehat, dengan failover ke
+    sumber lain. hedge=True (posisi aktif): sumber kedua ditembak paralel jika
+    sumber utama lambat. None jika kedua sumber gagal.
+    """
+    order = ordered_sources()
+    if hedge:
+        return _hedged(pair, interval, order)
+    for i, source in enumerate(order):
+        result = _attempt(source, pair, interval)
+        if result is not None:
+            if i:
+                _count('failover')
+            return result
+    return None
+
+def report():
+    """Ringkasan kesehatan sumber untuk log akhir siklus."""
+    lines = []
+    for name in SOURCES:
+        health = HEALTH[name]
+        if not health.calls:
+            continue
+        p50, p90 = health.percentile(0.5), health.percentile(0.9)
+        latency = f"p50 {p50:.2f}s p90 {p90:.2f}s" if p50 is not None else "tanpa sampel"
+        lines.append(f"{name}: {health.calls} call, {health.failures} gagal, {latency}")
+    if COUNTERS['failover'] or COUNTERS['hedged']:
+        lines.append(f"failover {COUNTERS['failover']}, hedge {COUNTERS['hedged']} (menang {COUNTERS['hedge_won']})")
+    return lines
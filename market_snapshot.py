@@ -0,0 +1,36 @@
+from http_transport import get_transport
+
+# ==========================================
+# SNAPSHOT HARGA BULK
+# ==========================================
+# Satu request ke endpoint ticker Binance mengembalikan harga terakhir semua
+# symbol sekaligus. Exit berbasis harga (SL, break even, trailing, max hold)
+# untuk semua posisi aktif cukup memakai satu snapshot ini, tanpa request
+# TradingView per pair.
+BINANCE_TICKER_URL = 'https://data-api.binance.vision/api/v3/ticker/price'  # Endpoint publik, tidak diblokir di runner US
+
+def fetch_prices(pairs=None):
+    """
+    Harga terakhir {pair: harga}. Jika `pairs` diberikan, hanya pair itu yang
+    dikembalikan. Jika request gagal, dict kosong (pemanggil fallback ke 1H).
+    """
+    try:
+        response = get_transport().get(BINANCE_TICKER_URL)
+        response.raise_for_status()
+        tickers = response.json()
+    except Exception as e:
+        print(f"⚠️ Gagal mengambil snapshot harga bulk: {e}")
+        return {}
+    wanted = set(pairs) if pairs is not None else None
+    prices = {}
+    for ticker in tickers:
+        symbol = ticker.get('symbol')
+        if wanted is not None and symbol not in wanted:
+            continue
+        try:
+            price = float(ticker['price'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if price > 0:
+            prices[symbol] = price
+    return prices
@@ -0,0 +1,192 @@
+import os
+import json
+import math
+from datetime import date, timedelta
+from state_io import write_json_if_changed
+
+# ==========================================
+# ANALITIK PERFORMA INKREMENTAL
+# ==========================================
+# Setiap trade yang ditutup langsung di-"akumulasi" (O(1)), jadi rekap dan
+# dashboard cukup membaca nilai yang sudah jadi tanpa memindai ulang
+# trade_history.json. Yang disimpan hanyalah jumlah (n, win, PnL, gross
+# profit/loss, jumlah kuadrat PnL) sehingga win rate, profit factor,
+# expectancy dan Sharpe per trade bisa diturunkan kapan saja.
+#
+# Window bergulir 7d/30d dibangun dari bucket harian (tanggal exit UTC+7)
+# yang hanya disimpan WINDOW_MAX_DAYS hari. Tiap bucket juga menyimpan
+# prefix min/max dan drawdown internalnya, sehingga max drawdown window bisa
+# digabung dari <= 30 bucket tanpa riwayat per trade.
+PERFORMANCE_FILE = 'performance.json'
+TRADE_HISTORY_FILE = 'trade_history.json'
+WINDOWS = {'7d': 7, '30d': 30}
+WINDOW_MAX_DAYS = max(WINDOWS.values())
+
+# PERF = {
+#   'trades': jumlah trade yang sudah diakumulasi (harus = len(trade_history)),
+#   'all': stats + equity/peak/max_dd, 'by_reason': {reason: stats}, 'by_pair': {pair: stats},
+#   'days': {'YYYY-MM-DD': stats + max_prefix/min_prefix/max_dd}
+# }
+PERF = {}
+
+def _new_stats():
+    return {'n': 0, 'wins': 0, 'pnl': 0.0, 'gross_profit': 0.0, 'gross_loss': 0.0, 'sum_sq': 0.0}
+
+def _new_perf():
+    return {
+        'trades': 0,
+        'all': {**_new_stats(), 'equity': 0.0, 'peak': 0.0, 'max_dd': 0.0},
+        'by_reason': {},
+        'by_pair': {},
+        'days': {},
+    }
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_performance():
+    global PERF
+    PERF = _new_perf()
+    if os.path.exists(PERFORMANCE_FILE):
+        try:
+            with open(PERFORMANCE_FILE, 'r') as f:
+                PERF.update(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Gagal memuat analitik performa: {e}")
+            PERF = _new_perf()
+
+def save_performance():
+    try:
+        write_json_if_changed(PERFORMANCE_FILE, PERF)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan analitik performa: {e}")
+
+def load_trade_history():
+    if os.path.exists(TRADE_HISTORY_FILE):
+        try:
+            with open(TRADE_HISTORY_FILE, 'r') as f:
+                return json.load(f)
+        except:
+            return []
+    return []
+
+def save_trade_history(history):
+    try:
+        with open(TRADE_HISTORY_FILE, 'w') as f:
+            json.dump(history, f, indent=4)
+    except Exception as e:
+        print(f"❌ Gagal simpan riwayat trade: {e}")
+
+# ==========================================
+# AKUMULASI
+# ==========================================
+def _add(stats, pnl):
+    stats['n'] += 1
+    stats['wins'] += 1 if pnl > 0 else 0
+    stats['pnl'] += pnl
+    stats['sum_sq'] += pnl * pnl
+    if pnl > 0:
+        stats['gross_profit'] += pnl
+    else:
+        stats['gross_loss'] -= pnl
+
+def _trade_day(trade):
+    return trade.get('exit_date', '')[:10]
+
+def _expire_days(today):
+    cutoff = (date.fromisoformat(today) - timedelta(days=WINDOW_MAX_DAYS - 1)).isoformat()
+    for day in [d for d in PERF['days'] if d < cutoff]:
+        del PERF['days'][day]
+
+def add_trade(trade):
+    """Akumulasi satu trade yang baru ditutup. O(1) terhadap panjang riwayat."""
+    pnl = float(trade['profit_pct'])
+    total = PERF['all']
+    _add(total, pnl)
+    total['equity'] += pnl
+    total['peak'] = max(total['peak'], total['equity'])
+    total['max_dd'] = max(total['max_dd'], total['peak'] - total['equity'])
+
+    _add(PERF['by_reason'].setdefault(trade.get('exit_reason', '?'), _new_stats()), pnl)
+    _add(PERF['by_pair'].setdefault(trade.get('pair', '?'), _new_stats()), pnl)
+
+    day = _trade_day(trade)
+    if day:
+        bucket = PERF['days'].setdefault(day, {**_new_stats(), 'max_prefix': 0.0, 'min_prefix': 0.0, 'max_dd': 0.0})
+        _add(bucket, pnl)
+        bucket['max_dd'] = max(bucket['max_dd'], bucket['max_prefix'] - bucket['pnl'])
+        bucket['max_prefix'] = max(bucket['max_prefix'], bucket['pnl'])
+        bucket['min_prefix'] = min(bucket['min_prefix'], bucket['pnl'])
+        _expire_days(max(PERF['days']))
+    PERF['trades'] += 1
+
+def rebuild(history):
+    """Bangun ulang dari seluruh riwayat (sekali, jika file hilang atau tidak sinkron)."""
+    global PERF
+    PERF = _new_perf()
+    for trade in sorted(history, key=lambda t: t.get('exit_date', '')):
+        add_trade(trade)
+    print(f"🔄 Analitik performa dibangun ulang dari {len(history)} trade.")
+
+def record_trade(trade, history):
+    """
+    Dipanggil setelah `trade` ditambahkan ke `history`. Jika akumulator tidak
+    sinkron dengan riwayat (mis. riwayat diedit manual), bangun ulang.
+    """
+    if PERF.get('trades') == len(history) - 1:
+        add_trade(trade)
+    else:
+        rebuild(history)
+    save_performance()
+
+def ensure_synced(history):
+    if PERF.get('trades') != len(history):
+        rebuild(history)
+        save_performance()
+
+# ==========================================
+# METRIK TURUNAN
+# ==========================================
+def summarize(stats):
+    n = stats['n']
+    mean = stats['pnl'] / n if n else 0.0
+    variance = (stats['sum_sq'] - n * mean * mean) / (n - 1) if n > 1 else 0.0
+    std = math.sqrt(max(variance, 0.0))
+    if stats['gross_loss'] > 0:
+        profit_factor = stats['gross_profit'] / stats['gross_loss']
+    else:
+        profit_factor = math.inf if stats['gross_profit'] > 0 else 0.0
+    return {
+        'trades': n,
+        'wins': stats['wins'],
+        'losses': n - stats['wins'],
+        'win_rate': stats['wins'] / n * 100 if n else 0.0,
+        'total_pnl': stats['pnl'],
+        'expectancy': mean,
+        'profit_factor': profit_factor,
+        'sharpe': mean / std if std > 0 else 0.0,   # Per trade, tanpa annualisasi
+        'max_drawdown': stats.get('max_dd', 0.0),
+    }
+
+def window(days, today):
+    """Statistik gabungan bucket harian dalam `days` hari terakhir s.d. `today` (date)."""
+    first = (today - timedelta(days=days - 1)).isoformat()
+    last = today.isoformat()
+    total = _new_stats()
+    equity = peak = max_dd = 0.0
+    for day in sorted(d for d in PERF['days'] if first <= d <= last):
+        bucket = PERF['days'][day]
+        for key in total:
+            total[key] += bucket[key]
+        max_dd = max(max_dd, bucket['max_dd'], peak - (equity + bucket['min_prefix']))
+        peak = max(peak, equity + bucket['max_prefix'])
+        equity += bucket['pnl']
+    total['max_dd'] = max_dd
+    return summarize(total)
+
+def all_time():
+    return summarize(PERF['all'])
+
+def breakdown(key):
+    """`key` = 'by_reason' atau 'by_pair': {nama: ringkasan}."""
+    return {name: summarize(stats) for name, stats in PERF[key].items()}
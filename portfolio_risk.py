@@ -0,0 +1,130 @@
+import os
+import json
+import math
+from state_io import write_json_if_changed
+
+# ==========================================
+# KONFIGURASI RISK PORTFOLIO
+# ==========================================
+# Return dihitung dari close bar 1H yang sudah close (klines, di-ingest
+# candle_store), bukan harga live saat pair kebetulan di-scan: pair yang
+# di-scan tiap beberapa jam (scan adaptif) tetap punya return per jam
+# berurutan karena bar yang terlewat ikut diambil saat sinkron berikutnya.
+# File ini cache lokal (cache Actions), tidak masuk git.
+RETURNS_FILE = 'returns_cache.json'
+
+RETURNS_WINDOW = 72             # Jumlah return 1H terakhir yang disimpan per pair (3 hari)
+MIN_OVERLAP = 24                # Minimal jam yang sama agar korelasi dianggap valid
+CORR_THRESHOLD = 0.7            # Pair dengan korelasi >= ini dianggap satu cluster
+MAX_POSITIONS_PER_CLUSTER = 3   # Batas posisi aktif dalam satu cluster korelasi
+MAX_OPEN_POSITIONS = 10         # Batas total posisi aktif
+MAX_TOTAL_RISK_PCT = 25.0       # Batas jumlah risiko (jarak entry->SL dalam %) seluruh posisi
+
+# RETURNS[pair] = {'hour': int, 'close': float, 'ret': [[hour, log_return], ...]}
+# `hour` adalah index jam UTC (open time bar 1H) sejak epoch, jadi return antar
+# pair bisa disejajarkan.
+RETURNS = {}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_returns():
+    global RETURNS
+    if os.path.exists(RETURNS_FILE):
+        try:
+            with open(RETURNS_FILE, 'r') as f:
+                RETURNS = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat cache return: {e}")
+            RETURNS = {}
+    else:
+        RETURNS = {}
+
+def save_returns():
+    try:
+        write_json_if_changed(RETURNS_FILE, RETURNS, indent=None)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan cache return: {e}")
+
+# ==========================================
+# UPDATE INKREMENTAL
+# ==========================================
+def record_close(pair, close, hour):
+    """
+    Tambahkan close satu bar 1H yang sudah close (`hour` = open time / 1 jam).
+    O(1): hanya close terakhir yang dibandingkan, riwayat lama tidak dihitung
+    ulang. Return hanya dicatat antar bar yang berurutan.
+    """
+    if close <= 0:
+        return
+    entry = RETURNS.get(pair)
+    if entry is None:
+        RETURNS[pair] = {'hour': hour, 'close': close, 'ret': []}
+        return
+    if hour <= entry['hour']:
+        return  # Bar yang sama / lebih lama (rerun, bootstrap ulang), jangan dobel hitung
+    if hour == entry['hour'] + 1:
+        entry['ret'].append([hour, round(math.log(close / entry['close']), 6)])
+        if len(entry['ret']) > RETURNS_WINDOW:
+            del entry['ret'][:-RETURNS_WINDOW]
+    entry['hour'] = hour
+    entry['close'] = close
+
+# ==========================================
+# KORELASI & BATAS POSISI
+# ==========================================
+def correlation(pair_a, pair_b):
+    """Korelasi Pearson return 1H dua pair pada jam yang sama. None jika data kurang."""
+    a = RETURNS.get(pair_a)
+    b = RETURNS.get(pair_b)
+    if not a or not b:
+        return None
+    rets_b = dict(map(tuple, b['ret']))
+    xs, ys = [], []
+    for hour, r in a['ret']:
+        if hour in rets_b:
+            xs.append(r)
+            ys.append(rets_b[hour])
+    n = len(xs)
+    if n < MIN_OVERLAP:
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    cov = var_x = var_y = 0.0
+    for x, y in zip(xs, ys):
+        dx, dy = x - mean_x, y - mean_y
+        cov += dx * dy
+        var_x += dx * dx
+        var_y += dy * dy
+    if var_x <= 0 or var_y <= 0:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+def position_risk_pct(price, stop_loss):
+    """Risiko satu posisi = jarak entry ke SL dalam persen (0 setelah break even)."""
+    if price <= 0:
+        return 0.0
+    return max(price - stop_loss, 0.0) / price * 100
+
+def check_portfolio_risk(pair, price, stop_loss, active_buys):
+    """
+    Dipanggil sebelum pair masuk ACTIVE_BUYS.
+    Mengembalikan (True, "") jika boleh entry, atau (False, alasan).
+    """
+    if len(active_buys) >= MAX_OPEN_POSITIONS:
+        return False, f"Posisi aktif penuh ({len(active_buys)}/{MAX_OPEN_POSITIONS})"
+
+    total_risk = sum(position_risk_pct(p.price, p.stop_loss) for p in active_buys.values())
+    new_risk = position_risk_pct(price, stop_loss)
+    if total_risk + new_risk > MAX_TOTAL_RISK_PCT:
+        return False, f"Total risiko {total_risk + new_risk:.1f}% > {MAX_TOTAL_RISK_PCT}%"
+
+    cluster = []
+    for held in active_buys:
+        corr = correlation(pair, held)
+        if corr is not None and corr >= CORR_THRESHOLD:
+            cluster.append(held)
+    if len(cluster) >= MAX_POSITIONS_PER_CLUSTER:
+        return False, f"Cluster korelasi penuh ({', '.join(cluster)})"
+
+    return True, ""
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timezone
+
+# ==========================================
+# MODE LONG-RUNNING + PREFETCH SEBELUM CLOSE CANDLE
+# ==========================================
+# Dalam mode cron semua data diambil sekaligus tepat di jam sibuk. Pada mode
+# long-running (`bot.py run`), beberapa menit sebelum close candle 1H input
+# yang lambat berubah dipanaskan lebih dulu:
+#   - universe pair, state scan, regime makro BTC
+#   - candle store 4H/1D (bar 1H yang sudah close) untuk antrian scan
+#   - indikator 4H/1D fallback untuk pair yang candle store-nya gagal
+# Saat boundary, siklus biasa (signal_bot.main) hanya perlu mengambil bar 1H
+# terbaru, jadi sinyal keluar beberapa detik setelah close.
+#
+# Bar 1H yang close tepat di boundary belum di-ingest candle store; untuk
+# 4H/1D close-nya diwakili harga live 1H (termasuk saat boundary itu juga
+# menutup bar 4H/1D) dan bar itu masuk saat prefetch berikutnya.
+CANDLE_SECONDS = 3600
+PREFETCH_MINUTES = 5
+SETTLE_SECONDS = 5
+
+def next_close(now=None):
+    """Epoch detik close candle 1H berikutnya."""
+    now = now or time.time()
+    return (int(now) // CANDLE_SECONDS + 1) * CANDLE_SECONDS
+
+def _sleep_until(ts):
+    delay = ts - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+def _stamp(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%H:%M:%S UTC')
+
+# ==========================================
+# PEMANASAN
+# ==========================================
+def warm():
+    """
+    Panaskan input lambat untuk siklus berikutnya. Mengembalikan dict
+    {'synced': set pair yang candle store-nya sudah sinkron,
+     'indicators': {(pair, tf): Indicators} fallback 4H/1D}.
+    """
+    import candle_store
+    import macro_regime
+    import market_data
+    import scan_scheduler
+    import signal_bot
+    import symbol_cache
+    from http_transport import get_transport
+
+    start = time.monotonic()
+    signal_bot.load_active_buys()
+    signal_bot.load_cooldowns()
+    macro_regime.load_macro()
+    symbol_cache.load_negative_cache()
+    scan_scheduler.load_scan_state()
+    candle_store.load_candles()
+
+    signal_bot.check_btc_trend()
+    pairs = signal_bot.get_pairs_from_file()
+    held = set(signal_bot.ACTIVE_BUYS)
+    queue = scan_scheduler.build_queue([p for p in pairs if p not in held], [])
+    targets = [p for p in queue
+               if p not in signal_bot.COOLDOWNS and not symbol_cache.is_blocked(p, signal_bot.TF_ENTRY)]
+
+    synced = candle_store.sync_pairs(targets)
+    fallback = [(p, tf) for p in targets if p not in synced for tf in (signal_bot.TF_TREND, signal_bot.TF_SETUP)]
+    results = get_transport().map(lambda job: market_data.get_indicators(*job), fallback)
+    candle_store.save_candles()
+    symbol_cache.save_negative_cache()
+
+    print(f"🔥 Prefetch selesai dalam {time.monotonic() - start:.1f} dtk: "
+          f"{len(synced)} pair candle store, {len(fallback) // 2} pair fallback 4H/1D.")
+    return {'synced': synced, 'indicators': {job: data for job, data in zip(fallback, results) if data}}
+
+# ==========================================
+# LOOP
+# ==========================================
+def run_forever(prefetch_minutes=PREFETCH_MINUTES, settle_seconds=SETTLE_SECONDS, cycles=0):
+    """Satu siklus per close candle 1H, dengan prefetch `prefetch_minutes` sebelumnya."""
+    import signal_bot
+
+    done = 0
+    while not cycles or done < cycles:
+        close = next_close()
+        print(f"\n⏳ Close berikutnya {_stamp(close)}, prefetch {prefetch_minutes} menit sebelumnya.")
+        _sleep_until(close - prefetch_minutes * 60)
+        warmed = None
+        try:
+            warmed = warm()
+        except Exception as e:
+            print(f"⚠️ Prefetch gagal, siklus mengambil semua data saat boundary: {e}")
+
+        _sleep_until(close + settle_seconds)
+        try:
+            signal_bot.main(prefetched=warmed)
+        except Exception as e:
+            print(f"❌ Siklus gagal: {e}")
+        print(f"⏱️ Siklus selesai {time.time() - close:.1f} dtk setelah close candle.")
+        done += 1
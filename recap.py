@@ -0,0 +1,120 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+import performance
+import telegram_fanout
+import timers
+
+# ==========================================
+# REKAP MINGGUAN
+# ==========================================
+# Dipisah dari signal_bot supaya `bot.py recap` (dan rekap setelah merge
+# shard) cukup memuat timers, performance dan telegram_fanout, tanpa ikut
+# memuat stack scanner (candle_store, market_data, sharding, ...).
+UTC7 = timezone(timedelta(hours=7))
+TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_TELEGRAM_BOT_TOKEN')
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'YOUR_TELEGRAM_CHAT_ID')
+RECAP_SENT_FILE = 'recap_sent.json'
+
+RECAP_WEEKDAY = 6   # Minggu
+RECAP_HOUR = 23
+RECAP_TIMER_KEY = 'weekly'
+
+def load_recap_sent():
+    if os.path.exists(RECAP_SENT_FILE):
+        try:
+            with open(RECAP_SENT_FILE, 'r') as f:
+                return json.load(f).get('last_sent_date', '')
+        except:
+            return ''
+    return ''
+
+def save_recap_sent(date_str):
+    try:
+        with open(RECAP_SENT_FILE, 'w') as f:
+            json.dump({'last_sent_date': date_str}, f)
+    except:
+        pass
+
+def next_recap_time(now):
+    """Jadwal rekap berikutnya (Minggu 23:00 UTC+7) setelah `now`."""
+    target = now.astimezone(UTC7).replace(hour=RECAP_HOUR, minute=0, second=0, microsecond=0)
+    target += timedelta(days=(RECAP_WEEKDAY - target.weekday()) % 7)
+    if target <= now:
+        target += timedelta(days=7)
+    return target
+
+def _advance(now):
+    """Deadline rekap yang jatuh tempo sudah terlayani: jadwalkan minggu berikutnya."""
+    timers.schedule(timers.KIND_RECAP, RECAP_TIMER_KEY, next_recap_time(now))
+    timers.save_timers()
+
+def _publish(message, flush_timeout):
+    """
+    Kirim rekap dan tunggu antrian Telegram. True hanya jika semua chat tujuan
+    menerima pesannya (tanpa subscriber rekap juga True: tidak ada yang dikirim).
+    """
+    results = []
+    recipients = telegram_fanout.publish(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, "REKAP_MINGGUAN", message,
+                                         claim=lambda chat_id: results.append)
+    print(f"📢 Mengirim pesan Telegram untuk: REKAP_MINGGUAN ({recipients} chat)")
+    done = telegram_fanout.flush(flush_timeout)
+    return done and len(results) == recipients and all(results)
+
+def check_and_send_weekly_recap(force=False, flush_timeout=telegram_fanout.FLUSH_TIMEOUT):
+    """
+    Kirim rekap jika timer rekap sudah jatuh tempo. Jika run Minggu 23:xx
+    terlewat, rekap dikirim di run berikutnya (deadline tetap tersimpan).
+    Deadline baru diganti ke minggu berikutnya setelah rekap diterima
+    Telegram; jika gagal, run berikutnya mencoba lagi.
+    """
+    now = datetime.now(UTC7)
+    timers.load_timers()
+    deadline = timers.due_at(timers.KIND_RECAP, RECAP_TIMER_KEY)
+    if deadline is None:
+        deadline = next_recap_time(now)
+        timers.schedule(timers.KIND_RECAP, RECAP_TIMER_KEY, deadline)
+        timers.save_timers()
+    due = deadline <= now
+    if force or due:
+        last_sent = load_recap_sent()
+        today_str = now.strftime('%Y-%m-%d')
+
+        if last_sent == today_str:
+            if due:
+                _advance(now)
+            return
+
+        print("📊 Membuat rekap mingguan...")
+        # Metrik sudah diakumulasi per trade di performance.json
+        performance.load_performance()
+        performance.ensure_synced(performance.load_trade_history())
+        week = performance.window(7, now.date())
+        month = performance.window(30, now.date())
+        overall = performance.all_time()
+        total_trades = week['trades']
+
+        message = f"📊 *REKAP PERFORMA MINGGUAN*\n"
+        message += f"📅 Periode: 7 Hari Terakhir\n"
+        message += f"━━━━━━━━━━━━━━━━━━━━\n"
+        message += f"📈 *Total Trade:* {total_trades}\n"
+        message += f"✅ *Win:* {week['wins']} | ❌ *Loss:* {week['losses']}\n"
+        message += f"🎯 *Win Rate:* {week['win_rate']:.1f}%\n"
+        message += f"💰 *Total PnL:* {week['total_pnl']:+.2f}%\n"
+        if total_trades > 0:
+            message += f"📏 *Rata-rata/Trade:* {week['expectancy']:+.2f}%\n"
+            message += f"⚖️ *Profit Factor:* {week['profit_factor']:.2f} | *Sharpe:* {week['sharpe']:.2f}\n"
+            message += f"📉 *Max Drawdown:* {week['max_drawdown']:.2f}%\n"
+        message += f"━━━━━━━━━━━━━━━━━━━━\n"
+        message += f"🗓️ *30 Hari:* {month['trades']} trade | WR {month['win_rate']:.1f}% | PnL {month['total_pnl']:+.2f}%\n"
+        message += f"🏁 *All-time:* {overall['trades']} trade | WR {overall['win_rate']:.1f}% | PnL {overall['total_pnl']:+.2f}% | MaxDD {overall['max_drawdown']:.2f}%\n"
+        message += f"━━━━━━━━━━━━━━━━━━━━\n"
+        message += f"🤖 Bot V4 (ATR Logic) berjalan dengan baik!"
+
+        if not _publish(message, flush_timeout):
+            print("⚠️ Rekap mingguan gagal terkirim. Jadwal rekap dipertahankan, dicoba lagi di run berikutnya.")
+            return
+        save_recap_sent(today_str)
+        if due:
+            _advance(now)
+        print("✅ Rekap mingguan berhasil dikirim ke Telegram.")
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+# ==========================================
+# RECORD RINGKAS: POSISI & INDIKATOR
+# ==========================================
+# Memakai dataclass dengan __slots__ supaya tiap record tidak membawa __dict__
+# sendiri. Akses atribut (pos.stop_loss) jauh lebih murah daripada lookup string
+# di dict bersarang, dan ukuran memori per pair ikut turun.
+
+def safe_float(value, default=0.0):
+    if value is None: return default
+    try: return float(value)
+    except (TypeError, ValueError): return default
+
+
+@dataclass(slots=True)
+class Indicators:
+    close: float = 0.0
+    ema10: float = 0.0
+    ema20: float = 0.0
+    ema50: float = 0.0
+    ema200: float = 0.0
+    macd: float = 0.0
+    macd_signal: float = 0.0
+    rsi: float = 50.0
+    adx: float = 0.0
+    atr: float = 0.0
+    volume: float = 0.0
+    average_volume: float = 0.0
+
+    @classmethod
+    def from_tv(cls, ind):
+        """Bangun record dari dict `analysis.indicators` milik tradingview_ta."""
+        return cls(
+            safe_float(ind.get('close')),
+            safe_float(ind.get('EMA10')),
+            safe_float(ind.get('EMA20')),
+            safe_float(ind.get('EMA50')),
+            safe_float(ind.get('EMA200')),
+            safe_float(ind.get('MACD.macd')),
+            safe_float(ind.get('MACD.signal')),
+            safe_float(ind.get('RSI'), 50),
+            safe_float(ind.get('ADX')),
+            safe_float(ind.get('ATR')),
+            safe_float(ind.get('Volume')),
+            safe_float(ind.get('average_volume')),
+        )
+
+
+@dataclass(slots=True)
+class Position:
+    price: float
+    time: datetime
+    stop_loss: float
+    entry_atr: float
+    trailing_active: bool = False
+    highest_price: float = 0.0
+    entry_score: int = 0
+    break_even_active: bool = False
+
+    @classmethod
+    def from_dict(cls, d):
+        """Baca satu entry dari skema JSON active_buys.json (termasuk data lama)."""
+        price = float(d['price'])
+        return cls(
+            price=price,
+            time=datetime.fromisoformat(d['time']),
+            stop_loss=float(d['stop_loss']),
+            entry_atr=float(d.get('entry_atr', price * 0.02)), # Fallback 2% jika data lama
+            trailing_active=d.get('trailing_active', False),
+            highest_price=float(d.get('highest_price', price)),
+            entry_score=int(d.get('entry_score', 0)),
+            break_even_active=d.get('break_even_active', False),
+        )
+
+    def to_dict(self):
+        """Serialisasi balik ke skema JSON yang sama persis."""
+        return {
+            'price': self.price, 'time': self.time.isoformat(),
+            'stop_loss': self.stop_loss, 'entry_atr': self.entry_atr,
+            'trailing_active': self.trailing_active, 'highest_price': self.highest_price,
+            'entry_score': self.entry_score, 'break_even_active': self.break_even_active
+        }
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from state_io import write_json_if_changed
+
+# ==========================================
+# KONFIGURASI SCHEDULER SCAN
+# ==========================================
+# Workflow mematikan job pada timeout-minutes: 10. Scan dihentikan sebelum itu
+# supaya state sempat tersimpan; pair yang belum terscan dibawa ke depan
+# antrian run berikutnya. Budget dihitung dari sisa waktu job: waktu setup
+# sebelum main() (JOB_STARTED_AT dari workflow, atau estimasi), cadangan
+# untuk flush Telegram, dan waktu commit state setelah main().
+SCAN_STATE_FILE = 'scan_state.json'
+SCAN_DEADLINE_SECONDS = 8 * 60                                       # Batas atas scan
+JOB_TIMEOUT_SECONDS = int(os.getenv('JOB_TIMEOUT_MINUTES', '10')) * 60   # = timeout-minutes workflow
+JOB_SETUP_SECONDS = 120         # Estimasi checkout + install jika JOB_STARTED_AT tidak ada
+JOB_TEARDOWN_SECONDS = 60       # Simpan cache + commit & push state setelah main()
+FLUSH_RESERVE_SECONDS = 60      # Disisakan untuk flush antrian Telegram setelah scan
+MIN_FLUSH_SECONDS = 5
+SCAN_BATCH_SIZE = 20
+NEAR_THRESHOLD_MARGIN = 10      # Skor >= SCORE_WATCH - margin dianggap dekat threshold
+
+# Frekuensi scan adaptif per pair
+POINTS_PER_HOUR = 10            # Tiap 10 poin di bawah floor watch = tunda 1 jam lagi
+VETO_RESCAN_HOURS = 2           # Veto setup (RSI OB, jauh dari EMA20, RR) dicek ulang tiap 2 jam
+MAX_RESCAN_HOURS = 12
+HIGH_VOLATILITY_ATR_PCT = 3.0   # ATR 1H >= 3% harga: interval dipersingkat setengah
+DUE_TOLERANCE_MINUTES = 10      # Cron tidak selalu tepat waktu (tidak berlaku untuk veto 1D)
+
+# Jenis veto dari hasil scoring
+VETO_DAILY = "DAILY"            # Berubah hanya di candle 1D berikutnya (BTC bearish, downtrend 1D)
+VETO_SETUP = "SETUP"
+
+# STATE = {
+#   'carry_over': [pair, ...],
+#   'pairs': {pair: {'score': int, 'veto': str|None, 'atr_pct': float, 'next_scan': iso UTC}}
+# }
+STATE = {'carry_over': [], 'pairs': {}}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_scan_state():
+    global STATE
+    STATE = {'carry_over': [], 'pairs': {}}
+    if os.path.exists(SCAN_STATE_FILE):
+        try:
+            with open(SCAN_STATE_FILE, 'r') as f:
+                STATE.update(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Gagal memuat state scan: {e}")
+
+def save_scan_state():
+    try:
+        write_json_if_changed(SCAN_STATE_FILE, STATE)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan state scan: {e}")
+
+# ==========================================
+# ANTRIAN PRIORITAS
+# ==========================================
+def is_due(pair, now=None):
+    entry = STATE['pairs'].get(pair)
+    if not entry:
+        return True
+    now = now or datetime.now(timezone.utc)
+    # Veto 1D dijadwalkan tepat 00:00 UTC: toleransi akan membuatnya due di run
+    # 23:58 (candle 1D lama masih berjalan), jadi harus benar-benar lewat boundary
+    tolerance = 0 if entry['veto'] == VETO_DAILY else DUE_TOLERANCE_MINUTES
+    return datetime.fromisoformat(entry['next_scan']) <= now + timedelta(minutes=tolerance)
+
+def build_queue(pairs, held, now=None):
+    """
+    Urutan scan: posisi aktif -> sisa run sebelumnya -> WATCH/dekat threshold
+    (skor tertinggi dulu) -> sisanya sesuai ranking di pairs_cache.json.
+    Pair yang jadwal scan berikutnya belum tiba tidak dimasukkan antrian
+    (kecuali posisi aktif dan sisa run sebelumnya).
+    """
+    universe = set(pairs)
+    carry = [p for p in STATE['carry_over'] if p in universe]
+    due = [p for p in pairs if is_due(p, now)]
+    scores = STATE['pairs']
+    watch = sorted((p for p in due if p in scores and scores[p]['veto'] is None),
+                   key=lambda p: -scores[p]['score'])
+    return list(dict.fromkeys([*held, *carry, *watch, *due]))
+
+def next_scan_time(score, veto, atr_pct, watch_floor, now):
+    """
+    Dekat threshold -> setiap siklus. Veto 1D -> candle 1D berikutnya.
+    Sisanya makin jauh dari floor makin jarang, dipercepat jika volatil.
+    """
+    if veto == VETO_DAILY:
+        tomorrow = (now + timedelta(days=1)).date()
+        return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=timezone.utc)
+    if veto is None and score >= watch_floor - NEAR_THRESHOLD_MARGIN:
+        return now
+    if veto == VETO_SETUP:
+        hours = VETO_RESCAN_HOURS
+    else:
+        hours = 1 + (watch_floor - score) / POINTS_PER_HOUR
+    if atr_pct >= HIGH_VOLATILITY_ATR_PCT:
+        hours /= 2
+    hours = min(max(hours, 1), MAX_RESCAN_HOURS)
+    return now + timedelta(hours=hours)
+
+def record_result(pair, result, watch_floor, now=None):
+    """
+    Simpan hasil scan entry terakhir ke tabel prioritas.
+    `result` = (score, veto, atr_pct), atau None jika pair di-skip / sedang
+    punya posisi (entry dihapus supaya pair dianggap due di run berikutnya).
+    """
+    if result is None:
+        STATE['pairs'].pop(pair, None)
+        return
+    now = now or datetime.now(timezone.utc)
+    score, veto, atr_pct = result
+    STATE['pairs'][pair] = {
+        'score': score,
+        'veto': veto,
+        'atr_pct': round(atr_pct, 2),
+        'next_scan': next_scan_time(score, veto, atr_pct, watch_floor, now).isoformat(timespec='minutes'),
+    }
+
+def watch_list(watch_floor):
+    """Pair WATCH yang dipersistenkan (skor >= floor, tanpa veto), skor tertinggi dulu."""
+    rows = [(p, e['score']) for p, e in STATE['pairs'].items() if e['veto'] is None and e['score'] >= watch_floor]
+    return sorted(rows, key=lambda r: -r[1])
+
+def checkpoint(remaining):
+    """Catat pair yang belum terscan. Dipanggil sebelum tiap batch dan di akhir run."""
+    STATE['carry_over'] = list(remaining)
+    save_scan_state()
+
+def batches(queue, size=None):
+    size = size or SCAN_BATCH_SIZE
+    for i in range(0, len(queue), size):
+        yield i, queue[i:i + size]
+
+# ==========================================
+# DEADLINE
+# ==========================================
+class Deadline:
+    """Wall-clock budget satu run. Batch baru tidak dimulai jika diperkirakan lewat."""
+
+    def __init__(self, seconds=None):
+        self.start = time.monotonic()
+        started = os.getenv('JOB_STARTED_AT')
+        setup = time.time() - float(started) if started else JOB_SETUP_SECONDS
+        # Sisa waktu job untuk main() (scan + flush), sebelum teardown
+        self.job_seconds = JOB_TIMEOUT_SECONDS - JOB_TEARDOWN_SECONDS - setup
+        if seconds is None:
+            seconds = min(SCAN_DEADLINE_SECONDS, self.job_seconds - FLUSH_RESERVE_SECONDS)
+        self.seconds = seconds
+        self.batch_times = []
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def flush_budget(self):
+        """Detik yang masih boleh dipakai flush Telegram tanpa melewati timeout job."""
+        return max(MIN_FLUSH_SECONDS, self.job_seconds - self.elapsed())
+
+    def record_batch(self, duration):
+        self.batch_times.append(duration)
+
+    def can_start_batch(self):
+        expected = max(self.batch_times) if self.batch_times else 0
+        return self.elapsed() + expected < self.seconds
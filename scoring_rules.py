@@ -0,0 +1,302 @@
+import os
+import ast
+import json
+import time
+from collections import ChainMap
+from dataclasses import fields
+from records import Indicators
+
+# ==========================================
+# RULE SET SCORING DEKLARATIF
+# ==========================================
+# Bobot dan kondisi calculate_entry_score() didefinisikan di scoring_rules.json:
+#   params       : konstanta yang bisa di-tweak (dipakai di ekspresi & template alasan)
+#   derived      : variabel turunan, dihitung sekali per evaluasi
+#   hard_vetoes  : veto pertama yang cocok langsung mengembalikan skor 0
+#                  (kondisi 1D/makro, pair dijadwalkan ulang di candle 1D berikutnya)
+#   vetoes       : semua yang cocok dikumpulkan; ada satu saja -> skor 0
+#   groups       : tiap group = if/elif/else, cabang pertama yang cocok menambah poin
+#
+# Ekspresi memakai sintaks Python terbatas (perbandingan, and/or/not, + - * /,
+# abs) atas variabel `<field>_<tf>` (mis. ema20_4h, rsi_1h), `price`,
+# `sl_price`, `btc_bullish`. Pembagian dengan nol menghasilkan 0.
+#
+# Saat load, seluruh rule set di-compile menjadi satu fungsi Python (mode
+# skalar per pair) dan satu fungsi NumPy (mode mask untuk seluruh universe
+# sekaligus, dipakai rescore). File dicek ulang maksimal tiap
+# RELOAD_CHECK_SECONDS dan di-compile ulang jika berubah.
+RULES_FILE = 'scoring_rules.json'
+RELOAD_CHECK_SECONDS = 5
+
+TIMEFRAMES = ('1d', '4h', '1h')
+INDICATOR_FIELDS = tuple(f.name for f in fields(Indicators))
+INPUTS = ('price', 'sl_price', 'btc_bullish')
+VARIABLES = tuple(f"{name}_{tf}" for tf in TIMEFRAMES for name in INDICATOR_FIELDS) + INPUTS
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Gt, ast.GtE,
+    ast.Lt, ast.LtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant, ast.Call,
+)
+
+
+class RuleError(ValueError):
+    """Rule set tidak valid (ekspresi, nama variabel, atau struktur)."""
+
+
+# ==========================================
+# PARSING & TRANSFORMASI EKSPRESI
+# ==========================================
+def _parse(expr, names):
+    try:
+        tree = ast.parse(expr, mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"Ekspresi tidak valid '{expr}': {e}") from e
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise RuleError(f"Sintaks '{type(node).__name__}' tidak diizinkan di '{expr}'")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id == 'abs' and len(node.args) == 1):
+            raise RuleError(f"Hanya abs(x) yang boleh dipanggil di '{expr}'")
+        if isinstance(node, ast.Name) and node.id != 'abs' and node.id not in names:
+            raise RuleError(f"Variabel tidak dikenal '{node.id}' di '{expr}'")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise RuleError(f"Konstanta harus angka di '{expr}'")
+    return tree.body
+
+
+class _Scalar(ast.NodeTransformer):
+    """Param -> konstanta, a / b -> _div(a, b)."""
+
+    def __init__(self, params):
+        self.params = params
+
+    def visit_Name(self, node):
+        if node.id in self.params:
+            return ast.Constant(self.params[node.id])
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            return ast.Call(ast.Name('_div', ast.Load()), [node.left, node.right], [])
+        return node
+
+
+class _Vector(_Scalar):
+    """Seperti _Scalar, plus and/or/not -> & | ~ dan a < b < c -> (a < b) & (b < c)."""
+
+    def visit_BinOp(self, node):
+        node = super().visit_BinOp(node)
+        if isinstance(node, ast.Call):
+            node.func.id = '_vdiv'
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(result, op, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(ast.Invert(), node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left, parts = node.left, []
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left, [op], [right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(result, ast.BitAnd(), part)
+        return result
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id == 'abs':
+            node.func = ast.Attribute(ast.Name('np', ast.Load()), 'abs', ast.Load())
+        return node
+
+
+def _div(a, b):
+    return a / b if b else 0.0
+
+def _vdiv(a, b):
+    import numpy as np
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return np.divide(a, b, out=np.zeros(a.shape), where=b != 0)
+
+# ==========================================
+# RULE SET TER-COMPILE
+# ==========================================
+class RuleSet:
+    def __init__(self, config, overrides=None):
+        self.config = config
+        self.version = config.get('version', '?')
+        self.params = {**config.get('params', {}), **(overrides or {})}
+        for name, value in self.params.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise RuleError(f"Param {name} harus angka")
+
+        names = set(VARIABLES) | set(self.params)
+        self.derived = []
+        for name, expr in config.get('derived', {}).items():
+            if name in names:
+                raise RuleError(f"Nama turunan '{name}' bentrok dengan variabel/param")
+            self.derived.append((name, _parse(expr, names)))
+            names.add(name)
+
+        def rules(items, need_when=True):
+            out = []
+            for item in items:
+                when = item.get('when')
+                if when is None and need_when:
+                    raise RuleError(f"Rule tanpa 'when': {item}")
+                out.append((_parse(when, names) if when else None, item.get('points', 0), item['reason']))
+            return out
+
+        self.hard_vetoes = rules(config.get('hard_vetoes', []))
+        self.vetoes = rules(config.get('vetoes', []))
+        self.groups = [rules(g['branches'], need_when=False) for g in config.get('groups', [])]
+        # Alasan hard veto (tanpa placeholder) -> veto yang hanya berubah di candle 1D
+        self.daily_vetoes = {reason for _, _, reason in self.hard_vetoes}
+
+        self._score = self._compile_scalar()
+        self._score_many = None
+
+    def with_params(self, overrides):
+        return RuleSet(self.config, overrides)
+
+    # ------------------------------------------
+    # MODE SKALAR
+    # ------------------------------------------
+    def _compile_scalar(self):
+        transform = _Scalar(self.params)
+        expr = lambda node: ast.unparse(transform.visit(_copy(node)))
+        reasons = []
+
+        def reason(text):
+            reasons.append(text)
+            if '{' not in text:
+                return f"_R[{len(reasons) - 1}]"
+            return f"_R[{len(reasons) - 1}].format_map(_ns(locals()))"
+
+        lines = ["def _evaluate(d1, d4, h, price, sl_price, btc_bullish):"]
+        for tf, arg in zip(TIMEFRAMES, ('d1', 'd4', 'h')):
+            lines += [f"    {name}_{tf} = {arg}.{name}" for name in INDICATOR_FIELDS]
+        lines += [f"    {name} = {expr(node)}" for name, node in self.derived]
+        lines += ["    reasons = []", "    vetoes = []"]
+        for when, _, text in self.hard_vetoes:
+            lines += [f"    if {expr(when)}:", f"        return 0, reasons, [{reason(text)}]"]
+        for when, _, text in self.vetoes:
+            lines += [f"    if {expr(when)}:", f"        vetoes.append({reason(text)})"]
+        lines += ["    if vetoes:", "        return 0, reasons, vetoes", "    score = 0"]
+        for branches in self.groups:
+            for i, (when, points, text) in enumerate(branches):
+                head = 'else:' if when is None else f"{'if' if i == 0 else 'elif'} {expr(when)}:"
+                lines += [f"    {head}", f"        score += {points}", f"        reasons.append({reason(text)})"]
+        lines += ["    return score, reasons, vetoes"]
+
+        params = dict(self.params)
+        namespace = {'_div': _div, '_R': reasons, '_ns': lambda local: ChainMap(local, params)}
+        exec(compile('\n'.join(lines), f"<{RULES_FILE}>", 'exec'), namespace)
+        return namespace['_evaluate']
+
+    def score(self, data_1d, data_4h, data_1h, price, sl_price, btc_bullish):
+        """(score, reasons, vetoes) persis seperti calculate_entry_score()."""
+        return self._score(data_1d, data_4h, data_1h, price, sl_price, btc_bullish)
+
+    # ------------------------------------------
+    # MODE VEKTOR (NUMPY)
+    # ------------------------------------------
+    def _compile_vector(self):
+        import numpy as np
+        transform = _Vector(self.params)
+        expr = lambda node: ast.unparse(transform.visit(_copy(node)))
+
+        lines = ["def _evaluate_many(v):", "    n = len(v['price'])"]
+        lines += [f"    {name} = v['{name}']" for name in VARIABLES]
+        lines += [f"    {name} = {expr(node)}" for name, node in self.derived]
+        lines += ["    vetoed = np.zeros(n, dtype=bool)"]
+        for when, _, _ in self.hard_vetoes + self.vetoes:
+            lines += [f"    vetoed |= np.broadcast_to({expr(when)}, n)"]
+        lines += ["    score = np.zeros(n, dtype=np.int64)"]
+        for branches in self.groups:
+            lines += ["    taken = np.zeros(n, dtype=bool)"]
+            for when, points, _ in branches:
+                cond = "~taken" if when is None else f"np.broadcast_to({expr(when)}, n) & ~taken"
+                lines += [f"    hit = {cond}", f"    score += {points} * hit", "    taken |= hit"]
+        lines += ["    score[vetoed] = 0", "    return score, vetoed"]
+
+        namespace = {'np': np, '_vdiv': _vdiv}
+        exec(compile('\n'.join(lines), f"<{RULES_FILE}:vector>", 'exec'), namespace)
+        return namespace['_evaluate_many']
+
+    def score_many(self, variables):
+        """
+        Evaluasi banyak baris sekaligus. `variables` = {nama variabel: array};
+        mengembalikan (score int array, vetoed bool array). Butuh NumPy.
+        """
+        import numpy as np
+        if self._score_many is None:
+            self._score_many = self._compile_vector()
+        arrays = {name: np.asarray(variables[name], dtype=bool if name == 'btc_bullish' else float) for name in VARIABLES}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._score_many(arrays)
+
+
+def _copy(node):
+    return ast.parse(ast.unparse(node), mode='eval').body
+
+# ==========================================
+# LOAD & HOT RELOAD
+# ==========================================
+_ACTIVE = None
+_ACTIVE_MTIME = None
+_LAST_CHECK = 0.0
+
+def load(path=RULES_FILE, overrides=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        return RuleSet(json.load(f), overrides)
+
+def get_rules():
+    """Rule set aktif. File dicek ulang berkala; jika berubah dan valid, di-compile ulang."""
+    global _ACTIVE, _ACTIVE_MTIME, _LAST_CHECK
+    now = time.monotonic()
+    if _ACTIVE is not None and now - _LAST_CHECK < RELOAD_CHECK_SECONDS:
+        return _ACTIVE
+    _LAST_CHECK = now
+    try:
+        mtime = os.stat(RULES_FILE).st_mtime_ns
+    except OSError as e:
+        if _ACTIVE is None:
+            raise
+        print(f"⚠️ {RULES_FILE} tidak bisa dibaca, tetap memakai rule yang sudah di-compile: {e}")
+        return _ACTIVE
+    if mtime != _ACTIVE_MTIME:
+        try:
+            rules = load()
+        except Exception as e:
+            # Struktur salah (mis. list di tempat dict) bisa berupa TypeError /
+            # AttributeError, bukan hanya RuleError; scan tidak boleh ikut crash.
+            if _ACTIVE is None:
+                raise
+            print(f"⚠️ Rule scoring baru tidak valid, tetap memakai versi lama: {type(e).__name__}: {e}")
+        else:
+            if _ACTIVE is not None:
+                print(f"🔄 Rule scoring di-reload ({rules.version}).")
+            _ACTIVE = rules
+        _ACTIVE_MTIME = mtime
+    return _ACTIVE
+
+def set_rules(rules):
+    """Pasang rule set tertentu (mis. untuk rescore). None = kembali ke file."""
+    global _ACTIVE, _ACTIVE_MTIME, _LAST_CHECK
+    _ACTIVE = rules
+    _ACTIVE_MTIME = None if rules is None else os.stat(RULES_FILE).st_mtime_ns
+    _LAST_CHECK = time.monotonic() if rules is not None else 0.0
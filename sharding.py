@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import subprocess
+from datetime import datetime, timezone
+from state_io import write_json_if_changed
+
+# ==========================================
+# SHARDING UNIVERSE PAIR
+# ==========================================
+# Universe dibagi ke N shard dengan hash deterministik nama pair (bukan
+# hash() bawaan Python yang di-salt per proses), jadi pair yang sama selalu
+# jatuh ke shard yang sama di runner mana pun. Setiap shard:
+#   1. menyalin file state kanonik ke shards/<index>/ lalu bekerja di sana,
+#   2. hanya men-scan pair miliknya (termasuk posisi aktif miliknya),
+#   3. menulis shard_delta.json berisi state pair miliknya saja.
+# Langkah merge lalu mengganti entry milik tiap shard di state kanonik.
+# Karena setiap key state (posisi, cooldown, return, candle, negative cache,
+# prioritas scan) terikat ke satu pair, tidak ada dua shard yang menulis key
+# yang sama, jadi merge tidak pernah konflik.
+#
+# Batas risiko portfolio (total posisi, total risiko, cluster korelasi) di
+# shard hanya melihat posisi kanonik + entry shard itu sendiri, jadi N shard
+# bisa melampaui batas hingga N kali. Karena itu shard menahan alert entry
+# barunya di delta; merge menguji ulang semua entry baru terhadap state
+# gabungan (skor tertinggi dulu), membatalkan kelebihannya, dan baru
+# mengirim alert untuk entry yang lolos.
+SHARD_DIR = 'shards'
+DELTA_FILE = 'shard_delta.json'
+LOG_FILE = 'run.log'
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+# ==========================================
+# PARTISI
+# ==========================================
+def shard_of(pair, count):
+    digest = hashlib.md5(pair.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+def owns(key, index, count):
+    """Key state berbentuk `PAIR` atau `PAIR|interval`."""
+    return shard_of(key.split('|')[0], count) == index
+
+def select(pairs, index, count):
+    return [p for p in pairs if shard_of(p, count) == index]
+
+def workdir(index):
+    return os.path.join(SHARD_DIR, str(index))
+
+def state_files():
+    import alert_ledger
+    import candle_store
+    import macro_regime
+    import performance
+    import portfolio_risk
+    import recap
+    import scan_scheduler
+    import signal_bot
+    import symbol_cache
+    import timers
+    import trade_index
+    return (
+        signal_bot.PAIRS_FILE, signal_bot.ACTIVE_BUYS_FILE, signal_bot.COOLDOWNS_FILE,
+        performance.TRADE_HISTORY_FILE, recap.RECAP_SENT_FILE,
+        macro_regime.MACRO_FILE, portfolio_risk.RETURNS_FILE, symbol_cache.NEGATIVE_CACHE_FILE,
+        scan_scheduler.SCAN_STATE_FILE, candle_store.CANDLE_FILE, performance.PERFORMANCE_FILE,
+        timers.TIMERS_FILE, alert_ledger.LEDGER_FILE, trade_index.TRADE_INDEX_FILE,
+    )
+
+def enter_workdir(index):
+    """Salin state kanonik ke direktori kerja shard lalu pindah ke sana."""
+    path = workdir(index)
+    os.makedirs(path, exist_ok=True)
+    for name in (*state_files(), DELTA_FILE):
+        target = os.path.join(path, name)
+        if name != DELTA_FILE and os.path.exists(name):
+            shutil.copyfile(name, target)
+        elif os.path.exists(target):
+            os.remove(target)  # Sisa run sebelumnya tidak boleh ikut terbawa
+    os.chdir(path)
+
+# ==========================================
+# EXPORT DELTA (DIJALANKAN DI SHARD)
+# ==========================================
+def export_delta(index, count, history_start):
+    """Tulis state milik shard ini ke shard_delta.json di direktori kerja."""
+    import alert_ledger
+    import candle_store
+    import macro_regime
+    import performance
+    import portfolio_risk
+    import scan_scheduler
+    import signal_bot
+    import snapshot_log
+    import symbol_cache
+
+    def mine(data):
+        return {k: v for k, v in data.items() if owns(k, index, count)}
+
+    delta = {
+        'index': index,
+        'count': count,
+        'finished': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'active_buys': {p: pos.to_dict() for p, pos in mine(signal_bot.ACTIVE_BUYS).items()},
+        'cooldowns': {p: t.isoformat() for p, t in mine(signal_bot.COOLDOWNS).items()},
+        'trades': performance.load_trade_history()[history_start:],
+        'scan_pairs': mine(scan_scheduler.STATE['pairs']),
+        'carry_over': scan_scheduler.STATE['carry_over'],
+        'returns': mine(portfolio_risk.RETURNS),
+        'candles': mine(candle_store.CANDLES),
+        'negative': mine(symbol_cache.NEGATIVE),
+        'macro': macro_regime.MACRO,
+        'snapshots': snapshot_log.take_cycle(),
+        'alerts': alert_ledger.ENTRIES,
+        'entries': signal_bot.DEFERRED_ENTRIES,
+    }
+    write_json_if_changed(DELTA_FILE, delta, indent=None)
+    print(f"🧩 Delta shard {index + 1}/{count} ditulis ({len(delta['trades'])} trade baru).")
+
+# ==========================================
+# MERGE (REDUCE) KE STATE KANONIK
+# ==========================================
+def load_delta(index):
+    path = os.path.join(workdir(index), DELTA_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Gagal memuat delta shard {index}: {e}")
+        return None
+
+def _replace_owned(target, data, index, count):
+    """Ganti semua entry milik shard di `target` dengan isi `data`."""
+    for key in [k for k in target if owns(k, index, count)]:
+        del target[key]
+    target.update(data)
+
+def enforce_portfolio_limits(entries):
+    """
+    Uji ulang entry baru semua shard terhadap batas portfolio, skor tertinggi
+    dulu. Entry yang melampaui batas dihapus dari ACTIVE_BUYS. Mengembalikan
+    alert entry yang lolos (belum dikirim).
+    """
+    import portfolio_risk
+    import signal_bot
+
+    entries = sorted(entries, key=lambda e: e['score'], reverse=True)
+    candidates = {e['pair']: signal_bot.ACTIVE_BUYS.pop(e['pair'], None) for e in entries}
+    accepted = []
+    for e in entries:
+        pair, pos = e['pair'], candidates[e['pair']]
+        signal_bot.mark_dirty(pair)
+        if pos is None:
+            continue
+        allowed, reason = portfolio_risk.check_portfolio_risk(pair, pos.price, pos.stop_loss, signal_bot.ACTIVE_BUYS)
+        if allowed:
+            signal_bot.ACTIVE_BUYS[pair] = pos
+            accepted.append(e)
+        else:
+            print(f"🚫 Entry {pair} (Score: {e['score']}/100) dibatalkan saat merge - {reason}")
+    return accepted
+
+def _trade_key(t):
+    return (t.get('pair'), t.get('entry_date'), t.get('exit_date'), t.get('exit_reason'))
+
+def merge_shards(count):
+    """
+    Gabungkan shard_delta.json semua shard ke state kanonik di direktori saat
+    ini. Shard yang tidak menghasilkan delta (gagal/timeout) tidak mengubah
+    apa pun: entry miliknya di state kanonik tetap dipakai.
+    """
+    import alert_ledger
+    import candle_store
+    import macro_regime
+    import performance
+    import portfolio_risk
+    import scan_scheduler
+    import signal_bot
+    import snapshot_log
+    import symbol_cache
+    import telegram_fanout
+    import trade_index
+    from records import Position
+
+    deltas = []
+    for index in range(count):
+        delta = load_delta(index)
+        if delta is None:
+            print(f"⚠️ Shard {index + 1}/{count} tidak punya delta. State lamanya dipertahankan.")
+        elif delta.get('count') != count:
+            print(f"⚠️ Delta shard {index + 1} dibuat untuk {delta.get('count')} shard, bukan {count}. Dilewati.")
+        else:
+            deltas.append(delta)
+    if not deltas:
+        print("❌ Tidak ada delta shard untuk di-merge.")
+        return False
+
+    signal_bot.load_active_buys()
+    signal_bot.load_cooldowns()
+    portfolio_risk.load_returns()
+    macro_regime.load_macro()
+    symbol_cache.load_negative_cache()
+    scan_scheduler.load_scan_state()
+    candle_store.load_candles()
+    history = performance.load_trade_history()
+    seen_trades = {_trade_key(t) for t in history}
+    performance.load_performance()
+    performance.ensure_synced(history)
+    trade_index.load_index()
+    trade_index.ensure_synced(history)
+
+    carry_over = [p for p in scan_scheduler.STATE['carry_over']
+                  if not any(owns(p, d['index'], count) for d in deltas)]
+    entries = []
+    snapshots = {c: [] for c in snapshot_log.COLUMNS}
+    for d in deltas:
+        index = d['index']
+        for pair in [p for p in signal_bot.ACTIVE_BUYS if owns(p, index, count)]:
+            if pair not in d['active_buys']:
+                del signal_bot.ACTIVE_BUYS[pair]
+                signal_bot.mark_dirty(pair)
+        for pair, pos in d['active_buys'].items():
+            signal_bot.ACTIVE_BUYS[pair] = Position.from_dict(pos)
+            signal_bot.mark_dirty(pair)
+
+        for pair in [p for p in signal_bot.COOLDOWNS if owns(p, index, count)]:
+            if pair not in d['cooldowns']:
+                signal_bot.clear_cooldown(pair)
+        for pair, until in d['cooldowns'].items():
+            signal_bot.set_cooldown(pair, datetime.fromisoformat(until))
+
+        for t in d['trades']:
+            if _trade_key(t) not in seen_trades:
+                seen_trades.add(_trade_key(t))
+                history.append(t)
+                performance.add_trade(t)
+                trade_index.add_trade(t)
+
+        _replace_owned(scan_scheduler.STATE['pairs'], d['scan_pairs'], index, count)
+        _replace_owned(portfolio_risk.RETURNS, d['returns'], index, count)
+        _replace_owned(candle_store.CANDLES, d['candles'], index, count)
+        _replace_owned(symbol_cache.NEGATIVE, d['negative'], index, count)
+        carry_over += d['carry_over']
+        entries += d.get('entries') or []
+        alert_ledger.merge(d.get('alerts') or {})
+        shard_snapshots = d.get('snapshots') or {}
+        if set(shard_snapshots) == set(snapshots):
+            for c in snapshots:
+                snapshots[c] += shard_snapshots[c]
+
+        # Semua shard menghitung regime dari data BTC yang sama; ambil yang terbaru
+        macro = d.get('macro') or {}
+        if macro.get('day', '') > macro_regime.MACRO.get('day', ''):
+            macro_regime.MACRO.clear()
+            macro_regime.MACRO.update(macro)
+            macro_regime.save_macro()
+
+    # Return & posisi semua shard sudah tergabung: batas portfolio dicek lintas shard
+    accepted = enforce_portfolio_limits(entries)
+
+    history.sort(key=lambda t: t.get('exit_date', ''))
+    performance.save_trade_history(history)
+    performance.save_performance()
+    trade_index.save_index()
+    signal_bot.save_active_buys()
+    signal_bot.save_cooldowns()
+    portfolio_risk.save_returns()
+    candle_store.save_candles()
+    symbol_cache.save_negative_cache()
+    for alert in accepted:
+        signal_bot.send_telegram_alert(**alert)
+    telegram_fanout.flush()
+    alert_ledger.save_ledger()
+    scan_scheduler.checkpoint(carry_over)
+    snapshot_log.write_cycle(snapshots)
+
+    for d in deltas:
+        os.remove(os.path.join(workdir(d['index']), DELTA_FILE))
+    if len(accepted) < len(entries):
+        print(f"🚫 {len(entries) - len(accepted)}/{len(entries)} entry shard dibatalkan oleh batas portfolio.")
+    print(f"✅ Merge {len(deltas)}/{count} shard selesai: {len(signal_bot.ACTIVE_BUYS)} posisi aktif, "
+          f"{len(scan_scheduler.STATE['carry_over'])} pair carry-over.")
+    return len(deltas) == count
+
+# ==========================================
+# EKSEKUSI PARALEL LOKAL
+# ==========================================
+def run_local(count):
+    """Jalankan `count` shard sebagai proses paralel, lalu merge hasilnya."""
+    procs = []
+    for index in range(count):
+        os.makedirs(workdir(index), exist_ok=True)
+        log = open(os.path.join(workdir(index), LOG_FILE), 'w')
+        cmd = [sys.executable, BOT_SCRIPT, 'shard-run', '--index', str(index), '--count', str(count)]
+        procs.append((index, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT), log))
+    print(f"🧩 {count} shard berjalan paralel (log di {SHARD_DIR}/<index>/{LOG_FILE}).")
+
+    failed = 0
+    for index, proc, log in procs:
+        code = proc.wait()
+        log.close()
+        if code != 0:
+            failed += 1
+            print(f"❌ Shard {index + 1}/{count} selesai dengan kode {code}.")
+    ok = merge_shards(count)
+    return 0 if ok and not failed else 1
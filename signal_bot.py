@@ -1,8 +1,30 @@
 import os
-import requests
 import json
 from datetime import datetime, timedelta, timezone
-from tradingview_ta import TA_Handler, Interval
+import alert_ledger
+import botlog
+import candle_store
+import macro_regime
+import market_data
+import market_snapshot
+import performance
+import portfolio_risk
+import recap
+import scan_scheduler
+import scoring_rules
+import sharding
+import snapshot_log
+import symbol_cache
+import telegram_fanout
+import timers
+import trade_index
+from http_transport import get_transport
+from records import Position
+from state_io import write_json_if_changed
+
+# Catatan: `requests` dan `tradingview_ta` sengaja di-import di dalam fungsi
+# yang memakainya, supaya subcommand ringan (exits-only) tidak
+# membayar waktu import modul berat.
 
 # ==========================================
 # KONFIGURASI DASAR
@@ -13,18 +35,27 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', 'YOUR_TELEGRAM_CHAT_ID')
 PAIRS_FILE = 'pairs_cache.json'
 ACTIVE_BUYS_FILE = 'active_buys.json'
 COOLDOWNS_FILE = 'cooldowns.json'
-TRADE_HISTORY_FILE = 'trade_history.json'
-RECAP_SENT_FILE = 'recap_sent.json'
 
 ACTIVE_BUYS = {}
 COOLDOWNS = {}
 
+# Change tracking: hanya posisi yang berubah yang diserialisasi ulang,
+# dan file tidak ditulis sama sekali jika siklus tidak mengubah apa pun.
+DIRTY_BUYS = set()
+COOLDOWNS_DIRTY = False
+_SERIALIZED_BUYS = {}
+
+# Mode shard: alert entry baru ditahan dan dikirim merge_shards setelah batas
+# risiko portfolio dicek ulang lintas shard (lihat sharding.py)
+DEFER_ENTRY_ALERTS = False
+DEFERRED_ENTRIES = []
+
 # ==========================================
-# TIMEFRAME
+# TIMEFRAME (nilai sama dengan tradingview_ta.Interval)
 # ==========================================
-TF_TREND = Interval.INTERVAL_1_DAY
-TF_SETUP = Interval.INTERVAL_4_HOURS
-TF_ENTRY = Interval.INTERVAL_1_HOUR
+TF_TREND = "1d"   # Interval.INTERVAL_1_DAY
+TF_SETUP = "4h"   # Interval.INTERVAL_4_HOURS
+TF_ENTRY = "1h"   # Interval.INTERVAL_1_HOUR
 
 # ==========================================
 # PARAMETER STRATEGI (V4 - Improved)
@@ -34,37 +65,41 @@ MAX_DISTANCE_FROM_EMA20_PCT = 7.0
 RSI_OVERBOUGHT_VETO = 75
 COOLDOWN_HOURS = 12
 
+# Cooldown adaptif dari rekam jejak pair (trade_index.py)
+COOLDOWN_ESCALATION = 2.0      # Tiap rugi beruntun berikutnya cooldown dikali 2
+COOLDOWN_MAX_HOURS = 72
+COOLDOWN_LOSS_STREAK = 2       # Exit rugi selain SL ikut kena cooldown mulai streak ini
+COOLDOWN_SHORTEN_WIN_RATE = 0.6 # Win rate trade terakhir >= 60% -> cooldown dipersingkat
+COOLDOWN_SHORTEN_FACTOR = 0.5
+COOLDOWN_MIN_SAMPLES = 4       # Minimal trade di indeks sebelum win rate dipakai
+
 # Parameter Trailing & Break Even Berbasis ATR
 ATR_TRAIL_ACTIVATION = 2.0     # Trailing aktif jika profit mencapai 2x ATR
 ATR_TRAIL_DISTANCE = 1.5       # Trailing Stop berada 1.5x ATR di bawah harga tertinggi
 BREAK_EVEN_ATR_MULTIPLIER = 1.0 # Pindah SL ke Entry jika profit 1x ATR
+MAX_HOLD_HOURS = 0             # Tutup posisi setelah N jam hold (0 = nonaktif)
 
 SCORE_BUY_STRONG = 90
 SCORE_BUY = 80
+SCORE_BUY_NEUTRAL = 85          # Regime makro NEUTRAL (breadth lemah / dominance naik)
 SCORE_WATCH = 60
 
+VETO_MACRO = "Market Makro (BTC) Bearish - Semua Buy Dibatalkan"
+VETO_DOWNTREND_1D = "1D Downtrend jelas (Close<EMA50<EMA200)"
+
 # ==========================================
 # FUNGSI UTILITY: LOAD & SAVE
 # ==========================================
 def load_active_buys():
     global ACTIVE_BUYS
+    DIRTY_BUYS.clear()
+    _SERIALIZED_BUYS.clear()
     if os.path.exists(ACTIVE_BUYS_FILE):
         try:
             with open(ACTIVE_BUYS_FILE, 'r') as f:
                 data = json.load(f)
-                ACTIVE_BUYS = {
-                    pair: {
-                        'price': float(d['price']),
-                        'time': datetime.fromisoformat(d['time']),
-                        'stop_loss': float(d['stop_loss']),
-                        'entry_atr': float(d.get('entry_atr', d['price'] * 0.02)), # Fallback 2% jika data lama
-                        'trailing_active': d.get('trailing_active', False),
-                        'highest_price': float(d.get('highest_price', d['price'])),
-                        'entry_score': int(d.get('entry_score', 0)),
-                        'break_even_active': d.get('break_even_active', False)
-                    }
-                    for pair, d in data.items()
-                }
+                ACTIVE_BUYS = {pair: Position.from_dict(d) for pair, d in data.items()}
+            _SERIALIZED_BUYS.update({pair: pos.to_dict() for pair, pos in ACTIVE_BUYS.items()})
             print(f"✅ Dimuat {len(ACTIVE_BUYS)} posisi aktif.")
         except Exception as e:
             print(f"❌ Gagal memuat posisi aktif: {e}")
@@ -72,23 +107,27 @@ def load_active_buys():
     else:
         ACTIVE_BUYS = {}
 
+def mark_dirty(pair):
+    """Tandai posisi pair (baru, berubah, atau dihapus) untuk disimpan."""
+    DIRTY_BUYS.add(pair)
+
 def save_active_buys():
+    if not DIRTY_BUYS:
+        return
     try:
-        data = {}
-        for pair, d in ACTIVE_BUYS.items():
-            data[pair] = {
-                'price': d['price'], 'time': d['time'].isoformat(),
-                'stop_loss': d['stop_loss'], 'entry_atr': d['entry_atr'], 
-                'trailing_active': d['trailing_active'], 'highest_price': d['highest_price'],
-                'entry_score': d['entry_score'], 'break_even_active': d['break_even_active']
-            }
-        with open(ACTIVE_BUYS_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        for pair in DIRTY_BUYS:
+            if pair in ACTIVE_BUYS:
+                _SERIALIZED_BUYS[pair] = ACTIVE_BUYS[pair].to_dict()
+            else:
+                _SERIALIZED_BUYS.pop(pair, None)
+        write_json_if_changed(ACTIVE_BUYS_FILE, _SERIALIZED_BUYS)
+        DIRTY_BUYS.clear()
     except Exception as e:
         print(f"❌ Gagal menyimpan posisi aktif: {e}")
 
 def load_cooldowns():
-    global COOLDOWNS
+    global COOLDOWNS, COOLDOWNS_DIRTY
+    COOLDOWNS_DIRTY = False
     if os.path.exists(COOLDOWNS_FILE):
         try:
             with open(COOLDOWNS_FILE, 'r') as f:
@@ -97,46 +136,29 @@ def load_cooldowns():
         except:
             COOLDOWNS = {}
 
+def set_cooldown(pair, until):
+    global COOLDOWNS_DIRTY
+    COOLDOWNS[pair] = until
+    COOLDOWNS_DIRTY = True
+    timers.schedule(timers.KIND_COOLDOWN, pair, until)
+
+def clear_cooldown(pair):
+    global COOLDOWNS_DIRTY
+    if COOLDOWNS.pop(pair, None) is not None:
+        COOLDOWNS_DIRTY = True
+    timers.cancel(timers.KIND_COOLDOWN, pair)
+
 def save_cooldowns():
+    global COOLDOWNS_DIRTY
+    if not COOLDOWNS_DIRTY:
+        return
     try:
         data = {k: v.isoformat() for k, v in COOLDOWNS.items()}
-        with open(COOLDOWNS_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        write_json_if_changed(COOLDOWNS_FILE, data)
+        COOLDOWNS_DIRTY = False
     except Exception as e:
         print(f"❌ Gagal simpan cooldown: {e}")
 
-def load_trade_history():
-    if os.path.exists(TRADE_HISTORY_FILE):
-        try:
-            with open(TRADE_HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_trade_history(history):
-    try:
-        with open(TRADE_HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=4)
-    except Exception as e:
-        print(f"❌ Gagal simpan riwayat trade: {e}")
-
-def load_recap_sent():
-    if os.path.exists(RECAP_SENT_FILE):
-        try:
-            with open(RECAP_SENT_FILE, 'r') as f:
-                return json.load(f).get('last_sent_date', '')
-        except:
-            return ''
-    return ''
-
-def save_recap_sent(date_str):
-    try:
-        with open(RECAP_SENT_FILE, 'w') as f:
-            json.dump({'last_sent_date': date_str}, f)
-    except:
-        pass
-
 def get_pairs_from_file():
     default_pairs = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT"]
     if not os.path.exists(PAIRS_FILE):
@@ -147,7 +169,8 @@ def get_pairs_from_file():
     try:
         with open(PAIRS_FILE, 'r') as f:
             pairs = json.load(f)
-        print(f"✅ Memuat {len(pairs)} pair: {pairs}")
+        botlog.info('pairs_loaded', "✅ Memuat {count} pair.", count=len(pairs))
+        botlog.debug('pairs_list', "   {pairs}", pairs=pairs)
         return pairs
     except Exception as e:
         print(f"❌ Gagal membaca {PAIRS_FILE}: {e}")
@@ -156,94 +179,131 @@ def get_pairs_from_file():
 # ==========================================
 # FUNGSI ANALISIS TRADINGVIEW
 # ==========================================
-def get_analysis(pair, interval):
-    try:
-        handler = TA_Handler(symbol=pair, exchange="BINANCE", screener="CRYPTO", interval=interval)
-        return handler.get_analysis()
-    except Exception as e:
-        print(f"⚠️ Gagal menganalisis {pair} pada {interval}: {e}")
+def fetch_pair_indicators(pairs, warm=None):
+    """
+    Ambil indikator 1D/4H/1H semua pair secara paralel lewat transport bersama.
+    1H dari market_data (TradingView, failover ke klines); 4H/1D dihitung
+    lokal dari candle store (resampling bar 1H). Hanya pair yang candle
+    store-nya gagal yang fallback ke market_data untuk 4H/1D.
+    `warm` = hasil prefetch.warm(): pair yang sudah disinkron/di-fetch di sana dilewati.
+    Mengembalikan dict {(pair, interval): Indicators atau None}.
+    """
+    warm = warm or {'synced': set(), 'indicators': {}}
+    ready = candle_store.sync_pairs([p for p in pairs if p not in warm['synced']])
+    ready |= warm['synced'] & set(pairs)
+    higher = [(pair, tf) for pair in pairs if pair not in ready for tf in (TF_TREND, TF_SETUP)]
+    jobs = [(pair, TF_ENTRY) for pair in pairs]
+    jobs += [job for job in higher if job not in warm['indicators']]
+    results = get_transport().map(lambda job: market_data.get_indicators(*job), jobs)
+    data = dict(zip(jobs, results))
+    data.update({job: warm['indicators'][job] for job in higher if job in warm['indicators']})
+
+    for pair in ready:
+        data_1h = data.get((pair, TF_ENTRY))
+        live_close = data_1h.close if data_1h else None
+        for tf in (TF_TREND, TF_SETUP):
+            data[(pair, tf)] = candle_store.get_indicators(pair, tf, live_close)
+    return data
+
+def fetch_btc_1d():
+    """Indikator BTC pada bar 1D terakhir yang sudah close (candle store), untuk regime makro."""
+    if not candle_store.sync_pair("BTCUSDT"):
         return None
-
-def extract_indicators(analysis):
-    if not analysis or not analysis.indicators:
-        return {}
-    ind = analysis.indicators
-    
-    def safe_float(value, default=0):
-        if value is None: return default
-        try: return float(value)
-        except (TypeError, ValueError): return default
-    
-    return {
-        'close': safe_float(ind.get('close')),
-        'ema10': safe_float(ind.get('EMA10')),
-        'ema20': safe_float(ind.get('EMA20')),
-        'ema50': safe_float(ind.get('EMA50')),
-        'ema200': safe_float(ind.get('EMA200')),
-        'macd': safe_float(ind.get('MACD.macd')),
-        'macd_signal': safe_float(ind.get('MACD.signal')),
-        'rsi': safe_float(ind.get('RSI'), 50),
-        'adx': safe_float(ind.get('ADX')),
-        'atr': safe_float(ind.get('ATR')),
-        'volume': safe_float(ind.get('Volume')),
-        'average_volume': safe_float(ind.get('average_volume')),
-    }
+    return candle_store.closed_indicators("BTCUSDT", TF_TREND)
+
+def universe_breadth():
+    """
+    (above, total) pair universe dengan close 1D > EMA50 1D, dari state 1D
+    terakhir yang diketahui di candle store (termasuk pair yang belum jadwal
+    scan atau sedang dipegang). Dipanggil sekali per candle 1D.
+    """
+    above = total = 0
+    for pair in get_pairs_from_file():
+        data = candle_store.closed_indicators(pair, TF_TREND, complete=False)
+        if data and data.ema50 > 0:
+            total += 1
+            above += data.close > data.ema50
+    return above, total
+
+def buy_threshold():
+    """Skor minimum BUY sesuai regime makro (dari cache, tanpa I/O)."""
+    return SCORE_BUY_NEUTRAL if macro_regime.is_neutral() else SCORE_BUY
 
 def check_btc_trend():
-    """Mengecek apakah market secara keseluruhan (BTC) sedang Bullish di 1D"""
+    """
+    Mengecek apakah market secara keseluruhan (BTC) sedang Bullish di 1D.
+    Data diambil dari cache regime makro yang hanya di-refresh sekali per candle 1D.
+    """
     print("\n🔍 Memeriksa Kondisi Makro Bitcoin (BTCUSDT)...")
-    btc_analysis = get_analysis("BTCUSDT", TF_TREND)
-    if not btc_analysis:
-        print("⚠️ Gagal mendapat data BTC. Mengasumsikan kondisi NETRAL.")
-        return True
-    
-    data_1d = extract_indicators(btc_analysis)
-    if data_1d['close'] < data_1d['ema50']:
-        print(f"🚨 BTC Bawah EMA50 1D (Close: {data_1d['close']} | EMA50: {data_1d['ema50']}). Mode Bearish Aktif!")
+    macro_regime.refresh_regime(fetch_btc_1d, universe_breadth)
+    macro = macro_regime.MACRO
+    regime = macro_regime.get_regime()
+    breadth = macro.get('breadth')
+    breadth_info = f"{breadth * 100:.0f}%" if breadth is not None else "-"
+    print(f"📌 Regime: {regime} | BTC Dominance: {macro.get('last_value', 0):.2f}% | Breadth EMA50 1D: {breadth_info}")
+
+    if not macro_regime.is_btc_bullish():
+        print(f"🚨 BTC Bawah EMA50 1D (Close: {macro.get('btc_close')} | EMA50: {macro.get('btc_ema50')}). Mode Bearish Aktif!")
         return False
         
-    print(f"✅ BTC Di atas EMA50 1D (Close: {data_1d['close']}). Trend Makro Aman.")
+    print(f"✅ BTC Di atas EMA50 1D (Close: {macro.get('btc_close')}). Trend Makro Aman.")
+    if macro_regime.is_neutral():
+        print(f"⚠️ Regime NEUTRAL: sinyal BUY butuh skor >= {SCORE_BUY_NEUTRAL} (normal {SCORE_BUY}).")
     return True
 
 # ==========================================
 # DEBUG: TAMPILKAN INDIKATOR MENTAH (DETAIL)
 # ==========================================
+RAW_INDICATORS_TEMPLATE = (
+    "  📊 Indikator Mentah {pair}:\n"
+    "      💲 Harga: ${price:.6f}\n"
+    "      📈 1D: EMA50={d1.ema50:.4f} EMA200={d1.ema200:.4f} ADX={d1.adx:.1f}\n"
+    "      📈 4H: EMA20={h4.ema20:.4f} EMA50={h4.ema50:.4f} RSI={h4.rsi:.1f}\n"
+    "      📈 1H: EMA10={h1.ema10:.4f} EMA20={h1.ema20:.4f} RSI={h1.rsi:.1f}\n"
+    "      📈 1H: MACD={h1.macd:.6f} Signal={h1.macd_signal:.6f} ATR={h1.atr:.6f}"
+)
+
 def print_raw_indicators(pair, data_1d, data_4h, data_1h, current_price):
-    print(f"  📊 Indikator Mentah:")
-    print(f"      💲 Harga: ${current_price:.6f}")
-    print(f"      📈 1D: EMA50={data_1d['ema50']:.4f} EMA200={data_1d['ema200']:.4f} ADX={data_1d['adx']:.1f}")
-    print(f"      📈 4H: EMA20={data_4h['ema20']:.4f} EMA50={data_4h['ema50']:.4f} RSI={data_4h['rsi']:.1f}")
-    print(f"      📈 1H: EMA10={data_1h['ema10']:.4f} EMA20={data_1h['ema20']:.4f} RSI={data_1h['rsi']:.1f}")
-    print(f"      📈 1H: MACD={data_1h['macd']:.6f} Signal={data_1h['macd_signal']:.6f} ATR={data_1h['atr']:.6f}")
+    # Level DEBUG: tidak di-format sama sekali kecuali LOG_LEVEL=DEBUG
+    botlog.debug('indicators', RAW_INDICATORS_TEMPLATE, pair=pair, price=current_price,
+                 d1=data_1d, h4=data_4h, h1=data_1h)
 
 # ==========================================
 # SCORING SYSTEM (Weighted V4)
 # ==========================================
 def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish):
+    """Skor dari rule set deklaratif (scoring_rules.json), di-compile sekali dan di-reload jika file berubah."""
+    return scoring_rules.get_rules().score(data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish)
+
+def calculate_entry_score_v4(data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish):
+    """
+    Implementasi referensi V4 (hard-coded). Tidak dipakai saat scan, hanya
+    sebagai pembanding `bot.py scoring-parity` untuk scoring_rules.json.
+    """
     score = 0
     reasons = []
     vetoes = []
 
     # Filter Makro
     if not is_btc_bullish:
-        vetoes.append("Market Makro (BTC) Bearish - Semua Buy Dibatalkan")
+        vetoes.append(VETO_MACRO)
         return 0, reasons, vetoes
 
     # Quick Filter: Downtrend 1D Jelas
-    if data_1d['ema50'] < data_1d['ema200'] and data_1d['close'] < data_1d['ema50']:
-        vetoes.append("1D Downtrend jelas (Close<EMA50<EMA200)")
+    if data_1d.ema50 < data_1d.ema200 and data_1d.close < data_1d.ema50:
+        vetoes.append(VETO_DOWNTREND_1D)
         return 0, reasons, vetoes
 
     # VETO CONDITIONS
-    if data_1h['rsi'] > RSI_OVERBOUGHT_VETO:
-        vetoes.append(f"RSI 1H OB ({data_1h['rsi']:.1f})")
+    if data_1h.rsi > RSI_OVERBOUGHT_VETO:
+        vetoes.append(f"RSI 1H OB ({data_1h.rsi:.1f})")
 
-    if data_4h['ema20'] > 0:
-        dist = ((current_price - data_4h['ema20']) / data_4h['ema20']) * 100
+    if data_4h.ema20 > 0:
+        dist = ((current_price - data_4h.ema20) / data_4h.ema20) * 100
         if dist > MAX_DISTANCE_FROM_EMA20_PCT:
             vetoes.append(f"Jauh dari EMA20 4H ({dist:.1f}%)")
 
-    atr = data_1h.get('atr', 0)
+    atr = data_1h.atr
     if atr > 0 and (atr / current_price) < 0.008:
         vetoes.append(f"ATR terlalu kecil ({(atr/current_price)*100:.2f}%)")
 
@@ -260,24 +320,24 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is
         return 0, reasons, vetoes
 
     # 1. TREND (40%)
-    if data_1d['ema20'] > data_1d['ema50'] > data_1d['ema200'] and data_1d['close'] > data_1d['ema20']:
+    if data_1d.ema20 > data_1d.ema50 > data_1d.ema200 and data_1d.close > data_1d.ema20:
         score += 25
         reasons.append("✅ 1D Strong Trend (EMA20>50>200) [+25]")
-    elif data_1d['ema50'] > data_1d['ema200'] and data_1d['close'] > data_1d['ema50']:
+    elif data_1d.ema50 > data_1d.ema200 and data_1d.close > data_1d.ema50:
         score += 20
         reasons.append("✅ 1D Uptrend (Close>EMA50>200) [+20]")
     else:
         reasons.append("❌ 1D Trend Lemah [+0]")
 
-    if data_1d['adx'] > 25:
+    if data_1d.adx > 25:
         score += 15
-        reasons.append(f"✅ 1D ADX Kuat ({data_1d['adx']:.1f}) [+15]")
+        reasons.append(f"✅ 1D ADX Kuat ({data_1d.adx:.1f}) [+15]")
     else:
-        reasons.append(f"❌ 1D ADX Lemah ({data_1d['adx']:.1f}) [+0]")
+        reasons.append(f"❌ 1D ADX Lemah ({data_1d.adx:.1f}) [+0]")
 
     # 2. PULLBACK (15%)
-    if data_4h['ema20'] > data_4h['ema50']:
-        dist_4h = abs(current_price - data_4h['ema20']) / data_4h['ema20'] * 100
+    if data_4h.ema20 > data_4h.ema50:
+        dist_4h = abs(current_price - data_4h.ema20) / data_4h.ema20 * 100
         if dist_4h <= 2.0:
             score += 10
             reasons.append(f"✅ 4H Perfect Pullback (Dist {dist_4h:.1f}%) [+10]")
@@ -287,14 +347,14 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is
     else:
         reasons.append("❌ 4H Bukan Pullback [+0]")
 
-    if 45 <= data_4h['rsi'] <= 60:
+    if 45 <= data_4h.rsi <= 60:
         score += 5
-        reasons.append(f"✅ 4H RSI Rebound ({data_4h['rsi']:.1f}) [+5]")
+        reasons.append(f"✅ 4H RSI Rebound ({data_4h.rsi:.1f}) [+5]")
     else:
-        reasons.append(f"⚠️ 4H RSI Tidak Ideal ({data_4h['rsi']:.1f}) [+0]")
+        reasons.append(f"⚠️ 4H RSI Tidak Ideal ({data_4h.rsi:.1f}) [+0]")
 
     # 3. MOMENTUM (30%)
-    macd_diff_4h = data_4h['macd'] - data_4h['macd_signal']
+    macd_diff_4h = data_4h.macd - data_4h.macd_signal
     if macd_diff_4h > 0:
         if current_price > 0 and abs(macd_diff_4h) / current_price < 0.002:
             score += 15
@@ -305,13 +365,13 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is
     else:
         reasons.append("❌ 4H MACD Bearish [+0]")
 
-    if data_1h['ema10'] > data_1h['ema20']:
+    if data_1h.ema10 > data_1h.ema20:
         score += 5
         reasons.append("✅ 1H Momentum (EMA10>20) [+5]")
     else:
         reasons.append("❌ 1H Momentum Lemah [+0]")
 
-    macd_diff_1h = data_1h['macd'] - data_1h['macd_signal']
+    macd_diff_1h = data_1h.macd - data_1h.macd_signal
     if macd_diff_1h > 0:
         if current_price > 0 and abs(macd_diff_1h) / current_price < 0.002:
             score += 10
@@ -322,15 +382,15 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is
     else:
         reasons.append("❌ 1H MACD Bearish [+0]")
 
-    if 50 <= data_1h['rsi'] <= 65:
+    if 50 <= data_1h.rsi <= 65:
         score += 5
-        reasons.append(f"✅ 1H RSI Optimal ({data_1h['rsi']:.1f}) [+5]")
+        reasons.append(f"✅ 1H RSI Optimal ({data_1h.rsi:.1f}) [+5]")
     else:
-        reasons.append(f"⚠️ 1H RSI Tidak Optimal ({data_1h['rsi']:.1f}) [+0]")
+        reasons.append(f"⚠️ 1H RSI Tidak Optimal ({data_1h.rsi:.1f}) [+0]")
 
     # 4. VOLUME (15%)
-    vol = data_1h.get('volume', 0)
-    avg_vol = data_1h.get('average_volume', 0)
+    vol = data_1h.volume
+    avg_vol = data_1h.average_volume
     if avg_vol > 0 and vol > (1.5 * avg_vol):
         score += 15
         reasons.append(f"✅ 1H Volume Spike ({vol/avg_vol:.1f}x) [+15]")
@@ -342,13 +402,14 @@ def calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is
 # ==========================================
 # CHECK ENTRY (V4)
 # ==========================================
-def check_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish):
+def check_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish, min_buy=None):
+    """`min_buy` = skor minimum BUY (default SCORE_BUY; siklus live memakai buy_threshold())."""
     score, reasons, vetoes = calculate_entry_score(data_1d, data_4h, data_1h, current_price, sl_price, is_btc_bullish)
     
     if vetoes:
         return None, score, reasons, sl_price, vetoes
     
-    if score >= SCORE_BUY:
+    if score >= (min_buy or SCORE_BUY):
         signal = "BUY_STRONG" if score >= SCORE_BUY_STRONG else "BUY"
         return signal, score, reasons, sl_price, []
     elif score >= SCORE_WATCH:
@@ -359,20 +420,21 @@ def check_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price, is_btc
 # ==========================================
 # CHECK EXIT (MENGGUNAKAN TRAILING ATR)
 # ==========================================
-def check_exit(pair, current_price, data_1h):
+def check_price_exit(pair, current_price):
+    """Aturan exit yang hanya butuh harga: SL, break even, trailing ATR, max hold."""
     if pair not in ACTIVE_BUYS:
         return None, ""
         
-    entry_data = ACTIVE_BUYS[pair]
-    entry_price = entry_data['price']
-    stop_loss = entry_data['stop_loss']
+    pos = ACTIVE_BUYS[pair]
+    entry_price = pos.price
+    stop_loss = pos.stop_loss
     
     # [PERBAIKAN]: Paksa fallback 2% jika entry_atr dari database bernilai 0 atau None
-    entry_atr = entry_data.get('entry_atr')
+    entry_atr = pos.entry_atr
     if not entry_atr or entry_atr <= 0:
         entry_atr = current_price * 0.02
         
-    highest_price = entry_data['highest_price']
+    highest_price = pos.highest_price
     
     profit_pct = ((current_price - entry_price) / entry_price) * 100
     profit_amount = current_price - entry_price
@@ -382,9 +444,10 @@ def check_exit(pair, current_price, data_1h):
         return "STOP_LOSS", f"SL tercapai (${stop_loss:.4f})"
 
     # 2. Break Even (Pindah SL ke Entry jika profit > 1x ATR)
-    if profit_amount >= (BREAK_EVEN_ATR_MULTIPLIER * entry_atr) and not entry_data.get('break_even_active', False):
-        ACTIVE_BUYS[pair]['stop_loss'] = entry_price
-        ACTIVE_BUYS[pair]['break_even_active'] = True
+    if profit_amount >= (BREAK_EVEN_ATR_MULTIPLIER * entry_atr) and not pos.break_even_active:
+        pos.stop_loss = entry_price
+        pos.break_even_active = True
+        mark_dirty(pair)
         save_active_buys()
         send_telegram_alert("BREAK_EVEN", pair, current_price, f"Profit > 1x ATR, SL moved to Entry", entry_price=entry_price, profit_pct=profit_pct)
 
@@ -392,11 +455,13 @@ def check_exit(pair, current_price, data_1h):
     if profit_amount >= (ATR_TRAIL_ACTIVATION * entry_atr):
         # Update Highest Price
         if current_price > highest_price:
-            ACTIVE_BUYS[pair]['highest_price'] = current_price
+            pos.highest_price = current_price
             highest_price = current_price
+            mark_dirty(pair)
             
-        if not entry_data.get('trailing_active', False):
-            ACTIVE_BUYS[pair]['trailing_active'] = True
+        if not pos.trailing_active:
+            pos.trailing_active = True
+            mark_dirty(pair)
             send_telegram_alert("ACTIVATE_TRAIL", pair, current_price, f"Profit > {ATR_TRAIL_ACTIVATION}x ATR. Trailing aktif.", entry_price=entry_price, profit_pct=profit_pct)
         
         # Batas Trailing: 1.5x ATR dari harga tertinggi
@@ -405,254 +470,466 @@ def check_exit(pair, current_price, data_1h):
         if current_price <= trailing_limit:
             return "TRAILING_STOP", f"Trailing Stop ATR tersentuh di ${trailing_limit:.4f}"
 
-    # 4. Exit Indikator Pembalikan Arah (1H)
-    ema_cross_down = data_1h['ema10'] < data_1h['ema20']
-    macd_bearish = data_1h['macd'] < data_1h['macd_signal']
+    # 4. Durasi Hold Maksimum (ditandai oleh timer, lihat process_timers)
+    if pair in HOLD_EXPIRED:
+        return "EXPIRED", f"Durasi hold > {MAX_HOLD_HOURS} jam"
+
+    return None, "Hold"
+
+def needs_indicator_exit(pair, current_price):
+    """
+    Aturan indikator hanya bisa terpicu jika profit > 0 atau < -1%
+    (lihat batas profit di check_indicator_exit). Di luar itu 1H tidak perlu di-fetch.
+    """
+    entry_price = ACTIVE_BUYS[pair].price
+    profit_pct = ((current_price - entry_price) / entry_price) * 100
+    return profit_pct > 0 or profit_pct < -1
+
+def check_indicator_exit(pair, current_price, data_1h):
+    """Exit Indikator Pembalikan Arah (1H)."""
+    entry_price = ACTIVE_BUYS[pair].price
+    profit_pct = ((current_price - entry_price) / entry_price) * 100
+
+    ema_cross_down = data_1h.ema10 < data_1h.ema20
+    macd_bearish = data_1h.macd < data_1h.macd_signal
     
     if ema_cross_down and macd_bearish:
         if profit_pct > 1 or profit_pct < -1:
             return "SELL_EMA_MACD", f"EMA10 < EMA20 & MACD Bearish"
 
-    if current_price < data_1h['ema20']:
+    if current_price < data_1h.ema20:
         if profit_pct > 0 or profit_pct < -2:
             return "SELL_CLOSE_EMA", f"Close < EMA20 (1H)"
 
     return None, "Hold"
 
+def check_exit(pair, current_price, data_1h):
+    signal, details = check_price_exit(pair, current_price)
+    if signal or pair not in ACTIVE_BUYS:
+        return signal, details
+    return check_indicator_exit(pair, current_price, data_1h)
+
 # ==========================================
 # TELEGRAM NOTIFICATION
 # ==========================================
+def ledger_claim(signal_type, pair):
+    """
+    Klaim per chat untuk telegram_fanout.publish: alert yang sama untuk candle
+    1H yang sama tidak dikirim ulang (rerun/run tumpang tindih), dan baru
+    dicatat di ledger setelah Telegram menerimanya.
+    """
+    def claim(chat_id):
+        key = alert_ledger.claim(pair, signal_type, chat_id)
+        if key is None:
+            botlog.info('alert_duplicate', "🔁 Alert {signal} {pair} sudah dikirim ke {chat} untuk candle ini. Dilewati.",
+                        signal=signal_type, pair=pair, chat=chat_id)
+            return None
+        return lambda ok: alert_ledger.confirm(key) if ok else alert_ledger.release(key)
+    return claim
+
 def send_telegram_alert(signal_type, pair, current_price, details,
                         entry_price=None, profit_pct=None, score=None, reasons=None):
+    display_pair = f"{pair[:-4]}/USDT"
+    emojis = {
+        'BUY': '🚀', 'BUY_STRONG': '🚀🔥', 'WATCH': '👀',
+        'SELL_EMA_MACD': '📉', 'SELL_CLOSE_EMA': '📉',
+        'STOP_LOSS': '🛑', 'TRAILING_STOP': '💰', 'EXPIRED': '⌛',
+        'ACTIVATE_TRAIL': '🔒', 'BREAK_EVEN': '🛡️'
+    }
+    emoji = emojis.get(signal_type, 'ℹ️')
+    binance_url = f"https://www.binance.com/en/trade/{pair[:-4]}_USDT"
+    tv_url = f"https://www.tradingview.com/chart/?symbol=BINANCE:{pair}"
     
-    # 🆕 JIKA INI REKAP MINGGUAN, LANGSUNG KIRIM TEKS REKAP SAJA
-    if signal_type == "REKAP_MINGGUAN":
-        message = details
+    message = f"{emoji} *{signal_type.replace('_', ' ')}*\n"
+    message += f"💱 *Pair:* [{display_pair}]({binance_url}) | [TV]({tv_url})\n"
+    message += f"💲 *Price:* ${current_price:.4f}\n"
     
-    # FORMAT UNTUK SINYAL TRADING NORMAL
-    else:
-        display_pair = f"{pair[:-4]}/USDT"
-        emojis = {
-            'BUY': '🚀', 'BUY_STRONG': '🚀🔥', 'WATCH': '👀',
-            'SELL_EMA_MACD': '📉', 'SELL_CLOSE_EMA': '📉',
-            'STOP_LOSS': '🛑', 'TRAILING_STOP': '💰',
-            'ACTIVATE_TRAIL': '🔒', 'BREAK_EVEN': '🛡️'
-        }
-        emoji = emojis.get(signal_type, 'ℹ️')
-        binance_url = f"https://www.binance.com/en/trade/{pair[:-4]}_USDT"
-        tv_url = f"https://www.tradingview.com/chart/?symbol=BINANCE:{pair}"
+    if entry_price is not None and profit_pct is not None:
+        status = "Profit" if profit_pct > 0 else "Loss"
+        message += f"▫️ *Entry:* ${entry_price:.4f}\n"
+        message += f"📊 *{status}:* {profit_pct:+.2f}%\n"
         
-        message = f"{emoji} *{signal_type.replace('_', ' ')}*\n"
-        message += f"💱 *Pair:* [{display_pair}]({binance_url}) | [TV]({tv_url})\n"
-        message += f"💲 *Price:* ${current_price:.4f}\n"
+    if score is not None:
+        message += f"🎯 *Score:* {score}/100\n"
         
-        if entry_price is not None and profit_pct is not None:
-            status = "Profit" if profit_pct > 0 else "Loss"
-            message += f"▫️ *Entry:* ${entry_price:.4f}\n"
-            message += f"📊 *{status}:* {profit_pct:+.2f}%\n"
-            
-        if score is not None:
-            message += f"🎯 *Score:* {score}/100\n"
-            
-        if details:
-            message += f"📝 *Note:* {details}\n"
+    if details:
+        message += f"📝 *Note:* {details}\n"
+        
+    if reasons:
+        message += "\n*Analisis:*\n"
+        for reason in reasons[:8]:
+            message += f"  {reason}\n"
             
-        if reasons:
-            message += "\n*Analisis:*\n"
-            for reason in reasons[:8]:
-                message += f"  {reason}\n"
-                
-    print(f"📢 Mengirim pesan Telegram untuk: {signal_type}")
+    # Dikirim di background ke semua subscriber yang cocok (lihat telegram_fanout.py)
+    claim = ledger_claim(signal_type, pair)
+    recipients = telegram_fanout.publish(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, signal_type, message,
+                                         pair=pair, score=score, claim=claim)
+    botlog.info('alert_sent', "📢 Mengirim pesan Telegram untuk: {signal} ({recipients} chat)",
+                signal=signal_type, pair=pair, recipients=recipients)
+
+# ==========================================
+# TIMER (COOLDOWN, MAX HOLD)
+# ==========================================
+HOLD_EXPIRED = set()    # Posisi yang batas durasi hold-nya sudah lewat
+
+def hold_deadline(pos):
+    return pos.time + timedelta(hours=MAX_HOLD_HOURS)
+
+def sync_timers():
+    """
+    Samakan deadline cooldown & max hold dengan cooldowns.json/active_buys.json
+    (keduanya bisa berubah di luar siklus ini, mis. merge shard atau edit manual).
+    """
+    timers.sync(timers.KIND_COOLDOWN, COOLDOWNS)
+    holds = {pair: hold_deadline(pos) for pair, pos in ACTIVE_BUYS.items()} if MAX_HOLD_HOURS else {}
+    timers.sync(timers.KIND_HOLD, holds)
+
+def process_timers(now=None):
+    """Proses deadline cooldown/max hold yang jatuh tempo, termasuk yang terlewat di run sebelumnya."""
+    for kind, key, _ in timers.pop_due(now, kinds=(timers.KIND_COOLDOWN, timers.KIND_HOLD)):
+        if kind == timers.KIND_COOLDOWN:
+            clear_cooldown(key)
+            botlog.info('cooldown_end', "⏳ Cooldown {pair} selesai.", pair=key)
+        elif key in ACTIVE_BUYS:
+            HOLD_EXPIRED.add(key)
+    save_cooldowns()
+
+def cooldown_hours(pair, signal):
+    """
+    Lama cooldown (jam) setelah `pair` ditutup dengan `signal`, dibaca O(1)
+    dari indeks trade per pair. 0 = tanpa cooldown.
+      - STOP_LOSS yang rugi: COOLDOWN_HOURS, berlipat tiap rugi beruntun
+      - exit rugi lain: baru kena cooldown mulai COOLDOWN_LOSS_STREAK rugi beruntun
+      - pair yang win rate trade terakhirnya tinggi: cooldown dipersingkat
+    """
+    streak = trade_index.loss_streak(pair)
+    if streak == 0 or (signal != "STOP_LOSS" and streak < COOLDOWN_LOSS_STREAK):
+        return 0
+    hours = COOLDOWN_HOURS * COOLDOWN_ESCALATION ** (streak - 1)
+    win_rate = trade_index.win_rate(pair, COOLDOWN_MIN_SAMPLES)
+    if win_rate is not None and win_rate >= COOLDOWN_SHORTEN_WIN_RATE:
+        hours *= COOLDOWN_SHORTEN_FACTOR
+    return min(hours, COOLDOWN_MAX_HOURS)
+
+def process_pair(pair, fetched, is_btc_bullish, stats):
+    """
+    Evaluasi entry satu pair dari hasil fetch. Mengembalikan (score, jenis_veto, atr_pct)
+    untuk tabel prioritas scan, atau None jika pair di-skip. Posisi aktif
+    ditangani process_exits().
+    """
+    # Jika pair yang diuji adalah BTC itu sendiri, filter market makro tidak diblokir dua kali
+    local_btc_bullish = is_btc_bullish if pair != "BTCUSDT" else True
     
-    try:
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-            json={
-                'chat_id': TELEGRAM_CHAT_ID, 'text': message,
-                'parse_mode': 'Markdown', 'disable_web_page_preview': True
-            }, timeout=10
+    botlog.debug('pair_start', "\n🔎 Menganalisis: {pair}", pair=pair)
+    
+    # Cooldown yang sudah habis dihapus process_timers() di awal siklus
+    if pair in COOLDOWNS:
+        remaining = (COOLDOWNS[pair] - datetime.now(UTC7)).total_seconds() / 3600
+        botlog.info('skip_cooldown', "  ⏳ {pair} dalam cooldown ({hours:.1f} jam lagi). Skip.",
+                    sample=True, pair=pair, hours=remaining)
+        stats['SKIP'] += 1
+        return None
+    
+    if symbol_cache.is_blocked(pair, TF_ENTRY):
+        botlog.info('skip_negative', "  ⏭️ {pair} ada di negative cache. Skip.", sample=True, pair=pair)
+        stats['SKIP'] += 1
+        return None
+
+    data_1d = fetched.get((pair, TF_TREND))
+    data_4h = fetched.get((pair, TF_SETUP))
+    data_1h = fetched.get((pair, TF_ENTRY))
+    
+    if not all([data_1d, data_4h, data_1h]):
+        botlog.warning('skip_no_data', "⚠️ Gagal mengambil data untuk {pair}. Skip.", sample=True, pair=pair)
+        stats['SKIP'] += 1
+        return None
+    current_price = data_1h.close
+    
+    if current_price == 0:
+        botlog.warning('skip_zero_price', "⚠️ Harga 0 untuk {pair}. Skip.", sample=True, pair=pair)
+        stats['SKIP'] += 1
+        return None
+    
+    print_raw_indicators(pair, data_1d, data_4h, data_1h, current_price)
+        
+    atr = data_1h.atr
+    if atr > 0:
+        sl_price = current_price - (ATR_SL_MULTIPLIER * atr)
+    else:
+        sl_price = current_price * 0.95 # Fallback lebar jika tidak ada ATR
+
+    # CEK ENTRY (posisi aktif ditangani process_exits)
+    signal, score, reasons, sl_price, vetoes = check_entry(
+        pair, data_1d, data_4h, data_1h, current_price, sl_price, local_btc_bullish, buy_threshold()
+    )
+    snapshot_log.record_entry(pair, data_1d, data_4h, data_1h, current_price, sl_price,
+                              local_btc_bullish, signal, score, vetoes, macro_regime.is_neutral())
+    
+    if signal in ("BUY", "BUY_STRONG"):
+        allowed, risk_reason = portfolio_risk.check_portfolio_risk(pair, current_price, sl_price, ACTIVE_BUYS)
+        if not allowed:
+            botlog.info('risk_blocked', "  🚫 {pair} RISK: {signal} (Score: {score}/100) ditahan - {reason}",
+                        pair=pair, signal=signal, score=score, reason=risk_reason)
+            stats['VETO'] += 1
+            return score, None, atr / current_price * 100
+
+    if signal == "BUY" or signal == "BUY_STRONG":
+        botlog.info('entry', "  ✅ {pair} SINYAL {signal} (Score: {score}/100)",
+                    pair=pair, signal=signal, score=score, price=current_price, sl=sl_price)
+        ACTIVE_BUYS[pair] = Position(
+            price=current_price, time=datetime.now(UTC7),
+            stop_loss=sl_price,
+            entry_atr=atr if atr > 0 else (current_price * 0.02), # [PERBAIKAN]: Simpan nilai fallback jika ATR kosong
+            highest_price=current_price, entry_score=score
         )
-    except Exception as e:
-        print(f"❌ Gagal kirim Telegram: {e}")
+        mark_dirty(pair)
+        if MAX_HOLD_HOURS:
+            timers.schedule(timers.KIND_HOLD, pair, hold_deadline(ACTIVE_BUYS[pair]))
+        sl_info = f"SL: ${sl_price:.4f} (2.5x ATR)"
+        alert = {'signal_type': signal, 'pair': pair, 'current_price': current_price,
+                 'details': sl_info, 'score': score, 'reasons': reasons}
+        if DEFER_ENTRY_ALERTS:
+            DEFERRED_ENTRIES.append(alert)
+        else:
+            send_telegram_alert(**alert)
+        stats['BUY'] += 1
+    elif signal == "WATCH":
+        botlog.info('watch', "  👀 {pair} WATCH (Score: {score}/100) - Pantau", pair=pair, score=score)
+        stats['WATCH'] += 1
+    elif vetoes:
+        botlog.info('veto', "  🚫 {pair} VETO: {reasons}", sample=True, pair=pair, score=score,
+                    reasons='; '.join(vetoes))
+        stats['VETO'] += 1
+    else:
+        botlog.info('skip_score', "  ❌ {pair} Skip (Score: {score}/100)", sample=True, pair=pair, score=score)
+        stats['SKIP'] += 1
+
+    veto_kind = None
+    if vetoes:
+        daily = vetoes[0] in scoring_rules.get_rules().daily_vetoes
+        veto_kind = scan_scheduler.VETO_DAILY if daily else scan_scheduler.VETO_SETUP
+    return score, veto_kind, atr / current_price * 100
 
 # ==========================================
-# REKAP MINGGUAN
+# EXIT POSISI AKTIF
 # ==========================================
-def check_and_send_weekly_recap():
-    now = datetime.now(UTC7)
-    if now.weekday() == 6 and now.hour == 23:
-        last_sent = load_recap_sent()
-        today_str = now.strftime('%Y-%m-%d')
-        
-        if last_sent == today_str:
-            return
-            
-        print("📊 Membuat rekap mingguan...")
-        history = load_trade_history()
-        cutoff = now - timedelta(days=7)
-        
-        recent_trades = []
-        for t in history:
-            try:
-                exit_date = datetime.fromisoformat(t['exit_date']).replace(tzinfo=UTC7)
-                if exit_date >= cutoff:
-                    recent_trades.append(t)
-            except:
-                pass
-                
-        total_trades = len(recent_trades)
-        wins = sum(1 for t in recent_trades if t['profit_pct'] > 0)
-        losses = total_trades - wins
-        win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
-        total_profit = sum(t['profit_pct'] for t in recent_trades)
-        
-        message = f"📊 *REKAP PERFORMA MINGGUAN*\n"
-        message += f"📅 Periode: 7 Hari Terakhir\n"
-        message += f"━━━━━━━━━━━━━━━━━━━━\n"
-        message += f"📈 *Total Trade:* {total_trades}\n"
-        message += f"✅ *Win:* {wins} | ❌ *Loss:* {losses}\n"
-        message += f"🎯 *Win Rate:* {win_rate:.1f}%\n"
-        message += f"💰 *Total PnL:* {total_profit:+.2f}%\n"
-        if total_trades > 0:
-            message += f"📏 *Rata-rata/Trade:* {(total_profit/total_trades):+.2f}%\n"
-        message += f"━━━━━━━━━━━━━━━━━━━━\n"
-        message += f"🤖 Bot V4 (ATR Logic) berjalan dengan baik!"
-        
-        send_telegram_alert("REKAP_MINGGUAN", "SYSTEM", 0, message)
-        save_recap_sent(today_str)
-        print("✅ Rekap mingguan berhasil dikirim ke Telegram.")
+def close_position(pair, current_price, signal, details, stats):
+    pos = ACTIVE_BUYS[pair]
+    profit_pct = ((current_price - pos.price) / pos.price) * 100
+    send_telegram_alert(
+        signal, pair, current_price, details,
+        entry_price=pos.price, profit_pct=profit_pct
+    )
+    history = performance.load_trade_history()
+    history.append({
+        'pair': pair, 'entry_price': pos.price,
+        'exit_price': current_price, 'profit_pct': profit_pct,
+        'exit_reason': signal, 'entry_date': pos.time.isoformat(),
+        'exit_date': datetime.now(UTC7).isoformat(), 'entry_atr': pos.entry_atr
+    })
+    performance.save_trade_history(history)
+    performance.record_trade(history[-1], history)
+    trade_index.record_trade(history[-1], history)
+    
+    hours = cooldown_hours(pair, signal)
+    if hours:
+        set_cooldown(pair, datetime.now(UTC7) + timedelta(hours=hours))
+        save_cooldowns()
+        botlog.info('cooldown_start', "  ⏳ Cooldown {pair} {hours:.0f} jam (rugi beruntun: {streak}).",
+                    pair=pair, hours=hours, streak=trade_index.loss_streak(pair))
+    del ACTIVE_BUYS[pair]
+    mark_dirty(pair)
+    timers.cancel(timers.KIND_HOLD, pair)
+    HOLD_EXPIRED.discard(pair)
+    botlog.info('position_closed', "✅ Posisi {pair} ditutup.", pair=pair, reason=signal, profit_pct=profit_pct)
+    stats['EXIT'] += 1
+
+def process_exits(held, stats):
+    """
+    Cek exit semua posisi aktif dari satu snapshot harga bulk. Aturan berbasis
+    harga langsung dievaluasi dari snapshot; indikator 1H hanya diambil untuk
+    posisi yang aturan indikatornya bisa terpicu pada profit saat ini, atau
+    yang harganya tidak ada di snapshot.
+    """
+    if not held:
+        return
+    print(f"\n💼 Cek exit {len(held)} posisi aktif (snapshot harga bulk)...")
+    prices = market_snapshot.fetch_prices(held)
+    pos_before = {pair: ACTIVE_BUYS[pair].to_dict() for pair in held}
+    decided = {}   # pair -> (harga, sinyal, detail, data_1h)
+    need_1h = []
+    for pair in held:
+        price = prices.get(pair)
+        if not price:
+            need_1h.append(pair)
+            continue
+        signal, details = check_price_exit(pair, price)
+        if signal or not needs_indicator_exit(pair, price):
+            decided[pair] = (price, signal, details, None)
+        else:
+            need_1h.append(pair)
+
+    if need_1h:
+        print(f"📡 Indikator 1H untuk {len(need_1h)} posisi...")
+        # Hedged: jika sumber utama lambat, sumber kedua ikut ditembak
+        results = get_transport().map(lambda pair: market_data.get_indicators(pair, TF_ENTRY, hedge=True), need_1h)
+        for pair, data_1h in zip(need_1h, results):
+            price = prices.get(pair)
+            signal, details = None, "Hold"
+            if not price:
+                # Tidak ada di snapshot: harga dari close 1H, aturan harga belum dicek
+                price = data_1h.close if data_1h else 0
+                if not price:
+                    botlog.warning('exit_no_price', "⚠️ Gagal mengambil harga {pair}. Posisi tetap dipegang.", pair=pair)
+                    stats['SKIP'] += 1
+                    continue
+                signal, details = check_price_exit(pair, price)
+            if not signal and data_1h:
+                signal, details = check_indicator_exit(pair, price, data_1h)
+            decided[pair] = (price, signal, details, data_1h)
+
+    for pair in held:
+        if pair not in decided:
+            continue
+        price, signal, details, data_1h = decided[pair]
+        snapshot_log.record_exit(pair, pos_before[pair], None, None, data_1h, price, signal)
+        if signal:
+            botlog.info('exit', "\n🔎 {pair}: {signal} - {details}", pair=pair, signal=signal, details=details, price=price)
+            close_position(pair, price, signal, details, stats)
+        else:
+            profit_pct = ((price - ACTIVE_BUYS[pair].price) / ACTIVE_BUYS[pair].price) * 100
+            botlog.info('hold', "  ⏸️ {pair} Hold: Profit {profit_pct:+.2f}%", sample=True, pair=pair, profit_pct=profit_pct)
+            stats['HOLD'] += 1
+    save_active_buys()
+    save_cooldowns()
+    alert_ledger.save_ledger()
 
 # ==========================================
 # PROGRAM UTAMA (V4)
 # ==========================================
-def main():
+def main(exits_only=False, shard=None, prefetched=None):
+    """
+    Satu siklus bot. Jika exits_only=True, hanya exit posisi di ACTIVE_BUYS
+    yang dicek (tanpa cek BTC dan tanpa mencari entry baru).
+    Jika shard=(index, count), hanya pair milik shard itu yang dianalisis dan
+    hasilnya ditulis sebagai delta untuk di-merge (lihat sharding.py).
+    `prefetched` = hasil prefetch.warm() pada mode long-running.
+    Mengembalikan ringkasan {'stats', 'scanned', 'queued'} (dipakai load test).
+    """
     print(f"🕒 Bot V4 dimulai: {datetime.now(UTC7).strftime('%Y-%m-%d %H:%M:%S')}")
     print("📌 Mode: Market Macro Filter (BTC Dependent) + ATR Risk Management")
     print("=" * 60)
+    global DEFER_ENTRY_ALERTS
+    deadline = scan_scheduler.Deadline()
+    botlog.start_cycle()
+    DEFER_ENTRY_ALERTS = bool(shard)
+    DEFERRED_ENTRIES.clear()
     
     load_active_buys()
     load_cooldowns()
-    pairs = get_pairs_from_file()
+    portfolio_risk.load_returns()
+    macro_regime.load_macro()
+    symbol_cache.load_negative_cache()
+    scan_scheduler.load_scan_state()
+    candle_store.load_candles()
+    performance.load_performance()
+    trade_index.load_index()
+    timers.load_timers()
+    sync_timers()
+    process_timers()
+    if exits_only:
+        pairs = list(ACTIVE_BUYS.keys())
+        print(f"📌 Mode exits-only: {len(pairs)} posisi aktif.")
+    else:
+        pairs = get_pairs_from_file()
+    held = list(ACTIVE_BUYS.keys())
+    if shard:
+        pairs = sharding.select(pairs, *shard)
+        held = [p for p in held if sharding.owns(p, *shard)]
+        history_start = len(performance.load_trade_history())
+        print(f"🧩 Shard {shard[0] + 1}/{shard[1]}: {len(pairs)} pair, {len(held)} posisi aktif.")
     
     # 1. Cek Market Makro (BTC)
-    is_btc_bullish = check_btc_trend()
-    
-    print("\n✅ Mulai menganalisis altcoin...")
-    print("=" * 60)
+    is_btc_bullish = check_btc_trend() if not exits_only else True
     
     stats = {'BUY': 0, 'WATCH': 0, 'SKIP': 0, 'VETO': 0, 'HOLD': 0, 'EXIT': 0}
+
+    # 2. Exit posisi aktif (satu snapshot harga untuk semua posisi)
+    process_exits(held, stats)
+    if not exits_only:
+        for pair in held:
+            scan_scheduler.record_result(pair, None, SCORE_WATCH)
+        # Return 1H posisi yang masih dipegang untuk cek cluster korelasi entry baru
+        candle_store.sync_pairs([p for p in held if p in ACTIVE_BUYS])
+        candle_store.save_candles()
     
-    for pair in pairs:
-        # Jika pair yang diuji adalah BTC itu sendiri, filter market makro tidak diblokir dua kali
-        local_btc_bullish = is_btc_bullish if pair != "BTCUSDT" else True
-        
-        print(f"\n🔎 Menganalisis: {pair}")
-        
-        if pair in COOLDOWNS:
-            if datetime.now(UTC7) < COOLDOWNS[pair]:
-                remaining = (COOLDOWNS[pair] - datetime.now(UTC7)).total_seconds() / 3600
-                print(f"  ⏳ {pair} dalam cooldown ({remaining:.1f} jam lagi). Skip.")
-                stats['SKIP'] += 1
-                continue
-            else:
-                del COOLDOWNS[pair]
-                save_cooldowns()
-        
-        analysis_1d = get_analysis(pair, TF_TREND)
-        analysis_4h = get_analysis(pair, TF_SETUP)
-        analysis_1h = get_analysis(pair, TF_ENTRY)
-        
-        if not all([analysis_1d, analysis_4h, analysis_1h]):
-            print(f"⚠️ Gagal mengambil data untuk {pair}. Skip.")
-            stats['SKIP'] += 1
-            continue
-            
-        data_1d = extract_indicators(analysis_1d)
-        data_4h = extract_indicators(analysis_4h)
-        data_1h = extract_indicators(analysis_1h)
-        current_price = data_1h['close']
-        
-        if current_price == 0:
-            print(f"⚠️ Harga 0 untuk {pair}. Skip.")
-            stats['SKIP'] += 1
-            continue
-        
-        print_raw_indicators(pair, data_1d, data_4h, data_1h, current_price)
-            
-        atr = data_1h.get('atr', 0)
-        if atr > 0:
-            sl_price = current_price - (ATR_SL_MULTIPLIER * atr)
-        else:
-            sl_price = current_price * 0.95 # Fallback lebar jika tidak ada ATR
-
-        # CEK EXIT UNTUK POSISI AKTIF
-        if pair in ACTIVE_BUYS:
-            signal, details = check_exit(pair, current_price, data_1h)
-            if signal:
-                entry_data = ACTIVE_BUYS[pair]
-                profit_pct = ((current_price - entry_data['price']) / entry_data['price']) * 100
-                send_telegram_alert(
-                    signal, pair, current_price, details,
-                    entry_price=entry_data['price'], profit_pct=profit_pct
-                )
-                if signal in ["STOP_LOSS", "TRAILING_STOP", "SELL_EMA_MACD", "SELL_CLOSE_EMA"]:
-                    history = load_trade_history()
-                    history.append({
-                        'pair': pair, 'entry_price': entry_data['price'],
-                        'exit_price': current_price, 'profit_pct': profit_pct,
-                        'exit_reason': signal, 'entry_date': entry_data['time'].isoformat(),
-                        'exit_date': datetime.now(UTC7).isoformat()
-                    })
-                    save_trade_history(history)
-                    
-                    if signal == "STOP_LOSS":
-                        COOLDOWNS[pair] = datetime.now(UTC7) + timedelta(hours=COOLDOWN_HOURS)
-                        save_cooldowns()
-                    del ACTIVE_BUYS[pair]
-                    print(f"✅ Posisi {pair} ditutup.")
-                    stats['EXIT'] += 1
-            else:
-                profit_pct = ((current_price - ACTIVE_BUYS[pair]['price']) / ACTIVE_BUYS[pair]['price']) * 100
-                print(f"  ⏸️ Hold: Profit {profit_pct:+.2f}%")
-                stats['HOLD'] += 1
-                
-        # CEK ENTRY JIKA TIDAK ADA POSISI
-        else:
-            signal, score, reasons, sl_price, vetoes = check_entry(
-                pair, data_1d, data_4h, data_1h, current_price, sl_price, local_btc_bullish
-            )
-            
-            if signal == "BUY" or signal == "BUY_STRONG":
-                print(f"  ✅ SINYAL {signal} (Score: {score}/100)")
-                ACTIVE_BUYS[pair] = {
-                    'price': current_price, 'time': datetime.now(UTC7),
-                    'stop_loss': sl_price, 
-                    'entry_atr': atr if atr > 0 else (current_price * 0.02), # [PERBAIKAN]: Simpan nilai fallback jika ATR kosong
-                    'trailing_active': False, 'highest_price': current_price,
-                    'entry_score': score, 'break_even_active': False
-                }
-                sl_info = f"SL: ${sl_price:.4f} (2.5x ATR)"
-                send_telegram_alert(signal, pair, current_price, sl_info, score=score, reasons=reasons)
-                stats['BUY'] += 1
-            elif signal == "WATCH":
-                print(f"  👀 WATCH (Score: {score}/100) - Pantau")
-                stats['WATCH'] += 1
-            elif vetoes:
-                print(f"  🚫 VETO: {'; '.join(vetoes)}")
-                stats['VETO'] += 1
-            else:
-                print(f"  ❌ Skip (Score: {score}/100)")
-                stats['SKIP'] += 1
-                
+    print("\n✅ Mulai menganalisis altcoin...")
+    print("=" * 60)
+
+    held_set = set(held)
+    queue = scan_scheduler.build_queue([p for p in pairs if p not in held_set], [])
+    scanned = 0
+    if not exits_only and len(queue) < len(pairs):
+        print(f"🗓️ {len(pairs) - len(queue)} pair belum jadwal scan (frekuensi adaptif). Antrian: {len(queue)} pair.")
+
+    for offset, batch in scan_scheduler.batches(queue):
+        if not deadline.can_start_batch():
+            print(f"\n⏰ Deadline scan tercapai ({deadline.elapsed():.0f} dtk). {len(queue) - offset} pair dibawa ke run berikutnya.")
+            break
+        if not exits_only:
+            scan_scheduler.checkpoint(queue[offset:])
+        batch_start = deadline.elapsed()
+
+        to_fetch = [p for p in batch if p not in COOLDOWNS and not symbol_cache.is_blocked(p, TF_ENTRY)]
+        fetched = fetch_pair_indicators(to_fetch, prefetched)
+
+        for pair in batch:
+            result = process_pair(pair, fetched, is_btc_bullish, stats)
+            if not exits_only:
+                scan_scheduler.record_result(pair, result, SCORE_WATCH)
+            # Checkpoint per pair: perubahan posisi/cooldown langsung tersimpan
+            save_active_buys()
+            save_cooldowns()
+            alert_ledger.save_ledger()
+            scanned += 1
+        candle_store.save_candles()
+        deadline.record_batch(deadline.elapsed() - batch_start)
+
+    if not exits_only:
+        scan_scheduler.checkpoint(queue[scanned:])
+
     save_active_buys()
-    check_and_send_weekly_recap()
+    save_cooldowns()
+    portfolio_risk.save_returns()
+    symbol_cache.save_negative_cache()
+    timers.save_timers()
+    # Ledger disimpan setelah flush: hanya alert yang benar-benar terkirim yang tercatat
+    telegram_fanout.flush(deadline.flush_budget())
+    alert_ledger.save_ledger()
+    if shard:
+        # Rekap mingguan dikirim sekali saat merge, bukan oleh tiap shard
+        sharding.export_delta(*shard, history_start)
+    else:
+        snapshot_log.flush()
+        recap.check_and_send_weekly_recap(flush_timeout=deadline.flush_budget())
     
     print("\n" + "=" * 60)
     print("📊 RINGKASAN SIKLUS:")
     print(f"   🚀 BUY: {stats['BUY']} | 👀 WATCH: {stats['WATCH']} | ⏸️ HOLD: {stats['HOLD']}")
     print(f"   ✅ EXIT: {stats['EXIT']} | 🚫 VETO: {stats['VETO']} | ❌ SKIP: {stats['SKIP']}")
+    watch = scan_scheduler.watch_list(SCORE_WATCH)
+    if watch:
+        print(f"   👀 WATCH LIST: {', '.join(f'{p} ({s})' for p, s in watch)}")
+    for line in market_data.report():
+        print(f"   📡 {line}")
+    if botlog.suppressed():
+        print(f"   🔇 {botlog.suppressed()} baris per pair disampling (lengkap di {botlog.JSON_FILE or 'LOG_LEVEL=DEBUG'})")
     print("=" * 60)
     print("✅ Siklus analisis selesai.")
+    botlog.info('cycle_summary', stats=stats, watch=[p for p, _ in watch], scanned=scanned,
+                elapsed=round(deadline.elapsed(), 1), shard=list(shard) if shard else None)
+    botlog.flush()
+    return {'stats': stats, 'scanned': scanned, 'queued': len(queue)}
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,214 @@
+import os
+import glob
+import gzip
+import json
+import shutil
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from records import Indicators
+
+# ==========================================
+# LOG SNAPSHOT KEPUTUSAN (KOLUMNAR)
+# ==========================================
+# Setiap siklus, semua input calculate_entry_score() dan check_exit() beserta
+# keputusan yang diambil dicatat sebagai satu tabel kolumnar:
+#   snapshots/YYYY-MM-DD/HHMMSS.json.gz = {'ts': iso UTC, 'columns': {nama: [nilai per baris]}}
+# Satu file per siklus dan tidak pernah ditulis ulang. Kolom macro_neutral
+# mencatat regime makro saat keputusan diambil (threshold BUY NEUTRAL), file
+# lama tanpa kolom ini dianggap regime normal. Dengan data ini
+# threshold/bobot baru bisa diuji ulang (`bot.py rescore`) tanpa fetch ulang
+# ke TradingView. Folder ini tidak masuk git (dibawa antar run lewat cache
+# Actions); folder hari yang lebih tua dari RETENTION_DAYS dihapus saat
+# menulis siklus baru.
+SNAPSHOT_DIR = 'snapshots'
+RETENTION_DAYS = 30
+
+KIND_ENTRY = 'entry'
+KIND_EXIT = 'exit'
+TIMEFRAMES = ('1d', '4h', '1h')
+INDICATOR_FIELDS = tuple(f.name for f in fields(Indicators))
+POSITION_FIELDS = ('price', 'stop_loss', 'entry_atr', 'highest_price', 'break_even_active', 'trailing_active')
+
+COLUMNS = (
+    ('pair', 'kind', 'price', 'sl_price', 'btc_bullish', 'macro_neutral', 'signal', 'score', 'veto')
+    + tuple(f"{tf}_{name}" for tf in TIMEFRAMES for name in INDICATOR_FIELDS)
+    + tuple(f"pos_{name}" for name in POSITION_FIELDS)
+)
+
+# Baris siklus berjalan, kolom -> list
+CYCLE = {c: [] for c in COLUMNS}
+
+def _num(value):
+    # 10 digit signifikan cukup untuk semua harga/indikator, file jauh lebih ringkas
+    return float(f"{value:.10g}") if isinstance(value, float) else value
+
+def _append(row):
+    for c in COLUMNS:
+        CYCLE[c].append(_num(row.get(c)))
+
+def _indicator_row(data_1d, data_4h, data_1h):
+    row = {}
+    for tf, data in zip(TIMEFRAMES, (data_1d, data_4h, data_1h)):
+        if data is not None:
+            for name in INDICATOR_FIELDS:
+                row[f"{tf}_{name}"] = getattr(data, name)
+    return row
+
+# ==========================================
+# PENCATATAN
+# ==========================================
+def record_entry(pair, data_1d, data_4h, data_1h, price, sl_price, btc_bullish, signal, score, vetoes,
+                 macro_neutral=False):
+    row = _indicator_row(data_1d, data_4h, data_1h)
+    row.update(pair=pair, kind=KIND_ENTRY, price=price, sl_price=sl_price, btc_bullish=btc_bullish,
+               macro_neutral=macro_neutral, signal=signal, score=score, veto=vetoes[0] if vetoes else None)
+    _append(row)
+
+def record_exit(pair, pos, data_1d, data_4h, data_1h, price, signal):
+    """`pos` = dict posisi sebelum check_exit() (SL/trailing bisa berubah di dalamnya)."""
+    row = _indicator_row(data_1d, data_4h, data_1h)
+    row.update(pair=pair, kind=KIND_EXIT, price=price, signal=signal)
+    row.update({f"pos_{name}": pos[name] for name in POSITION_FIELDS})
+    _append(row)
+
+def take_cycle():
+    """Ambil dan kosongkan baris siklus berjalan."""
+    global CYCLE
+    cycle, CYCLE = CYCLE, {c: [] for c in COLUMNS}
+    return cycle
+
+def write_cycle(columns, now=None):
+    if not columns.get('pair'):
+        return None
+    now = now or datetime.now(timezone.utc)
+    directory = os.path.join(SNAPSHOT_DIR, now.strftime('%Y-%m-%d'))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, now.strftime('%H%M%S') + '.json.gz')
+    payload = {'ts': now.isoformat(timespec='seconds'), 'columns': columns}
+    try:
+        # mtime=0: isi sama -> byte sama
+        with gzip.GzipFile(path, 'wb', mtime=0) as f:
+            f.write(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    except Exception as e:
+        print(f"❌ Gagal menyimpan snapshot keputusan: {e}")
+        return None
+    prune(now)
+    return path
+
+def prune(now=None, days=RETENTION_DAYS):
+    """Hapus folder hari yang lebih tua dari `days` hari."""
+    now = now or datetime.now(timezone.utc)
+    first_day = (now - timedelta(days=days)).strftime('%Y-%m-%d')
+    for directory in glob.glob(os.path.join(SNAPSHOT_DIR, '*')):
+        if os.path.isdir(directory) and os.path.basename(directory) < first_day:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def flush(now=None):
+    return write_cycle(take_cycle(), now)
+
+# ==========================================
+# BACA ULANG
+# ==========================================
+def load_cycles(days=30, now=None):
+    """Semua siklus dalam `days` hari terakhir, urut waktu: list (ts, columns)."""
+    now = now or datetime.now(timezone.utc)
+    first_day = (now - timedelta(days=days)).strftime('%Y-%m-%d')
+    cycles = []
+    for path in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, '*', '*.json.gz'))):
+        if os.path.basename(os.path.dirname(path)) < first_day:
+            continue
+        try:
+            with gzip.open(path, 'rb') as f:
+                payload = json.loads(f.read())
+        except Exception as e:
+            print(f"⚠️ Snapshot {path} dilewati: {e}")
+            continue
+        cycles.append((payload['ts'], payload['columns']))
+    return cycles
+
+def indicators_at(columns, tf, i):
+    if columns[f"{tf}_close"][i] is None:
+        return None
+    return Indicators(*(columns[f"{tf}_{name}"][i] for name in INDICATOR_FIELDS))
+
+# ==========================================
+# RESCORING WHAT-IF
+# ==========================================
+def entry_rows(cycles):
+    """Baris entry dengan data lengkap 1D/4H/1H: list (ts, columns, index)."""
+    rows = []
+    for ts, columns in cycles:
+        for i, kind in enumerate(columns['kind']):
+            if kind == KIND_ENTRY and all(columns[f"{tf}_close"][i] is not None for tf in TIMEFRAMES):
+                rows.append((ts, columns, i))
+    return rows
+
+def is_neutral_at(columns, i):
+    """Regime NEUTRAL saat baris `i` dicatat (False untuk snapshot lama tanpa kolomnya)."""
+    flags = columns.get('macro_neutral')
+    return bool(flags and flags[i])
+
+def min_buy_at(columns, i, signal_bot):
+    """Skor minimum BUY yang berlaku untuk baris `i`, sama seperti buy_threshold() di siklus live."""
+    return signal_bot.SCORE_BUY_NEUTRAL if is_neutral_at(columns, i) else signal_bot.SCORE_BUY
+
+def rescore(cycles, overrides, rules=None):
+    """
+    Nilai ulang semua baris entry dengan parameter strategi di-override
+    (mis. {'SCORE_BUY': 75, 'MIN_RR': 1.5}). Override bisa berupa param di
+    scoring_rules.json atau konstanta di signal_bot; `rules` = RuleSet lain
+    (default: rule set aktif). Tanpa override hasilnya identik dengan keputusan asli.
+    Jika NumPy tersedia seluruh baris dinilai sekaligus (mask), jika tidak per baris.
+    Mengembalikan (rows, changed): rows = jumlah baris entry,
+    changed = list (ts, pair, sinyal_lama, sinyal_baru, skor_lama, skor_baru).
+    """
+    import signal_bot
+    import scoring_rules
+
+    base = rules or scoring_rules.get_rules()
+    rule_overrides = {k: v for k, v in overrides.items() if k in base.params}
+    active = base.with_params(rule_overrides) if rule_overrides else base
+    constants = {k: v for k, v in overrides.items() if k not in rule_overrides}
+    original = {name: getattr(signal_bot, name) for name in constants}
+    for name, value in constants.items():
+        setattr(signal_bot, name, value)
+
+    rows = entry_rows(cycles)
+    try:
+        try:
+            results = _rescore_vector(rows, active, signal_bot)
+        except ImportError:
+            scoring_rules.set_rules(active)
+            results = [signal_bot.check_entry(
+                columns['pair'][i], *(indicators_at(columns, tf, i) for tf in TIMEFRAMES),
+                columns['price'][i], columns['sl_price'][i], columns['btc_bullish'][i],
+                min_buy_at(columns, i, signal_bot)
+            )[:2] for _, columns, i in rows]
+    finally:
+        scoring_rules.set_rules(None)
+        for name, value in original.items():
+            setattr(signal_bot, name, value)
+
+    changed = []
+    for (ts, columns, i), (signal, score) in zip(rows, results):
+        if signal != columns['signal'][i] or score != columns['score'][i]:
+            changed.append((ts, columns['pair'][i], columns['signal'][i], signal, columns['score'][i], score))
+    return len(rows), changed
+
+def _rescore_vector(rows, rules, signal_bot):
+    """Versi mask NumPy dari check_entry() untuk semua baris sekaligus."""
+    import numpy as np  # ImportError -> fallback per baris
+
+    variables = {f"{name}_{tf}": [columns[f"{tf}_{name}"][i] for _, columns, i in rows]
+                 for tf in TIMEFRAMES for name in INDICATOR_FIELDS}
+    for name in ('price', 'sl_price', 'btc_bullish'):
+        variables[name] = [columns[name][i] for _, columns, i in rows]
+    scores, vetoed = rules.score_many(variables)
+
+    min_buy = np.array([min_buy_at(columns, i, signal_bot) for _, columns, i in rows])
+    signals = np.full(len(rows), None, dtype=object)
+    signals[scores >= signal_bot.SCORE_WATCH] = "WATCH"
+    signals[scores >= min_buy] = "BUY"
+    signals[(scores >= min_buy) & (scores >= signal_bot.SCORE_BUY_STRONG)] = "BUY_STRONG"
+    signals[vetoed] = None
+    return list(zip(signals.tolist(), scores.tolist()))
@@ -0,0 +1,41 @@
+import os
+import json
+
+# ==========================================
+# PENULISAN STATE JSON (KANONIK & DELTA-ONLY)
+# ==========================================
+# Semua file state ditulis dalam format kanonik (key terurut, indent tetap)
+# sehingga data yang sama selalu menghasilkan byte yang sama. Penulisan
+# dilewati jika isi tidak berubah, jadi `git add *.json` di workflow tidak
+# menghasilkan commit kosong setiap jam.
+
+_LAST_WRITTEN = {}
+
+def dumps_canonical(data, indent=4):
+    if indent is None:
+        return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return json.dumps(data, sort_keys=True, indent=indent, ensure_ascii=False)
+
+def write_json_if_changed(path, data, indent=4):
+    """
+    Tulis `data` ke `path` hanya jika hasil serialisasinya berbeda dari isi file.
+    Penulisan atomik (file sementara + os.replace) agar file tidak pernah
+    setengah tertulis jika proses dihentikan. Mengembalikan True jika file ditulis.
+    """
+    text = dumps_canonical(data, indent)
+    previous = _LAST_WRITTEN.get(path)
+    if previous is None and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = f.read()
+        except OSError:
+            previous = None
+    if previous == text:
+        return False
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    _LAST_WRITTEN[path] = text
+    return True
@@ -0,0 +1,107 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from state_io import write_json_if_changed
+
+# ==========================================
+# NEGATIVE CACHE SIMBOL
+# ==========================================
+# Simbol yang tidak dikenal screener BINANCE TradingView dicatat per
+# (pair, timeframe) dengan TTL yang berlipat setiap kali gagal lagi:
+# 6 jam, 12 jam, 24 jam, ... maksimal 7 hari. Selama TTL aktif, sumber
+# TradingView di market_data dilewati tanpa request jaringan.
+NEGATIVE_CACHE_FILE = 'symbol_negative_cache.json'
+NEGATIVE_TTL_BASE_HOURS = 6
+NEGATIVE_TTL_MAX_HOURS = 24 * 7
+VALIDATION_BATCH = 200
+
+# NEGATIVE[f"{pair}|{interval}"] = {'failures': int, 'until': iso8601 UTC}
+NEGATIVE = {}
+_LOCK = threading.Lock()
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_negative_cache():
+    global NEGATIVE
+    if os.path.exists(NEGATIVE_CACHE_FILE):
+        try:
+            with open(NEGATIVE_CACHE_FILE, 'r') as f:
+                NEGATIVE = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat negative cache simbol: {e}")
+            NEGATIVE = {}
+    else:
+        NEGATIVE = {}
+
+def save_negative_cache():
+    try:
+        with _LOCK:
+            write_json_if_changed(NEGATIVE_CACHE_FILE, NEGATIVE)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan negative cache simbol: {e}")
+
+# ==========================================
+# LOOKUP & UPDATE
+# ==========================================
+def _key(pair, interval):
+    return f"{pair}|{interval}"
+
+def is_blocked(pair, interval, now=None):
+    entry = NEGATIVE.get(_key(pair, interval))
+    if not entry:
+        return False
+    now = now or datetime.now(timezone.utc)
+    return now < datetime.fromisoformat(entry['until'])
+
+def record_failure(pair, interval, now=None):
+    now = now or datetime.now(timezone.utc)
+    with _LOCK:
+        entry = NEGATIVE.get(_key(pair, interval), {'failures': 0})
+        failures = entry['failures'] + 1
+        ttl_hours = min(NEGATIVE_TTL_BASE_HOURS * (2 ** (failures - 1)), NEGATIVE_TTL_MAX_HOURS)
+        NEGATIVE[_key(pair, interval)] = {
+            'failures': failures,
+            'until': (now + timedelta(hours=ttl_hours)).isoformat(timespec='seconds'),
+        }
+
+def record_success(pair, interval):
+    if _key(pair, interval) in NEGATIVE:
+        with _LOCK:
+            NEGATIVE.pop(_key(pair, interval), None)
+
+# ==========================================
+# VALIDASI BULK SAAT UNIVERSE DIPERBARUI
+# ==========================================
+def validate_symbols(pairs, interval="1h"):
+    """
+    Cek banyak simbol sekaligus lewat satu request scanner per batch
+    (market_data.scan_tradingview). Mengembalikan (valid, invalid, unchecked):
+    unchecked = pair di batch yang gagal karena masalah jaringan, belum
+    diketahui valid atau tidak (pemanggil harus mengeceknya ulang nanti).
+    """
+    import market_data
+
+    valid, invalid, unchecked = [], [], []
+    for i in range(0, len(pairs), VALIDATION_BATCH):
+        batch = pairs[i:i + VALIDATION_BATCH]
+        try:
+            result = market_data.scan_tradingview(batch, interval)
+        except Exception as e:
+            print(f"⚠️ Validasi simbol batch {i // VALIDATION_BATCH + 1} gagal: {e}")
+            unchecked.extend(batch)
+            continue
+        for pair in batch:
+            if result.get(pair) is None:
+                invalid.append(pair)
+            else:
+                valid.append(pair)
+
+    for pair in invalid:
+        for tf in ("1d", "4h", "1h"):
+            record_failure(pair, tf)
+    for pair in valid:
+        for tf in ("1d", "4h", "1h"):
+            record_success(pair, tf)
+    return valid, invalid, unchecked
@@ -0,0 +1,93 @@
+import math
+import random
+import time
+import indicators
+
+# ==========================================
+# GENERATOR PASAR SINTETIS (LOAD TEST)
+# ==========================================
+# OHLCV deterministik per (pair, interval) untuk load test tanpa API asli.
+# Return per bar mengikuti random walk dengan:
+#   - regime switching (rantai Markov BULL / BEAR / CHOP, masing-masing
+#     punya drift dan volatilitas dasar sendiri)
+#   - volatility clustering GARCH(1,1): varians bar berikutnya naik setelah
+#     return besar, lalu meluruh kembali ke level regime
+#   - shock ekor tebal (Student-t), volume ikut naik saat |return| besar
+# Seri yang sama selalu dihasilkan untuk (seed, pair, interval) yang sama.
+# Jalur dibangkitkan mundur dari bar yang sedang berjalan, yang close-nya
+# selalu harga acuan pair (anchor_price). Jadi bar ke-k dari belakang tidak
+# bergantung pada jumlah bar yang diminta, dan klines, ticker serta scanner
+# stub konsisten satu sama lain (dalam jam yang sama).
+INTERVAL_SECONDS = {'1h': 3600, '4h': 4 * 3600, '1d': 24 * 3600}
+
+# regime: (drift per jam, volatilitas per jam)
+REGIMES = {
+    'BULL': (0.0006, 0.008),
+    'BEAR': (-0.0007, 0.011),
+    'CHOP': (0.0, 0.006),
+}
+REGIME_SWITCH_PER_HOUR = 0.01   # Peluang pindah regime per jam
+GARCH_ALPHA = 0.08
+GARCH_BETA = 0.90
+T_DOF = 4                       # Derajat bebas shock Student-t
+QUOTE_ASSET = 'USDT'
+
+
+def pair_names(count):
+    """`count` pair sintetis, BTCUSDT selalu ada (dipakai filter makro)."""
+    return ['BTCUSDT'] + [f"SYN{i:05d}{QUOTE_ASSET}" for i in range(1, count)]
+
+def _student_t(rng):
+    # Dinormalisasi ke varians 1
+    chi2 = sum(rng.gauss(0, 1) ** 2 for _ in range(T_DOF))
+    return rng.gauss(0, 1) / math.sqrt(chi2 / T_DOF) * math.sqrt((T_DOF - 2) / T_DOF)
+
+def anchor_price(pair, seed=0):
+    """Harga terakhir pair (sama untuk semua timeframe)."""
+    return 10 ** random.Random(f"{seed}:{pair}").uniform(-3, 4)
+
+def generate(pair, interval, bars, end_time=None, seed=0):
+    """
+    `bars` bar OHLCV terakhir sampai candle yang sedang berjalan:
+    list [open_time_ms, open, high, low, close, volume, close_time_ms]
+    (bentuk klines Binance, angka sebagai float).
+    """
+    step = INTERVAL_SECONDS[interval]
+    hours = step / 3600
+    end_time = end_time or time.time()
+    last_open = int(end_time) // step * step
+
+    rng = random.Random(f"{seed}:{pair}:{interval}")
+    price = anchor_price(pair, seed)
+    base_volume = 10 ** random.Random(f"{seed}:{pair}:volume").uniform(3, 7)
+    regime = rng.choice(tuple(REGIMES))
+    drift, vol = REGIMES[regime]
+    variance = vol ** 2 * hours
+
+    rows = []
+    for i in range(bars):  # i = bar ke-i dari belakang
+        if rng.random() < 1 - (1 - REGIME_SWITCH_PER_HOUR) ** hours:
+            regime = rng.choice([r for r in REGIMES if r != regime])
+            drift, vol = REGIMES[regime]
+        sigma = math.sqrt(variance)
+        ret = drift * hours + sigma * _student_t(rng)
+        long_run = vol ** 2 * hours
+        variance = long_run * (1 - GARCH_ALPHA - GARCH_BETA) + GARCH_ALPHA * ret ** 2 + GARCH_BETA * variance
+
+        close_price = price
+        price = close_price / math.exp(ret)     # Open bar ini = close bar sebelumnya
+        wick = sigma * 0.5
+        high = max(price, close_price) * math.exp(abs(rng.gauss(0, wick)))
+        low = min(price, close_price) * math.exp(-abs(rng.gauss(0, wick)))
+        volume = base_volume * hours * (1 + abs(ret) / max(sigma, 1e-9)) * rng.lognormvariate(0, 0.3)
+        open_ms = (last_open - i * step) * 1000
+        rows.append([open_ms, price, high, low, close_price, volume, open_ms + step * 1000 - 1])
+    rows.reverse()
+    return rows
+
+def to_indicators(rows):
+    """Indicators (gaya TradingView, bar terakhir ikut dihitung) dari output generate()."""
+    state = indicators.new_state()
+    for row in rows:
+        state = indicators.step(state, tuple(row[1:6]))
+    return indicators.to_indicators(state)
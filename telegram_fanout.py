@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import heapq
+import atexit
+import threading
+from collections import deque
+from http_transport import get_transport
+
+# ==========================================
+# FAN-OUT TELEGRAM MULTI-SUBSCRIBER
+# ==========================================
+# Registry subscriber dibaca dari env TELEGRAM_SUBSCRIBERS (JSON, cocok untuk
+# GitHub secret), atau subscribers.json, atau fallback satu chat
+# TELEGRAM_CHAT_ID seperti sebelumnya. Contoh:
+#   [{"chat_id": "-100123", "name": "VIP", "signals": ["BUY_STRONG"], "min_score": 90},
+#    {"chat_id": "555", "signals": ["exits", "recap"], "pairs": ["BTCUSDT", "ETHUSDT"]}]
+#
+# Saat load, registry di-compile menjadi tabel routing sinyal -> subscriber,
+# jadi satu alert cukup lookup dict + filter skor/pair.
+#
+# Pengiriman tidak memblokir scan: pesan masuk antrian per chat dan dikirim
+# worker thread dengan batas rate Telegram (global per bot, per chat, lebih
+# ketat untuk grup/channel). Jika satu chat punya beberapa pesan antre,
+# pesan-pesan itu digabung (maks 4096 karakter) sehingga 50 alert untuk satu
+# chat tidak butuh 50 detik. flush() menunggu antrian kosong di akhir siklus.
+# Tiap pesan bisa membawa callback on_result(ok) yang dipanggil worker setelah
+# Telegram menerima (ok=True) atau menolak/gagal (ok=False) pesan gabungannya.
+SUBSCRIBERS_FILE = 'subscribers.json'
+TELEGRAM_API = 'https://api.telegram.org/bot{token}/sendMessage'
+
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))   # Pesan/detik per bot
+PRIVATE_CHAT_INTERVAL = 1.0                                       # Detik antar pesan ke chat pribadi
+GROUP_CHAT_INTERVAL = 3.0                                         # Grup/channel: 20 pesan/menit
+MAX_MESSAGE_CHARS = 4096
+WORKERS = 8
+FLUSH_TIMEOUT = 120
+EXIT_FLUSH_TIMEOUT = 10         # atexit: sisa antrian setelah flush siklus tidak boleh menahan job
+
+SIGNAL_GROUPS = {
+    'entries': ('BUY', 'BUY_STRONG', 'WATCH'),
+    'exits': ('SELL_EMA_MACD', 'SELL_CLOSE_EMA', 'STOP_LOSS', 'TRAILING_STOP', 'EXPIRED'),
+    'updates': ('ACTIVATE_TRAIL', 'BREAK_EVEN'),
+    'recap': ('REKAP_MINGGUAN',),
+}
+ALL_SIGNALS = tuple(s for group in SIGNAL_GROUPS.values() for s in group)
+
+SUBSCRIBERS = []
+ROUTES = {}         # signal_type -> tuple(subscriber)
+_WILDCARD = ()      # subscriber "*" untuk tipe sinyal yang tidak dikenal
+_LOADED = False
+
+# ==========================================
+# REGISTRY & ROUTING
+# ==========================================
+def _expand(signals):
+    if signals in (None, '*') or '*' in signals:
+        return set(ALL_SIGNALS) | {'*'}
+    out = set()
+    for s in signals:
+        out.update(SIGNAL_GROUPS.get(s, (s,)))
+    return out
+
+def _compile(entries):
+    subscribers, routes = [], {}
+    for entry in entries:
+        sub = {
+            'chat_id': str(entry['chat_id']),
+            'name': entry.get('name', str(entry['chat_id'])),
+            'min_score': entry.get('min_score'),
+            'pairs': frozenset(entry['pairs']) if entry.get('pairs') else None,
+        }
+        subscribers.append(sub)
+        for signal in _expand(entry.get('signals')):
+            routes.setdefault(signal, []).append(sub)
+    wildcard = tuple(routes.pop('*', ()))
+    return subscribers, {k: tuple(v) for k, v in routes.items()}, wildcard
+
+def load_subscribers(default_chat_id=None):
+    global SUBSCRIBERS, ROUTES, _WILDCARD, _LOADED
+    entries = None
+    raw = os.getenv('TELEGRAM_SUBSCRIBERS')
+    try:
+        if raw:
+            entries = json.loads(raw)
+        elif os.path.exists(SUBSCRIBERS_FILE):
+            with open(SUBSCRIBERS_FILE, 'r') as f:
+                entries = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Gagal memuat registry subscriber: {e}")
+    if not entries:
+        entries = [{'chat_id': default_chat_id, 'name': 'default'}] if default_chat_id else []
+    SUBSCRIBERS, ROUTES, _WILDCARD = _compile(entries)
+    _LOADED = True
+
+def route(signal_type, pair=None, score=None):
+    """Chat ID tujuan untuk satu alert, sesuai filter tipe sinyal, skor minimum, dan pair."""
+    chats = []
+    for sub in ROUTES.get(signal_type, _WILDCARD):
+        if sub['min_score'] is not None and score is not None and score < sub['min_score']:
+            continue
+        if sub['pairs'] is not None and pair not in sub['pairs']:
+            continue
+        chats.append(sub['chat_id'])
+    return chats
+
+# ==========================================
+# PENGIRIM PARALEL DENGAN RATE LIMIT
+# ==========================================
+class FanOutSender:
+    def __init__(self, token, global_rate=GLOBAL_RATE, workers=WORKERS):
+        self.url = TELEGRAM_API.format(token=token)
+        self.global_interval = 1.0 / global_rate
+        self.workers = workers
+        self._pending = {}          # chat_id -> deque teks
+        self._ready = []            # heap (waktu boleh kirim, chat_id)
+        self._scheduled = set()
+        self._next_chat = {}        # chat_id -> waktu kirim berikutnya
+        self._next_global = 0.0
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self.sent = 0
+        self.failed = 0
+
+    @staticmethod
+    def chat_interval(chat_id):
+        return GROUP_CHAT_INTERVAL if chat_id.startswith('-') else PRIVATE_CHAT_INTERVAL
+
+    def _start(self):
+        if self._threads:
+            return
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._run, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _schedule(self, chat_id):
+        if chat_id not in self._scheduled:
+            self._scheduled.add(chat_id)
+            heapq.heappush(self._ready, (self._next_chat.get(chat_id, 0.0), chat_id))
+            self._cond.notify()
+
+    def enqueue(self, chat_id, text, on_result=None):
+        with self._cond:
+            self._start()
+            self._pending.setdefault(chat_id, deque()).append((text, on_result))
+            self._schedule(chat_id)
+
+    def _take(self):
+        """Blok sampai ada chat yang boleh dikirimi; ambil gabungan pesannya."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._ready:
+                    ready_at = max(self._ready[0][0], self._next_global)
+                    if ready_at <= now:
+                        _, chat_id = heapq.heappop(self._ready)
+                        self._scheduled.discard(chat_id)
+                        queue = self._pending[chat_id]
+                        parts = [queue.popleft()]
+                        while queue and sum(len(t) for t, _ in parts) + len(queue[0][0]) + 2 * len(parts) <= MAX_MESSAGE_CHARS:
+                            parts.append(queue.popleft())
+                        self._next_global = now + self.global_interval
+                        self._next_chat[chat_id] = now + self.chat_interval(chat_id)
+                        if queue:
+                            self._schedule(chat_id)
+                        self._inflight += 1
+                        return chat_id, '\n\n'.join(t for t, _ in parts), [cb for _, cb in parts if cb]
+                    self._cond.wait(ready_at - now)
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            chat_id, text, callbacks = self._take()
+            ok = False
+            try:
+                response = get_transport().post(self.url, json={
+                    'chat_id': chat_id, 'text': text,
+                    'parse_mode': 'Markdown', 'disable_web_page_preview': True
+                })
+                ok = response.status_code == 200
+                if not ok:
+                    print(f"❌ Telegram {chat_id} menolak pesan: HTTP {response.status_code}")
+            except Exception as e:
+                print(f"❌ Gagal kirim Telegram ke {chat_id}: {e}")
+            for callback in callbacks:
+                try:
+                    callback(ok)
+                except Exception as e:
+                    print(f"⚠️ Callback hasil kirim Telegram gagal: {e}")
+            with self._cond:
+                self._inflight -= 1
+                self.sent += ok
+                self.failed += not ok
+                self._cond.notify_all()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Tunggu semua pesan terkirim. Mengembalikan True jika antrian kosong."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._ready or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 1.0))
+        return True
+
+
+_SENDER = None
+_SENDER_LOCK = threading.Lock()
+
+def get_sender(token):
+    global _SENDER
+    with _SENDER_LOCK:
+        if _SENDER is None:
+            _SENDER = FanOutSender(token)
+            atexit.register(flush, EXIT_FLUSH_TIMEOUT)  # Jangan sampai pesan hilang saat proses selesai
+        return _SENDER
+
+def publish(token, default_chat_id, signal_type, text, pair=None, score=None, claim=None):
+    """
+    Antrikan satu alert ke semua subscriber yang cocok. Tidak memblokir.
+    `claim(chat_id)` (opsional) dipanggil per chat tujuan: None = lewati chat
+    itu (duplikat), selain itu callback on_result(ok) untuk pesan ke chat itu.
+    Mengembalikan jumlah chat yang diantrikan.
+    """
+    if not _LOADED:
+        load_subscribers(default_chat_id)
+    chats = route(signal_type, pair, score)
+    if not chats:
+        return 0
+    queued = 0
+    for chat_id in chats:
+        on_result = claim(chat_id) if claim else None
+        if claim and on_result is None:
+            continue
+        get_sender(token).enqueue(chat_id, text, on_result)
+        queued += 1
+    return queued
+
+def flush(timeout=FLUSH_TIMEOUT):
+    if _SENDER is None:
+        return True
+    done = _SENDER.flush(timeout)
+    if not done:
+        print("⚠️ Sebagian pesan Telegram belum terkirim saat batas waktu flush.")
+    return done
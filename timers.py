@@ -0,0 +1,116 @@
+import os
+import json
+import heapq
+from datetime import datetime, timezone
+from state_io import write_json_if_changed
+
+# ==========================================
+# PENJADWAL DEADLINE PERSISTEN
+# ==========================================
+# Semua pekerjaan berbasis waktu (akhir cooldown, batas durasi hold, jadwal
+# rekap mingguan) disimpan sebagai satu antrian deadline di timers.json.
+# Tiap siklus cukup mengambil event yang sudah jatuh tempo dari heap
+# (O(log n) per event), tanpa memindai semua pair/posisi. Karena deadline
+# tersimpan, event yang terlewat (mis. run cron dilewati) tetap diproses
+# di run berikutnya.
+#
+# Event diidentifikasi (jenis, key); menjadwalkan ulang key yang sama
+# mengganti deadline lama. Entri heap yang sudah diganti/dibatalkan
+# dibuang saat di-pop (lazy deletion).
+TIMERS_FILE = 'timers.json'
+
+KIND_COOLDOWN = 'cooldown'
+KIND_HOLD = 'hold'
+KIND_RECAP = 'recap'
+
+# EVENTS[f"{jenis}|{key}"] = deadline (datetime aware)
+EVENTS = {}
+_HEAP = []          # (deadline, jenis, key)
+_DIRTY = False
+
+def _id(kind, key):
+    return f"{kind}|{key}"
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_timers():
+    global EVENTS, _HEAP, _DIRTY
+    EVENTS, _HEAP, _DIRTY = {}, [], False
+    if os.path.exists(TIMERS_FILE):
+        try:
+            with open(TIMERS_FILE, 'r') as f:
+                EVENTS = {k: datetime.fromisoformat(v) for k, v in json.load(f).items()}
+        except Exception as e:
+            print(f"⚠️ Gagal memuat jadwal timer: {e}")
+            EVENTS = {}
+    _HEAP = [(due, *event_id.split('|', 1)) for event_id, due in EVENTS.items()]
+    heapq.heapify(_HEAP)
+
+def save_timers():
+    global _DIRTY
+    if not _DIRTY:
+        return
+    try:
+        write_json_if_changed(TIMERS_FILE, {k: v.isoformat() for k, v in EVENTS.items()})
+        _DIRTY = False
+    except Exception as e:
+        print(f"❌ Gagal menyimpan jadwal timer: {e}")
+
+# ==========================================
+# JADWAL
+# ==========================================
+def schedule(kind, key, due):
+    global _DIRTY
+    event_id = _id(kind, key)
+    if EVENTS.get(event_id) == due:
+        return
+    EVENTS[event_id] = due
+    heapq.heappush(_HEAP, (due, kind, key))
+    _DIRTY = True
+
+def cancel(kind, key):
+    global _DIRTY
+    if EVENTS.pop(_id(kind, key), None) is not None:
+        _DIRTY = True
+
+def due_at(kind, key):
+    return EVENTS.get(_id(kind, key))
+
+def keys(kind):
+    prefix = f"{kind}|"
+    return [event_id[len(prefix):] for event_id in EVENTS if event_id.startswith(prefix)]
+
+def pop_due(now=None, kinds=None):
+    """
+    Ambil semua event yang deadline-nya <= now, urut deadline: list (jenis, key, deadline).
+    Jika `kinds` diberikan, event jenis lain yang jatuh tempo dibiarkan di antrian.
+    """
+    global _DIRTY
+    now = now or datetime.now(timezone.utc)
+    due, skipped = [], []
+    while _HEAP and _HEAP[0][0] <= now:
+        entry = heapq.heappop(_HEAP)
+        deadline, kind, key = entry
+        if EVENTS.get(_id(kind, key)) != deadline:
+            continue  # Sudah dijadwal ulang atau dibatalkan
+        if kinds is not None and kind not in kinds:
+            skipped.append(entry)
+            continue
+        del EVENTS[_id(kind, key)]
+        _DIRTY = True
+        due.append((kind, key, deadline))
+    for entry in skipped:
+        heapq.heappush(_HEAP, entry)
+    return due
+
+def sync(kind, wanted):
+    """
+    Samakan event `kind` dengan dict {key: deadline} dari state sumber
+    (mis. cooldowns.json hasil merge shard). Key yang tidak ada dibatalkan.
+    """
+    for key in keys(kind):
+        if key not in wanted:
+            cancel(kind, key)
+    for key, due in wanted.items():
+        schedule(kind, key, due)
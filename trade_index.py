@@ -0,0 +1,98 @@
+import os
+import json
+from state_io import write_json_if_changed
+
+# ==========================================
+# INDEKS TRADE PER PAIR (ROLLING)
+# ==========================================
+# Ringkasan trade terakhir tiap pair, diperbarui O(1) setiap trade ditutup,
+# sehingga kebijakan cooldown adaptif bisa membaca rekam jejak pair tanpa
+# memindai trade_history.json:
+#   - recent      : PnL % RECENT_TRADES trade terakhir (lama -> baru)
+#   - loss_streak : jumlah trade rugi berturut-turut terakhir (0 jika terakhir profit)
+#   - last_exit   : waktu exit terakhir (iso) dan last_reason alasan exit-nya
+# Sama seperti performance.json, indeks dibangun ulang dari riwayat jika
+# jumlah trade yang tercatat tidak sama dengan panjang riwayat.
+TRADE_INDEX_FILE = 'trade_index.json'
+RECENT_TRADES = 10
+
+# INDEX = {'trades': int, 'pairs': {pair: {'recent': [pnl, ...], 'loss_streak': int,
+#                                          'last_exit': iso, 'last_reason': str}}}
+INDEX = {}
+
+def _new_index():
+    return {'trades': 0, 'pairs': {}}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_index():
+    global INDEX
+    INDEX = _new_index()
+    if os.path.exists(TRADE_INDEX_FILE):
+        try:
+            with open(TRADE_INDEX_FILE, 'r') as f:
+                INDEX.update(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Gagal memuat indeks trade: {e}")
+            INDEX = _new_index()
+
+def save_index():
+    try:
+        write_json_if_changed(TRADE_INDEX_FILE, INDEX)
+    except Exception as e:
+        print(f"❌ Gagal menyimpan indeks trade: {e}")
+
+# ==========================================
+# UPDATE
+# ==========================================
+def add_trade(trade):
+    """Masukkan satu trade yang baru ditutup ke indeks pair-nya. O(1)."""
+    pnl = float(trade['profit_pct'])
+    entry = INDEX['pairs'].setdefault(trade['pair'], {'recent': [], 'loss_streak': 0,
+                                                      'last_exit': None, 'last_reason': None})
+    entry['recent'] = (entry['recent'] + [round(pnl, 4)])[-RECENT_TRADES:]
+    entry['loss_streak'] = entry['loss_streak'] + 1 if pnl <= 0 else 0
+    entry['last_exit'] = trade.get('exit_date')
+    entry['last_reason'] = trade.get('exit_reason')
+    INDEX['trades'] += 1
+
+def rebuild(history):
+    """Bangun ulang dari seluruh riwayat (sekali, jika file hilang atau tidak sinkron)."""
+    global INDEX
+    INDEX = _new_index()
+    for trade in sorted(history, key=lambda t: t.get('exit_date', '')):
+        add_trade(trade)
+    print(f"🔄 Indeks trade per pair dibangun ulang dari {len(history)} trade.")
+
+def record_trade(trade, history):
+    """Dipanggil setelah `trade` ditambahkan ke `history` (lihat performance.record_trade)."""
+    if INDEX.get('trades') == len(history) - 1:
+        add_trade(trade)
+    else:
+        rebuild(history)
+    save_index()
+
+def ensure_synced(history):
+    if INDEX.get('trades') != len(history):
+        rebuild(history)
+        save_index()
+
+# ==========================================
+# BACA
+# ==========================================
+def get(pair):
+    """Entry indeks pair, atau None jika pair belum pernah ditutup."""
+    return INDEX.get('pairs', {}).get(pair)
+
+def loss_streak(pair):
+    entry = get(pair)
+    return entry['loss_streak'] if entry else 0
+
+def win_rate(pair, min_trades=1):
+    """Rasio trade profit di jendela `recent`, None jika sampel < min_trades."""
+    entry = get(pair)
+    recent = entry['recent'] if entry else []
+    if len(recent) < min_trades:
+        return None
+    return sum(1 for pnl in recent if pnl > 0) / len(recent)
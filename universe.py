@@ -0,0 +1,228 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+import symbol_cache
+from http_transport import get_transport
+from state_io import write_json_if_changed
+
+# ==========================================
+# UNIVERSE INKREMENTAL (DIFF HARIAN)
+# ==========================================
+# Sebelumnya pairs_cache.json dibangun ulang penuh (crawl semua halaman
+# CoinGecko + ranking CMC) hanya jika umurnya > 30 hari, sehingga listing
+# baru baru terlihat sebulan kemudian. Sekarang universe dirawat bertahap:
+#   - sekali sehari: satu request exchangeInfo Binance -> diff dengan
+#     universe tersimpan. Listing USDT baru ditambahkan, pair delisting /
+#     halt (status != TRADING) dibuang.
+#   - hanya pair baru yang di-ranking (CMC quotes per simbol) dan divalidasi
+#     ke screener TradingView; ranking pair lama dipakai ulang.
+#   - ranking penuh (satu request listings CMC) hanya tiap RERANK_DAYS hari
+#     atau saat dipaksa (`bot.py refresh-universe --force`).
+# Hasilnya disimpan di universe.json dengan nomor versi yang naik setiap kali
+# daftar pair scan berubah, plus riwayat diff. pairs_cache.json (daftar yang
+# dibaca scanner) tetap ditulis sebagai list biasa agar kompatibel.
+UNIVERSE_FILE = 'universe.json'
+PAIRS_CACHE_FILE = 'pairs_cache.json'
+BINANCE_EXCHANGE_INFO_URL = 'https://data-api.binance.vision/api/v3/exchangeInfo'
+CMC_QUOTES_URL = 'https://pro-api.coinmarketcap.com/v2/cryptocurrency/quotes/latest'
+
+QUOTE_ASSET = 'USDT'
+TOP_PAIRS = 100                 # Jumlah pair teratas yang ditulis ke pairs_cache.json
+SYNC_HOURS = 24                 # Jarak minimum antar diff exchangeInfo
+RERANK_DAYS = 30                # Jarak ranking ulang penuh via listings CMC
+CMC_QUOTES_BATCH = 100          # Simbol per request quotes CMC
+HISTORY_KEEP = 60               # Jumlah entry riwayat diff yang disimpan
+
+# STATE['pairs'][pair] = {'base': str, 'rank': int|None, 'valid': True|False|None}
+#   valid None = belum dicek ke TradingView (dicek saat masuk jendela top)
+STATE = {'version': 0, 'synced': None, 'reranked': None, 'pairs': {}, 'top': [], 'history': []}
+
+# ==========================================
+# LOAD & SAVE
+# ==========================================
+def load_universe():
+    global STATE
+    STATE = {'version': 0, 'synced': None, 'reranked': None, 'pairs': {}, 'top': [], 'history': []}
+    if os.path.exists(UNIVERSE_FILE):
+        try:
+            with open(UNIVERSE_FILE, 'r') as f:
+                STATE.update(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Gagal memuat universe: {e}")
+    elif os.path.exists(PAIRS_CACHE_FILE):
+        # Migrasi: urutan pairs_cache.json lama jadi acuan sampai ada ranking CMC
+        try:
+            with open(PAIRS_CACHE_FILE, 'r') as f:
+                STATE['top'] = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Gagal memuat {PAIRS_CACHE_FILE}: {e}")
+    return STATE
+
+def save_universe():
+    try:
+        write_json_if_changed(UNIVERSE_FILE, STATE)
+        write_json_if_changed(PAIRS_CACHE_FILE, STATE['top'])
+    except Exception as e:
+        print(f"❌ Gagal menyimpan universe: {e}")
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+def is_due(now=None):
+    """True jika universe belum pernah disinkronkan atau diff terakhir > SYNC_HOURS."""
+    now = now or datetime.now(timezone.utc)
+    synced = _parse_time(STATE.get('synced'))
+    return synced is None or now - synced >= timedelta(hours=SYNC_HOURS)
+
+# ==========================================
+# SUMBER DATA
+# ==========================================
+def fetch_exchange_pairs():
+    """
+    {pair: base} semua pair spot USDT berstatus TRADING di Binance.
+    None jika request gagal (universe lama dipertahankan apa adanya).
+    """
+    try:
+        response = get_transport().get(BINANCE_EXCHANGE_INFO_URL, params={'permissions': 'SPOT'})
+        response.raise_for_status()
+        symbols = response.json().get('symbols', [])
+    except Exception as e:
+        print(f"❌ Gagal mengambil daftar simbol exchange: {e}")
+        return None
+    pairs = {
+        s['symbol']: s['baseAsset'].upper()
+        for s in symbols
+        if s.get('quoteAsset') == QUOTE_ASSET and s.get('status') == 'TRADING'
+        and s.get('isSpotTradingAllowed', True)
+    }
+    if not pairs:
+        print("❌ Daftar simbol exchange kosong, universe tidak diubah.")
+        return None
+    return pairs
+
+def fetch_ranks(bases):
+    """Ranking CMC hanya untuk simbol tertentu (quotes per simbol). {simbol: cmc_rank}."""
+    from CMC import CMC_API_KEY
+
+    ranks = {}
+    bases = sorted(set(bases))
+    for i in range(0, len(bases), CMC_QUOTES_BATCH):
+        batch = bases[i:i + CMC_QUOTES_BATCH]
+        params = {'symbol': ','.join(batch), 'skip_invalid': 'true'}
+        try:
+            response = get_transport().get(CMC_QUOTES_URL, headers={"X-CMC_PRO_API_KEY": CMC_API_KEY}, params=params)
+            response.raise_for_status()
+            data = response.json().get('data', {})
+        except Exception as e:
+            print(f"⚠️ Gagal mengambil ranking CMC untuk {len(batch)} simbol baru: {e}")
+            continue
+        for symbol, coins in data.items():
+            # Satu simbol bisa dipakai beberapa koin; ambil ranking terbaik
+            coin_ranks = [c.get('cmc_rank') for c in (coins if isinstance(coins, list) else [coins])]
+            coin_ranks = [r for r in coin_ranks if r]
+            if coin_ranks:
+                ranks[symbol.upper()] = min(coin_ranks)
+    return ranks
+
+# ==========================================
+# RANKING & VALIDASI
+# ==========================================
+def ranked_pairs():
+    """
+    Semua pair yang tidak ditandai invalid, urut ranking CMC. Pair tanpa
+    ranking di belakang, dengan urutan top sebelumnya dipertahankan.
+    """
+    pairs = STATE['pairs']
+    position = {p: i for i, p in enumerate(STATE['top'])}
+    eligible = [p for p, info in pairs.items() if info.get('valid') is not False]
+    return sorted(eligible, key=lambda p: (pairs[p].get('rank') is None, pairs[p].get('rank') or 0,
+                                           position.get(p, len(position)), p))
+
+def select_top(limit=TOP_PAIRS):
+    """
+    Ambil `limit` pair teratas. Pair di jendela top yang belum pernah dicek
+    divalidasi ke TradingView dulu; yang tidak dikenal ditandai invalid dan
+    tempatnya diisi pair berikutnya. Pair yang validasinya gagal karena
+    gangguan jaringan tetap masuk top dengan valid None (dicek ulang nanti).
+    """
+    symbol_cache.load_negative_cache()
+    skipped = set()
+    while True:
+        top = ranked_pairs()[:limit]
+        pending = [p for p in top if STATE['pairs'][p].get('valid') is None and p not in skipped]
+        if not pending:
+            break
+        valid, invalid, unchecked = symbol_cache.validate_symbols(pending)
+        for pair in valid:
+            STATE['pairs'][pair]['valid'] = True
+        for pair in invalid:
+            STATE['pairs'][pair]['valid'] = False
+        skipped.update(unchecked)
+        if unchecked:
+            print(f"⏭️ {len(unchecked)} simbol belum tervalidasi (gangguan jaringan), dicek ulang di sinkron berikutnya.")
+        if invalid:
+            print(f"🚫 {len(invalid)} simbol tidak dikenal TradingView dibuang: {invalid}")
+        else:
+            break
+    symbol_cache.save_negative_cache()
+    return top
+
+# ==========================================
+# SINKRONISASI
+# ==========================================
+def sync(full_rerank=False, limit=TOP_PAIRS, now=None):
+    """
+    Diff universe dengan daftar simbol exchange lalu tulis universe.json dan
+    pairs_cache.json. Mengembalikan dict diff {'added', 'removed', 'reranked',
+    'version'}, atau None jika daftar exchange gagal diambil.
+    """
+    now = now or datetime.now(timezone.utc)
+    exchange = fetch_exchange_pairs()
+    if exchange is None:
+        return None
+
+    pairs = STATE['pairs']
+    added = sorted(set(exchange) - set(pairs))
+    removed = sorted(set(pairs) - set(exchange))
+    print(f"🔍 Universe: {len(exchange)} pair {QUOTE_ASSET} aktif di exchange, "
+          f"{len(added)} baru, {len(removed)} delisting/halt.")
+
+    for pair in removed:
+        del pairs[pair]
+    for pair in added:
+        pairs[pair] = {'base': exchange[pair], 'rank': None, 'valid': None}
+
+    reranked = _parse_time(STATE.get('reranked'))
+    if full_rerank or reranked is None or now - reranked >= timedelta(days=RERANK_DAYS):
+        from CMC import get_cmc_rankings
+
+        ranks = get_cmc_rankings([info['base'] for info in pairs.values()])
+        if ranks:
+            for info in pairs.values():
+                info['rank'] = ranks.get(info['base'])
+                if info.get('valid') is False:
+                    info['valid'] = None    # Beri kesempatan validasi ulang sebulan sekali
+            STATE['reranked'] = now.isoformat()
+        rerank_count = len(pairs) if ranks else 0
+    else:
+        ranks = fetch_ranks(pairs[p]['base'] for p in added) if added else {}
+        for pair in added:
+            pairs[pair]['rank'] = ranks.get(pairs[pair]['base'])
+        rerank_count = len(added)
+
+    previous = STATE['top']
+    top = select_top(limit)
+    if top != previous:
+        STATE['version'] += 1
+        STATE['history'].append({
+            'version': STATE['version'], 'date': now.isoformat(),
+            'entered': [p for p in top if p not in previous],
+            'left': [p for p in previous if p not in top],
+        })
+        STATE['history'] = STATE['history'][-HISTORY_KEEP:]
+        print(f"🆕 Universe versi {STATE['version']}: "
+              f"masuk {STATE['history'][-1]['entered']}, keluar {STATE['history'][-1]['left']}")
+    STATE['top'] = top
+    STATE['synced'] = now.isoformat()
+    save_universe()
+    return {'added': added, 'removed': removed, 'reranked': rerank_count, 'version': STATE['version']}